@@ -0,0 +1,175 @@
+"""Throughput of src/backfill_trending.py over a synthetic WARC archive.
+
+A .warc.gz is generated under --work-dir (and reused by later runs) with
+--pages trending pages, each preceded by its request record like a real
+crawl. The pages use the markup scrape_trending.py extracts and are padded
+with unrelated markup up to --page-kb, to approach the parse cost of the
+real page. backfill_trending.py is then run over it as a separate process
+once per --parse-processes value, reporting wall time, pages per minute and
+peak RSS (which should not grow with the archive size).
+
+Usage:
+    uv run benchmarks/bench_backfill.py --work-dir /tmp/backfill --pages 5000 --parse-processes 0 --parse-processes 8
+"""
+
+import sys
+import gzip
+import uuid
+import random
+import shutil
+import datetime
+from html import escape
+from pathlib import Path
+
+import click
+
+from bench_scale import SRC, run_tool
+from synthetic_data_repo import language_names, make_repo
+
+sys.path.insert(0, str(SRC))
+
+from trending_repo import TrendingRepo  # noqa: E402
+
+
+def render_row(repo: TrendingRepo) -> str:
+    avatars = "".join(
+        f'<a href="/{name}"><img class="avatar mb-1 avatar-user" alt="@{name}"></a>'
+        for name in repo.contributors
+    )
+    return f"""<article class="Box-row">
+  <h2 class="h3 lh-condensed"><a href="{repo.path}" class="Link">{escape(repo.repository)}</a></h2>
+  <p class="col-9 color-fg-muted my-1 pr-4">{escape(repo.description)}</p>
+  <div class="f6 color-fg-muted mt-2">
+    <span class="d-inline-block ml-0 mr-3"><span itemprop="programmingLanguage">{repo.programming_language}</span></span>
+    <a href="{repo.path}/stargazers" class="Link Link--muted d-inline-block mr-3">{repo.stars:,}</a>
+    <a href="{repo.path}/forks" class="Link Link--muted d-inline-block mr-3">{repo.forks:,}</a>
+    <span class="d-inline-block mr-3">Built by {avatars}</span>
+    <span class="d-inline-block float-sm-right">{repo.stars_gained:,} stars today</span>
+  </div>
+</article>
+"""
+
+
+def render_page(repos: list[TrendingRepo], page_kb: int) -> bytes:
+    rows = "".join(render_row(repo) for repo in repos)
+    # ヘッダーやフッターなど、トレンド以外の部分に見立てた詰め物
+    filler_item = '<li class="d-block"><a class="Link--secondary" href="/features">Features</a></li>\n'
+    filler = "".join(
+        filler_item
+        for _ in range(max(page_kb * 1024 - len(rows), 0) // len(filler_item))
+    )
+    return (
+        f"<html><head><title>Trending</title></head><body><nav><ul>{filler}</ul></nav>"
+        f'<div class="Box">{rows}</div></body></html>'
+    ).encode("utf-8")
+
+
+def warc_record(
+    warc_type: str, uri: str, date: datetime.datetime, block: bytes
+) -> bytes:
+    headers = (
+        "WARC/1.0\r\n"
+        f"WARC-Type: {warc_type}\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        f"WARC-Date: {date.strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+        f"WARC-Target-URI: {uri}\r\n"
+        f"Content-Type: application/http; msgtype={warc_type}\r\n"
+        f"Content-Length: {len(block)}\r\n"
+        "\r\n"
+    )
+    return headers.encode("utf-8") + block + b"\r\n\r\n"
+
+
+def generate_warc(
+    path: Path, pages: int, languages: int, page_kb: int, seed: int
+) -> None:
+    rng = random.Random(seed)
+    names = language_names(languages)
+    start = datetime.datetime(2018, 1, 1, 10, 30, tzinfo=datetime.UTC)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("wb") as f:
+        for i in range(pages):
+            language = names[i % len(names)]
+            # 言語を一巡するごとに1日進める (言語・日付の組は重複しない)
+            date = start + datetime.timedelta(days=i // len(names))
+            uri = f"https://github.com/trending/{language}?since=daily"
+            repos = [
+                make_repo(rng, language, i * 25 + rank, rank) for rank in range(1, 26)
+            ]
+            body = render_page(repos, page_kb)
+            response = (
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            request = f"GET /trending/{language}?since=daily HTTP/1.1\r\nHost: github.com\r\n\r\n"
+            # WARCの慣習どおりレコードごとにgzipメンバーを分ける
+            f.write(gzip.compress(warc_record("request", uri, date, request.encode())))
+            f.write(gzip.compress(warc_record("response", uri, date, response)))
+    tmp_path.replace(path)
+
+
+@click.command()
+@click.option(
+    "--work-dir",
+    "workDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=True,
+    help="生成したWARCと出力を置くディレクトリ",
+)
+@click.option("--pages", type=click.IntRange(min=1), default=2000, show_default=True)
+@click.option("--languages", type=click.IntRange(min=1), default=50, show_default=True)
+@click.option(
+    "--page-kb",
+    type=click.IntRange(min=0),
+    default=200,
+    show_default=True,
+    help="1ページの大きさ (KiB). 足りない分をトレンド以外のマークアップで埋める",
+)
+@click.option(
+    "--parse-processes",
+    "processesList",
+    type=click.IntRange(min=0),
+    multiple=True,
+    default=(0, 2, 4),
+    show_default=True,
+)
+@click.option("--seed", type=int, default=1, show_default=True)
+def main(
+    workDir: Path,
+    pages: int,
+    languages: int,
+    page_kb: int,
+    processesList: tuple[int, ...],
+    seed: int,
+):
+    workDir.mkdir(parents=True, exist_ok=True)
+    warc = workDir / f"trending-{pages}p-{languages}l-{page_kb}k-{seed}.warc.gz"
+    if not warc.exists():
+        generate_warc(warc, pages, languages, page_kb, seed)
+    print(f"{warc.name}: {warc.stat().st_size / 1024 / 1024:.1f} MiB")
+
+    print(f"{'processes':>9} {'wall':>9} {'pages/min':>10} {'peak RSS':>10}")
+    for processes in processesList:
+        out_dir = workDir / "out"
+        shutil.rmtree(out_dir, ignore_errors=True)
+        elapsed, peak_rss = run_tool(
+            [
+                str(SRC / "backfill_trending.py"),
+                "--warc", str(warc),
+                "--output-dir", str(out_dir),
+                "--records", str(out_dir / "records.jsonl"),
+                "--parse-processes", str(processes),
+            ]
+        )  # fmt: skip
+        written = sum(1 for _ in out_dir.rglob("*.atom"))
+        if written != pages:
+            raise click.ClickException(f"expected {pages} snapshots, got {written}")
+        print(
+            f"{processes:>9} {elapsed:>8.2f}s {pages / elapsed * 60:>10.0f} "
+            f"{peak_rss / 1024 / 1024:>7.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Measure how hedging and the per-request deadline of src/http_client.py cut tail latency.
+
+A local stand-in server answers every GET after a short delay, except a
+random fraction of requests that stall for much longer (simulating the
+occasional pathological trending page). The same serial sweep is run with:
+
+- plain    : RequestsTransport only
+- deadline : HedgedTransport(deadline=...) - stalled requests fail as timeouts
+- hedge    : HedgedTransport(hedge=True) - stalled requests get a duplicate
+
+and the script reports wall time, latency percentiles and how many
+requests were hedged or cut off.
+
+Usage:
+    uv run benchmarks/bench_hedging.py --requests 200 --slow-ratio 0.02 --slow-delay 3
+"""
+
+import sys
+import time
+import random
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from http_client import HedgedTransport, RequestsTransport  # noqa: E402
+from requests.exceptions import Timeout  # noqa: E402
+
+
+class SlowHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def start_server(
+    delay: float, slow_ratio: float, slow_delay: float, seed: int
+) -> SlowHTTPServer:
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    body = b"<html><body>trending</body></html>"
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with lock:
+                slow = rng.random() < slow_ratio
+            time.sleep(slow_delay if slow else delay)
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # ヘッジや期限切れで見捨てられたリクエスト
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = SlowHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run(name: str, transport, url: str, count: int) -> None:
+    latencies: list[float] = []
+    timeouts = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            response = transport.get(url, (5, 30))
+            assert response.status_code == 200
+        except Timeout:
+            timeouts += 1
+        latencies.append(time.perf_counter() - started)
+    elapsed = time.perf_counter() - start
+
+    line = (
+        f"{name:<9}: {elapsed:6.2f}s  p50={percentile(latencies, 0.5):.3f}s "
+        f"p95={percentile(latencies, 0.95):.3f}s p99={percentile(latencies, 0.99):.3f}s "
+        f"max={max(latencies):.3f}s  timeouts={timeouts}"
+    )
+    if isinstance(transport, HedgedTransport):
+        line += f"  hedged={transport.stats.hedged} (won {transport.stats.hedge_wins})"
+    print(line)
+    transport.close()
+
+
+@click.command()
+@click.option(
+    "--requests", "count", type=click.IntRange(min=1), default=200, show_default=True
+)
+@click.option(
+    "--delay",
+    type=float,
+    default=0.02,
+    show_default=True,
+    help="usual server-side delay per request (seconds)",
+)
+@click.option(
+    "--slow-ratio",
+    type=click.FloatRange(min=0, max=1),
+    default=0.02,
+    show_default=True,
+    help="fraction of requests that stall",
+)
+@click.option(
+    "--slow-delay",
+    type=float,
+    default=3.0,
+    show_default=True,
+    help="delay of a stalled request (seconds)",
+)
+@click.option(
+    "--deadline",
+    type=float,
+    default=0.5,
+    show_default=True,
+    help="per-request deadline of the deadline run (seconds)",
+)
+@click.option(
+    "--hedge-budget",
+    type=click.FloatRange(min=0, max=1),
+    default=0.1,
+    show_default=True,
+)
+@click.option("--seed", type=int, default=3, show_default=True)
+def main(
+    count: int,
+    delay: float,
+    slow_ratio: float,
+    slow_delay: float,
+    deadline: float,
+    hedge_budget: float,
+    seed: int,
+):
+    runs = [
+        ("plain", lambda: RequestsTransport(pool_size=4)),
+        (
+            "deadline",
+            lambda: HedgedTransport(RequestsTransport(pool_size=4), deadline=deadline),
+        ),
+        (
+            "hedge",
+            lambda: HedgedTransport(
+                RequestsTransport(pool_size=4), hedge=True, hedge_budget=hedge_budget
+            ),
+        ),
+    ]
+    for name, create in runs:
+        # どの実行も同じ順番で遅い応答が来るよう、サーバーを作り直す
+        server = start_server(delay, slow_ratio, slow_delay, seed)
+        run(
+            name,
+            create(),
+            f"http://127.0.0.1:{server.server_address[1]}/trending",
+            count,
+        )
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
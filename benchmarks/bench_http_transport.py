@@ -0,0 +1,222 @@
+"""Compare the requests (HTTP/1.1) and HTTP/2 transports of src/http_client.py.
+
+Two local stand-in servers answer every GET with the same body after the same
+artificial delay (simulating GitHub's response time):
+
+- HTTP/1.1: http.server.ThreadingHTTPServer
+- HTTP/2  : asyncio + h2 speaking h2c with prior knowledge
+
+Both transports fetch the same number of pages with the same concurrency,
+and the script reports wall time and the number of TCP connections each
+server accepted.
+
+Usage:
+    uv run --with 'httpx[http2]' benchmarks/bench_http_transport.py --requests 200 --workers 16
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from http_client import Http2Transport, RequestsTransport  # noqa: E402
+
+
+def make_body(size: int) -> bytes:
+    row = b'<article class="Box-row"><h2><a href="/owner/repo">owner / repo</a></h2></article>\n'
+    return (row * (size // len(row) + 1))[:size]
+
+
+class CountingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def start_http1_server(body: bytes, delay: float) -> CountingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = CountingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Http2Server:
+    """Minimal h2c (prior knowledge) server on asyncio + h2, run in a background thread."""
+
+    def __init__(self, body: bytes, delay: float):
+        self.body = body
+        self.delay = delay
+        self.connections = 0
+        self.port = 0
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0)
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        self.connections += 1
+        conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+
+        # 送信待ちのボディ (stream_id -> 残りのバイト列) と、ウィンドウが開くのを待つイベント
+        pending: dict[int, bytes] = {}
+        window_opened = asyncio.Event()
+
+        async def respond(stream_id: int) -> None:
+            await asyncio.sleep(self.delay)
+            conn.send_headers(
+                stream_id,
+                [
+                    (":status", "200"),
+                    ("content-type", "text/html; charset=utf-8"),
+                    ("content-length", str(len(self.body))),
+                ],
+            )
+            pending[stream_id] = self.body
+            while pending.get(stream_id):
+                data = pending[stream_id]
+                window = min(
+                    conn.local_flow_control_window(stream_id),
+                    conn.max_outbound_frame_size,
+                )
+                if window <= 0:
+                    window_opened.clear()
+                    await window_opened.wait()
+                    continue
+                chunk, pending[stream_id] = data[:window], data[window:]
+                conn.send_data(stream_id, chunk, end_stream=not pending[stream_id])
+                writer.write(conn.data_to_send())
+                await writer.drain()
+            pending.pop(stream_id, None)
+
+        tasks = set()
+        try:
+            while True:
+                data = await reader.read(65535)
+                if not data:
+                    break
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        task = asyncio.create_task(respond(event.stream_id))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                    elif isinstance(event, h2.events.WindowUpdated):
+                        window_opened.set()
+                    elif isinstance(event, h2.events.StreamReset):
+                        pending.pop(event.stream_id, None)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                writer.write(conn.data_to_send())
+                await writer.drain()
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+
+def run(transport, url: str, count: int, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for response in executor.map(lambda _: transport.get(url, 30), range(count)):
+            assert response.status_code == 200
+    elapsed = time.perf_counter() - start
+    transport.close()
+    return elapsed
+
+
+@click.command()
+@click.option(
+    "--requests", "count", type=click.IntRange(min=1), default=200, show_default=True
+)
+@click.option("--workers", type=click.IntRange(min=1), default=16, show_default=True)
+@click.option(
+    "--delay",
+    type=float,
+    default=0.05,
+    show_default=True,
+    help="server-side delay per request (seconds)",
+)
+@click.option(
+    "--body-size",
+    type=click.IntRange(min=1),
+    default=300_000,
+    show_default=True,
+    help="response size (bytes)",
+)
+def main(count: int, workers: int, delay: float, body_size: int):
+    body = make_body(body_size)
+
+    http1 = start_http1_server(body, delay)
+    elapsed = run(
+        RequestsTransport(pool_size=workers),
+        f"http://127.0.0.1:{http1.server_address[1]}/trending",
+        count,
+        workers,
+    )
+    print(
+        f"requests (HTTP/1.1): {elapsed:.2f}s  {count / elapsed:.1f} req/s  connections={http1.connections}"
+    )
+    http1.shutdown()
+
+    http2 = Http2Server(body, delay)
+    elapsed = run(
+        Http2Transport(pool_size=workers, http1=False),
+        f"http://127.0.0.1:{http2.port}/trending",
+        count,
+        workers,
+    )
+    print(
+        f"http2   (HTTP/2)  : {elapsed:.2f}s  {count / elapsed:.1f} req/s  connections={http2.connections}"
+    )
+    http2.stop()
+
+
+if __name__ == "__main__":
+    main()
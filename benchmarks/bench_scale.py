@@ -0,0 +1,209 @@
+"""Scaling curves of the filter/export stages over synthetic data repositories.
+
+For each history length in --days, a synthetic data repository is generated
+with benchmarks/synthetic_data_repo.py (and kept under --work-dir, so later
+runs reuse it). Then the existing tools are run over it as separate
+processes:
+
+- export-all     : export_unique_urls.py --pattern "*.atom" (every archive, rglob)
+- export-current : export_unique_urls.py --pattern daily.atom (current feeds only)
+- filter         : filter_new_arrivals.py against urls-daily.txt
+
+Each run reports wall time, peak RSS of the tool process and the number of
+feed files it had to read per second. --results also writes one JSON line
+per run, to plot the curves.
+
+Usage:
+    uv run benchmarks/bench_scale.py --work-dir /tmp/scale --days 30 --days 365 --days 3650
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from pathlib import Path
+
+import click
+
+from synthetic_data_repo import generate
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+def count_files(root: Path, current_only: bool) -> int:
+    # 計測の外で数える
+    if current_only:
+        return sum(1 for _ in root.glob("*/daily.atom"))
+    return sum(1 for _ in root.rglob("*.atom"))
+
+
+# ツールを同じプロセス内で実行し、終了時にそのプロセスのピークRSS (VmHWM) を書き出す
+# (wait4 の ru_maxrss は fork 元のハーネスのメモリも含んでしまう)
+RSS_PROBE = """
+import os, sys, atexit, runpy
+
+rss_path, script = sys.argv[1], sys.argv[2]
+
+def report():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                with open(rss_path, "w") as out:
+                    out.write(line.split()[1])
+
+if os.path.exists("/proc/self/status"):
+    atexit.register(report)
+sys.argv = [script, *sys.argv[3:]]
+sys.path.insert(0, os.path.dirname(script))
+runpy.run_path(script, run_name="__main__")
+"""
+
+
+def run_tool(args: list[str]) -> tuple[float, int]:
+    """Run one tool to completion; returns (wall seconds, peak RSS in bytes)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        rss_path = Path(tmp) / "rss"
+        # パイプだと読み出す前に詰まりうるので、stderrは一時ファイルに受ける
+        with (Path(tmp) / "stderr").open("w+b") as stderr:
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "-c", RSS_PROBE, str(rss_path), *args],
+                stdout=subprocess.DEVNULL,
+                stderr=stderr,
+            )
+            _, status, usage = os.wait4(process.pid, 0)
+            elapsed = time.perf_counter() - started
+            returncode = os.waitstatus_to_exitcode(status)
+            process.returncode = returncode
+            if returncode != 0:
+                stderr.seek(0)
+                raise click.ClickException(
+                    f"{' '.join(args)} exited with {returncode}\n"
+                    + stderr.read().decode("utf-8", errors="replace")
+                )
+
+        if rss_path.exists():
+            return elapsed, int(rss_path.read_text()) * 1024
+    # /proc のない環境では ru_maxrss で代用する (Linuxは KiB、macOSはバイト)
+    scale = 1 if sys.platform == "darwin" else 1024
+    return elapsed, usage.ru_maxrss * scale
+
+
+@click.command()
+@click.option(
+    "--work-dir",
+    "workDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=True,
+    help="生成したデータリポジトリと出力を置くディレクトリ",
+)
+@click.option(
+    "--days",
+    "daysList",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=(30, 90, 365),
+    show_default=True,
+    help="履歴の日数 (複数指定で曲線にする. 10年なら 3650)",
+)
+@click.option("--languages", type=click.IntRange(min=1), default=50, show_default=True)
+@click.option("--entries", type=click.IntRange(min=1), default=25, show_default=True)
+@click.option(
+    "--churn", type=click.FloatRange(min=0, max=1), default=0.2, show_default=True
+)
+@click.option(
+    "--urls-size",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="urls-daily.txt の行数の下限",
+)
+@click.option(
+    "--results",
+    "resultsPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="結果を1実行1行のJSONで追記するファイル",
+)
+def main(
+    workDir: Path,
+    daysList: tuple[int, ...],
+    languages: int,
+    entries: int,
+    churn: float,
+    urls_size: int,
+    resultsPath: Path | None,
+):
+    print(
+        f"{'days':>6} {'stage':<15} {'files':>8} {'wall':>9} {'peak RSS':>10} {'files/s':>10}"
+    )
+    for days in sorted(set(daysList)):
+        data_dir = (
+            workDir / f"data-{languages}l-{days}d-{entries}e-{churn:g}c-{urls_size}u"
+        )
+        if not (data_dir / "urls-daily.txt").exists():
+            generate(data_dir, languages, days, entries, churn, urls_size=urls_size)
+        feeds_dir = data_dir / "docs" / "feeds"
+        out_dir = workDir / "out"
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        runs = [
+            (
+                "export-all",
+                False,
+                [
+                    str(SRC / "export_unique_urls.py"),
+                    "--dir", str(feeds_dir),
+                    "--output", str(out_dir / "urls-all.txt"),
+                    "--pattern", "*.atom",
+                ],
+            ),
+            (
+                "export-current",
+                True,
+                [
+                    str(SRC / "export_unique_urls.py"),
+                    "--dir", str(feeds_dir),
+                    "--output", str(out_dir / "urls-current.txt"),
+                    "--pattern", "daily.atom",
+                ],
+            ),
+            (
+                "filter",
+                True,
+                [
+                    str(SRC / "filter_new_arrivals.py"),
+                    "--dir", str(feeds_dir),
+                    "--urls", str(data_dir / "urls-daily.txt"),
+                    "--output", str(out_dir / "new-arrivals.txt"),
+                ],
+            ),
+        ]  # fmt: skip
+        for stage, current_only, args in runs:
+            files = count_files(feeds_dir, current_only)
+            elapsed, peak_rss = run_tool(args)
+            print(
+                f"{days:>6} {stage:<15} {files:>8} {elapsed:>8.2f}s "
+                f"{peak_rss / 1024 / 1024:>7.1f} MiB {files / elapsed:>10.0f}"
+            )
+            if resultsPath:
+                with resultsPath.open("a", encoding="utf-8") as f:
+                    record = {
+                        "days": days,
+                        "languages": languages,
+                        "entries": entries,
+                        "churn": churn,
+                        "urls_size": urls_size,
+                        "stage": stage,
+                        "files": files,
+                        "wall_seconds": round(elapsed, 4),
+                        "peak_rss_bytes": peak_rss,
+                        "files_per_second": round(files / elapsed, 1),
+                    }
+                    f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
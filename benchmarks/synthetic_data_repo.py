@@ -0,0 +1,236 @@
+"""Generate a synthetic github-trending-feeds-data tree for scale benchmarks.
+
+The tree has the layout of the data repository (see src/feed_layout.py):
+
+    <output>/languages.txt
+    <output>/urls-<period>.txt
+    <output>/docs/feeds/<lang>/<period>.atom
+    <output>/docs/feeds/<lang>/<period>/<period>-YYYY-MM-DD.atom
+
+Feeds are built with the same code as the scrapers (src/atom_feed.py), so
+their size and shape match the real ones. Each language has a pool of
+trending repositories. Every snapshot replaces a `--churn` fraction of it
+with repositories that were never seen before, so the number of unique URLs
+grows with the history like it does in production.
+
+urls-<period>.txt holds every URL of the history except the newest
+snapshot's newcomers (so filter_new_arrivals.py finds exactly those). It is
+padded with unrelated URLs up to `--urls-size`.
+
+Usage:
+    uv run benchmarks/synthetic_data_repo.py --output-dir /tmp/synthetic --languages 50 --days 365
+"""
+
+import sys
+import random
+import datetime
+from dataclasses import dataclass
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from atom_feed import append_repository_entry, new_feed, to_xml  # noqa: E402
+from feed_layout import PERIODS  # noqa: E402
+from trending_repo import TrendingRepo  # noqa: E402
+
+# 期間ごとのスナップショットの間隔 (日)
+PERIOD_DAYS = {"daily": 1, "weekly": 7, "monthly": 30}
+
+FEED_URL = "https://aazw.github.io/github-trending-feeds/feeds"
+
+# 実在の言語名に近い名前 (足りない分は lang-N)
+LANGUAGE_NAMES = (
+    "python", "javascript", "typescript", "go", "rust", "java", "c%23", "c%2B%2B",
+    "c", "ruby", "php", "kotlin", "swift", "dart", "scala", "shell", "lua",
+    "haskell", "elixir", "clojure", "zig", "nim", "ocaml", "julia", "r",
+)  # fmt: skip
+
+WORDS = (
+    "fast", "simple", "modern", "tool", "library", "framework", "for", "the",
+    "with", "and", "a", "cli", "server", "client", "data", "web", "api", "open",
+    "source", "lightweight", "engine", "toolkit", "manager", "platform",
+)  # fmt: skip
+
+
+@dataclass(slots=True)
+class DataRepoStats:
+    feeds: int = 0
+    archives: int = 0
+    bytes: int = 0
+    unique_urls: int = 0
+    urls_lines: int = 0
+
+
+def language_names(count: int) -> list[str]:
+    names = list(LANGUAGE_NAMES[:count])
+    names.extend(f"lang-{i}" for i in range(len(names), count))
+    return names
+
+
+def make_repo(
+    rng: random.Random, language: str, serial: int, rank: int
+) -> TrendingRepo:
+    return TrendingRepo(
+        path=f"/owner{serial % 9973}/{language.replace('%', '')}-repo-{serial}",
+        description=" ".join(rng.choices(WORDS, k=rng.randint(4, 16))),
+        rank=rank,
+        programming_language=language,
+        stars=rng.randint(10, 200_000),
+        forks=rng.randint(0, 20_000),
+        stars_gained=rng.randint(1, 5_000),
+        contributors=tuple(f"user{rng.randint(1, 50_000)}" for _ in range(5)),
+    )
+
+
+def generate(
+    output_dir: Path,
+    languages: int,
+    days: int,
+    entries: int,
+    churn: float,
+    periods: tuple[str, ...] = ("daily",),
+    urls_size: int = 0,
+    seed: int = 1,
+    end: datetime.date | None = None,
+) -> DataRepoStats:
+    """Write the tree and return what was written."""
+    rng = random.Random(seed)
+    end = end or datetime.date(2026, 1, 1)
+    feeds_dir = output_dir / "docs" / "feeds"
+    stats = DataRepoStats()
+    names = language_names(languages)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / "languages.txt").write_text("\n".join(names) + "\n", encoding="utf-8")
+
+    serial = 0
+    for period in periods:
+        step = PERIOD_DAYS[period]
+        snapshots = [
+            end - datetime.timedelta(days=d) for d in range(days - 1, -1, -step)
+        ]
+        seen: set[str] = set()
+        newest: set[str] = set()
+        for language in names:
+            pool: list[TrendingRepo] = []
+            for i, day in enumerate(snapshots):
+                # 入れ替わり: 初回は全件、以降は churn の割合を新しいリポジトリにする
+                replace = entries if i == 0 else max(1, round(entries * churn))
+                newcomers = []
+                for _ in range(replace):
+                    serial += 1
+                    newcomers.append(make_repo(rng, language, serial, 0))
+                pool = (pool[: entries - len(newcomers)] + newcomers)[:entries]
+                rng.shuffle(pool)
+                for rank, repo in enumerate(pool, start=1):
+                    repo.rank = rank
+
+                updated = datetime.datetime.combine(day, datetime.time(), datetime.UTC)
+                feed = new_feed(
+                    f"{FEED_URL}/{language}/{period}.atom",
+                    f"GitHub Trending - {language} ({period})",
+                    updated,
+                )
+                for repo in pool:
+                    append_repository_entry(feed, repo, language, updated)
+                xml = to_xml(feed)
+
+                archive = (
+                    feeds_dir / language / period / f"{period}-{day.isoformat()}.atom"
+                )
+                archive.parent.mkdir(parents=True, exist_ok=True)
+                archive.write_text(xml, encoding="utf-8")
+                stats.archives += 1
+                stats.bytes += len(xml)
+
+                if i == len(snapshots) - 1:
+                    (feeds_dir / language / f"{period}.atom").write_text(
+                        xml, encoding="utf-8"
+                    )
+                    stats.feeds += 1
+                    stats.bytes += len(xml)
+                    newest.update(repo.url for repo in newcomers)
+                seen.update(repo.url for repo in newcomers)
+
+        # 最新のスナップショットで初めて出たもの以外が既知のURL
+        known = sorted(seen - newest)
+        padding = max(urls_size - len(known), 0)
+        with (output_dir / f"urls-{period}.txt").open("w", encoding="utf-8") as f:
+            for url in known:
+                f.write(url + "\n")
+            for i in range(padding):
+                f.write(f"https://github.com/padding{i % 9973}/repo-{i}\n")
+        stats.unique_urls += len(seen)
+        stats.urls_lines += len(known) + padding
+    return stats
+
+
+@click.command()
+@click.option(
+    "--output-dir",
+    "outputDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=True,
+    help="データリポジトリに見立てたディレクトリ (docs/feeds などを作る)",
+)
+@click.option("--languages", type=click.IntRange(min=1), default=50, show_default=True)
+@click.option(
+    "--days",
+    type=click.IntRange(min=1),
+    default=30,
+    show_default=True,
+    help="履歴の日数 (10年なら 3650)",
+)
+@click.option(
+    "--entries",
+    type=click.IntRange(min=1),
+    default=25,
+    show_default=True,
+    help="1フィードのエントリ数",
+)
+@click.option(
+    "--churn",
+    type=click.FloatRange(min=0, max=1),
+    default=0.2,
+    show_default=True,
+    help="スナップショットごとに新しいリポジトリに入れ替わる割合",
+)
+@click.option(
+    "--period",
+    "periods",
+    type=click.Choice(PERIODS, case_sensitive=True),
+    multiple=True,
+    default=("daily",),
+    show_default=True,
+)
+@click.option(
+    "--urls-size",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="urls-<period>.txt の行数の下限 (履歴のURLで足りない分を無関係なURLで埋める)",
+)
+@click.option("--seed", type=int, default=1, show_default=True)
+def main(
+    outputDir: Path,
+    languages: int,
+    days: int,
+    entries: int,
+    churn: float,
+    periods: tuple[str, ...],
+    urls_size: int,
+    seed: int,
+):
+    stats = generate(
+        outputDir, languages, days, entries, churn, periods, urls_size, seed
+    )
+    print(
+        f"{stats.feeds} feeds, {stats.archives} archives, "
+        f"{stats.bytes / 1024 / 1024:.1f} MiB, {stats.unique_urls} unique urls, "
+        f"{stats.urls_lines} lines in urls-*.txt"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+import sys
+import heapq
+import logging
+import tomllib
+import datetime
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Sequence
+from urllib.parse import unquote
+
+import click
+from lxml import etree
+
+from atom_feed import append_repository_entry, new_feed, read_feed_repos, to_xml
+from feed_layout import PERIODS, iter_feed_paths
+from scrape_trending import ScrapeError, parse_updated_date
+from trending_records import from_record, iter_records
+from trending_repo import TrendingRepo
+
+
+def setup_logging(level: int = logging.INFO) -> logging.Logger:
+    # Making Python loggers output all messages to stdout in addition to log file
+    # https://stackoverflow.com/questions/14058453/making-python-loggers-output-all-messages-to-stdout-in-addition-to-log-file
+    formatter = logging.Formatter(
+        "%(asctime)s - %(pathname)s:%(lineno)d - %(levelname)s - %(message)s"
+    )
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+
+    logger = logging.getLogger(__name__)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+    return logger
+
+
+appLogger = setup_logging()
+
+# まとめフィード1つあたりの最大エントリ数
+MAX_ENTRIES = 100
+
+
+@dataclass(slots=True)
+class FeedGroup:
+    """A combined feed: docs/aggregate/<name>/<period>.atom."""
+
+    name: str
+    title: str
+    # URLデコードした言語名 (例: "c#"). None は全言語
+    languages: frozenset[str] | None = None
+
+    def includes(self, language: str) -> bool:
+        return self.languages is None or unquote(language) in self.languages
+
+
+DEFAULT_GROUPS = (FeedGroup(name="all", title="All languages"),)
+
+
+def load_groups(path: Path) -> list[FeedGroup]:
+    """Read the groups from a TOML file.
+
+    [groups.all]
+    title = "All languages"
+
+    [groups.systems]
+    title = "Systems programming"
+    languages = ["c", "c++", "rust", "go", "zig"]
+
+    A group without `languages` covers every language.
+    """
+    with path.open("rb") as f:
+        config = tomllib.load(f)
+
+    groups: list[FeedGroup] = []
+    for name, table in config.get("groups", {}).items():
+        if not isinstance(table, dict):
+            raise ValueError(f"groups.{name} must be a table")
+        languages = table.get("languages")
+        if languages is not None and not (
+            isinstance(languages, list) and all(isinstance(x, str) for x in languages)
+        ):
+            raise ValueError(f"groups.{name}.languages must be a list of strings")
+        groups.append(
+            FeedGroup(
+                name=name,
+                title=str(table.get("title", name)),
+                languages=None
+                if languages is None
+                else frozenset(unquote(x) for x in languages),
+            )
+        )
+    if not groups:
+        raise ValueError(f"no [groups.<name>] tables in {path}")
+    return groups
+
+
+def merge_key(repo: TrendingRepo) -> tuple[int, int, str]:
+    # 順位の高い順、同順位ならスター数の多い順 (順位がない古いフィードは最後)
+    return (repo.rank or sys.maxsize, -(repo.stars or 0), repo.url)
+
+
+def merge_ranked(
+    streams: Mapping[str, Sequence[TrendingRepo]], max_entries: int
+) -> Iterator[tuple[str, TrendingRepo]]:
+    """k-way merge of the per-language results by (rank, stars), one entry per repository.
+
+    Each language contributes at most `max_entries` repositories and the
+    merge stops as soon as `max_entries` unique repositories were produced,
+    so only the heads of the k streams are compared at any time.
+    """
+
+    def ranked(
+        language: str, repos: Sequence[TrendingRepo]
+    ) -> Iterator[tuple[tuple[int, int, str], str, TrendingRepo]]:
+        for repo in heapq.nsmallest(max_entries, repos, key=merge_key):
+            yield merge_key(repo), language, repo
+
+    seen: set[str] = set()
+    streams_ranked = [ranked(language, repos) for language, repos in streams.items()]
+    for _, language, repo in heapq.merge(*streams_ranked, key=lambda item: item[:2]):
+        # 同じリポジトリが複数の言語に出ている場合は、順位の高い方だけを残す
+        if repo.path in seen:
+            continue
+        seen.add(repo.path)
+        yield language, repo
+        if len(seen) >= max_entries:
+            return
+
+
+def build_aggregate_feed(
+    group: FeedGroup,
+    period: str,
+    items: Iterable[tuple[str, TrendingRepo]],
+    updated: datetime.datetime,
+) -> str:
+    atom_advertise_url = f"https://aazw.github.io/github-trending-feeds/aggregate/{group.name}/{period}.atom"
+    atom_title = f"GitHub Trending - {group.title} ({period})"
+
+    feed = new_feed(atom_advertise_url, atom_title, updated)
+    for language, repo in items:
+        # 入力によって c%23 / c# のどちらでも来るので、表示はデコードした名前に揃える
+        name = unquote(language)
+        append_repository_entry(
+            feed,
+            repo,
+            name,
+            updated,
+            # タイトルに "[Go] " のようなprefixをつける
+            title_prefix=f"[{name}] ",
+        )
+    return to_xml(feed)
+
+
+def write_aggregates(
+    streams: Mapping[str, Sequence[TrendingRepo]],
+    period: str,
+    groups: Iterable[FeedGroup],
+    output_dir: Path,
+    updated: datetime.datetime,
+    max_entries: int = MAX_ENTRIES,
+) -> list[Path]:
+    """Write docs/aggregate/<group>/<period>.atom for each group.
+
+    `streams` maps a language to its parsed repositories; the batch scraper
+    passes what it has just parsed, so nothing is read back from disk.
+    """
+    written: list[Path] = []
+    for group in groups:
+        members = {
+            language: repos
+            for language, repos in streams.items()
+            if group.includes(language)
+        }
+        items = list(merge_ranked(members, max_entries))
+        output = output_dir / group.name / f"{period}.atom"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(
+            build_aggregate_feed(group, period, items, updated), encoding="utf-8"
+        )
+        appLogger.info(
+            f"aggregate {group.name} ({period}): {len(items)} entries "
+            f"from {len(members)} languages -> {output}"
+        )
+        written.append(output)
+    return written
+
+
+def read_feed_streams(root: Path, period: str) -> dict[str, list[TrendingRepo]]:
+    """Read <root>/<lang>/<period>.atom of every language (keyed by directory name)."""
+    streams: dict[str, list[TrendingRepo]] = {}
+    for path in iter_feed_paths(root, [f"{period}.atom"]):
+        streams[path.parent.name] = read_feed_repos(path)
+    return streams
+
+
+def read_record_streams(
+    paths: Iterable[Path], periods: Iterable[str]
+) -> dict[str, dict[str, list[TrendingRepo]]]:
+    """Group records by period and language, keeping the latest snapshot of each."""
+    wanted = set(periods)
+    snapshots: dict[tuple[str, str], str] = {}
+    streams: dict[str, dict[str, list[TrendingRepo]]] = {p: {} for p in wanted}
+    for path in paths:
+        for record in iter_records(path):
+            period = record["period"]
+            if period not in wanted:
+                continue
+            key = (period, record["language"])
+            snapshot = record["snapshot"]
+            if snapshots.get(key, "") > snapshot:
+                continue
+            if snapshots.get(key) != snapshot:
+                # 新しいスナップショットが来たら置き換える
+                snapshots[key] = snapshot
+                streams[period][record["language"]] = []
+            streams[period][record["language"]].append(from_record(record))
+    return streams
+
+
+@click.command()
+@click.option(
+    "--dir",
+    "dirPath",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    required=False,
+    help="言語ごとのフィード (<lang>/<period>.atom) のディレクトリ",
+)
+@click.option(
+    "--records",
+    "recordsPaths",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    multiple=True,
+    help="Atomの代わりにscrape_trending.pyのレコードファイル (.jsonl / .msgpack) を読む",
+)
+@click.option(
+    "--period",
+    "periods",
+    type=click.Choice(PERIODS, case_sensitive=True),
+    multiple=True,
+    default=PERIODS,
+    show_default=True,
+    help="",
+)
+@click.option(
+    "--groups",
+    "groupsPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="まとめる言語のグループ (TOML). 省略時は全言語の all のみ",
+)
+@click.option(
+    "--output-dir",
+    "outputDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("docs/aggregate"),
+    show_default=True,
+    help="<group>/<period>.atom を書き出すディレクトリ",
+)
+@click.option(
+    "--max-entries",
+    type=click.IntRange(min=1),
+    default=MAX_ENTRIES,
+    show_default=True,
+    help="1フィードあたりの最大エントリ数",
+)
+@click.option("--atom-updated-date", type=str, required=False, help="")
+def main(
+    dirPath: Path | None,
+    recordsPaths: tuple[Path, ...],
+    periods: tuple[str, ...],
+    groupsPath: Path | None,
+    outputDir: Path,
+    max_entries: int,
+    atom_updated_date: str | None,
+) -> None:
+    appLogger.info("start app")
+    appLogger.info(f"command-line argument: --dir = {dirPath}")
+    appLogger.info(f"command-line argument: --records = {list(map(str, recordsPaths))}")
+    appLogger.info(f"command-line argument: --period = {', '.join(periods)}")
+    appLogger.info(f"command-line argument: --groups = {groupsPath}")
+    appLogger.info(f"command-line argument: --output-dir = {outputDir}")
+    appLogger.info(f"command-line argument: --max-entries = {max_entries}")
+    appLogger.info(f"command-line argument: --atom-updated-date = {atom_updated_date}")
+
+    if bool(dirPath) == bool(recordsPaths):
+        appLogger.error("Exactly one of --dir or --records must be specified")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    # scrape_trending.py と同様に dateparser の DeprecationWarning を抑止する
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    try:
+        updated = parse_updated_date(atom_updated_date)
+    except ScrapeError as e:
+        appLogger.error("app failed")
+        sys.exit(e.return_code.value)
+
+    groups: Sequence[FeedGroup] = DEFAULT_GROUPS
+    if groupsPath:
+        try:
+            groups = load_groups(groupsPath)
+        except (OSError, tomllib.TOMLDecodeError, ValueError) as e:
+            appLogger.error(f"Error reading groups {groupsPath}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    record_streams: dict[str, dict[str, list[TrendingRepo]]] = {}
+    if recordsPaths:
+        try:
+            record_streams = read_record_streams(recordsPaths, periods)
+        except (OSError, ValueError, KeyError) as e:
+            appLogger.error(f"Error reading records: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    for period in dict.fromkeys(periods):
+        try:
+            if dirPath:
+                streams = read_feed_streams(dirPath, period)
+            else:
+                streams = record_streams.get(period, {})
+            write_aggregates(streams, period, groups, outputDir, updated, max_entries)
+        except etree.XMLSyntaxError as e:
+            appLogger.error(f"XML parse error: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+        except OSError as e:
+            appLogger.error(f"OS error: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    appLogger.info("app finished")
+
+
+if __name__ == "__main__":
+    main()
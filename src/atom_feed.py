@@ -0,0 +1,340 @@
+import hashlib
+import datetime
+from dataclasses import dataclass
+from pathlib import Path
+
+from lxml import etree, html
+
+from trending_repo import GITHUB_URL, TrendingRepo
+
+
+# 以下はATOMのサンプルをChatGPTで生成したもの
+#
+# <?xml version="1.0" encoding="utf-8"?>
+# <feed xmlns="http://www.w3.org/2005/Atom">
+#     <!-- 必須要素 -->
+#     <title>Example Feed</title>
+#     <id>http://example.org/feed</id>
+#     <updated>2024-12-28T18:30:02Z</updated>
+#
+#     <!-- オプション要素 -->
+#     <subtitle>This is an example of an Atom feed with all elements.</subtitle>
+#     <icon>http://example.org/icon.png</icon>
+#     <logo>http://example.org/logo.png</logo>
+#     <rights>Copyright 2024 Example Organization</rights>
+#     <generator uri="http://example.org/generator" version="1.0">Example Generator</generator>
+#     <link rel="self" href="http://example.org/feed" />
+#     <link rel="alternate" href="http://example.org/" />
+#     <author>
+#         <name>John Doe</name>
+#         <email>johndoe@example.org</email>
+#         <uri>http://example.org/authors/johndoe</uri>
+#     </author>
+#     <contributor>
+#         <name>Jane Smith</name>
+#     </contributor>
+#
+#     <!-- エントリ（記事） -->
+#     <entry>
+#         <!-- 必須要素 -->
+#         <title>Example Entry</title>
+#         <id>http://example.org/entry1</id>
+#         <updated>2024-12-28T18:30:02Z</updated>
+#
+#         <!-- オプション要素 -->
+#         <summary>This is a summary of the example entry.</summary>
+#         <content type="html">
+#             <![CDATA[
+#                 <p>This is the content of the example entry. It can include HTML.</p>
+#             ]]>
+#         </content>
+#         <link rel="alternate" href="http://example.org/entry1" />
+#         <author>
+#             <name>John Doe</name>
+#         </author>
+#         <contributor>
+#             <name>Jane Smith</name>
+#         </contributor>
+#         <category term="Technology" scheme="http://example.org/categories" label="Tech" />
+#         <published>2024-12-27T12:00:00Z</published>
+#         <rights>Copyright 2024 Example Organization</rights>
+#         <source>
+#             <id>http://example.org/source</id>
+#             <title>Source Feed</title>
+#             <updated>2024-12-28T12:00:00Z</updated>
+#         </source>
+#     </entry>
+# </feed>
+
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+# エントリに付ける拡張要素 (順位、スター数など) の名前空間
+# Atomの仕様上、未知の名前空間の要素はリーダーに無視される
+TRENDING_NAMESPACE = "https://aazw.github.io/github-trending-feeds/ns/trending"
+ATOM_AUTHOR = "aazw"
+ATOM_ICON = "https://github.githubassets.com/favicons/favicon.svg"
+SITE_URL = "https://aazw.github.io/github-trending-feeds/"
+
+NS = {"a": ATOM_NAMESPACE, "trending": TRENDING_NAMESPACE}
+
+
+@dataclass(slots=True)
+class EntryState:
+    id: str
+    updated: str
+    digest: str
+
+
+@dataclass(slots=True)
+class FeedState:
+    """<updated> and entries (keyed by repository URL) of a previously written feed."""
+
+    updated: str
+    entries: dict[str, EntryState]
+
+
+def new_feed(
+    atom_advertise_url: str, atom_title: str, updated: datetime.datetime
+) -> etree._Element:
+    """Create a <feed> with the header elements shared by all generated feeds."""
+    # new feed
+    feed = etree.Element(
+        f"{{{ATOM_NAMESPACE}}}feed", nsmap={"trending": TRENDING_NAMESPACE}
+    )
+    feed.set("{http://www.w3.org/XML/1998/namespace}lang", "en")
+
+    # id
+    etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}id").text = atom_advertise_url
+
+    # title
+    etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}title").text = atom_title
+
+    # link (self)
+    etree.SubElement(
+        feed, f"{{{ATOM_NAMESPACE}}}link", href=atom_advertise_url, rel="self"
+    )
+
+    # link (alternate)
+    etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}link", href=SITE_URL, rel="alternate")
+
+    # icon
+    etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}icon").text = ATOM_ICON
+
+    # updated
+    etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}updated").text = updated.isoformat(
+        timespec="seconds"
+    )
+
+    # author
+    author = etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}author")
+    etree.SubElement(author, f"{{{ATOM_NAMESPACE}}}name").text = ATOM_AUTHOR
+
+    return feed
+
+
+def append_repository_entry(
+    feed: etree._Element,
+    repo: TrendingRepo,
+    language: str,
+    updated: datetime.datetime,
+    title_prefix: str = "",
+    entry_id: str | None = None,
+) -> etree._Element:
+    """Append the <entry> of one trending repository.
+
+    The id defaults to one that changes every run; pass `entry_id` to keep it stable.
+    """
+    repository_url = repo.url
+    repository_name = repo.repository
+
+    # new entry
+    entry = etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}entry")
+
+    # id
+    etree.SubElement(entry, f"{{{ATOM_NAMESPACE}}}id").text = entry_id or (
+        f"urn:github:{repository_name.replace('/', ':')}:{int(updated.timestamp())}"
+    )
+
+    # title
+    etree.SubElement(
+        entry, f"{{{ATOM_NAMESPACE}}}title"
+    ).text = f"{title_prefix}{repository_name}"
+
+    # link
+    etree.SubElement(entry, f"{{{ATOM_NAMESPACE}}}link", href=repository_url)
+
+    # updated
+    etree.SubElement(entry, f"{{{ATOM_NAMESPACE}}}updated").text = updated.isoformat(
+        timespec="seconds"
+    )
+
+    # content
+    content = etree.SubElement(entry, f"{{{ATOM_NAMESPACE}}}content", type="html")
+    content_html = f"""<div>
+<div><strong>URL:</strong> <a href="{repository_url}">{repository_url}</a></div>
+<div><strong>Language:</strong> {language}</div>
+<hr>
+<div>{repo.description}</div>
+</div>"""
+    content.text = content_html
+
+    # trending extensions
+    metadata: list[tuple[str, object]] = [
+        ("rank", repo.rank or None),
+        ("stars", repo.stars),
+        ("forks", repo.forks),
+        ("starsGained", repo.stars_gained),
+        ("programmingLanguage", repo.programming_language),
+    ]
+    metadata.extend(("builtBy", login) for login in repo.contributors)
+    for name, value in metadata:
+        if value is not None:
+            etree.SubElement(entry, f"{{{TRENDING_NAMESPACE}}}{name}").text = str(value)
+
+    return entry
+
+
+def stable_entry_id_prefix(repo: TrendingRepo, language: str, period: str) -> str:
+    return f"urn:github:{repo.repository.replace('/', ':')}:{language}:{period}:"
+
+
+def stable_entry_id(
+    repo: TrendingRepo, language: str, period: str, since: datetime.datetime
+) -> str:
+    """Id of one trending streak: fixed while the repository stays in the feed."""
+    return f"{stable_entry_id_prefix(repo, language, period)}{int(since.timestamp())}"
+
+
+def entry_digest(entry: etree._Element) -> str:
+    """Hash of what readers display (title, link, content).
+
+    The trending extension elements (rank, stars, ...) change every run
+    and are left out, so they do not mark an entry as updated.
+    """
+    link = entry.find("a:link", NS)
+    parts = [
+        entry.findtext("a:title", "", NS),
+        link.get("href", "") if link is not None else "",
+        entry.findtext("a:content", "", NS),
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def read_feed_state(path: Path) -> FeedState | None:
+    """Read a feed written earlier; None if it does not exist.
+
+    Raises OSError / etree.XMLSyntaxError for unreadable files.
+    """
+    if not path.exists():
+        return None
+    return feed_state(etree.parse(path, etree.XMLParser()).getroot())
+
+
+def feed_state(root: etree._Element) -> FeedState:
+    """The entry ids, <updated> and digests of a parsed feed."""
+    entries: dict[str, EntryState] = {}
+    for entry in root.findall("a:entry", NS):
+        link = entry.find("a:link", NS)
+        entry_id = entry.findtext("a:id", None, NS)
+        updated = entry.findtext("a:updated", None, NS)
+        if link is None or not link.get("href") or not entry_id or not updated:
+            continue
+        entries[link.get("href", "")] = EntryState(
+            id=entry_id, updated=updated, digest=entry_digest(entry)
+        )
+    return FeedState(updated=root.findtext("a:updated", "", NS), entries=entries)
+
+
+def carry_over_updated(feed: etree._Element, previous: FeedState) -> int:
+    """Keep the previous <updated> of unchanged entries and of the feed.
+
+    An entry keeps its <updated> when its id and digest match the previous
+    feed. The feed keeps its <updated> when the set of entry ids is the same
+    and no entry changed. Returns the number of new or changed entries.
+    """
+    changed = 0
+    entry_ids: set[str] = set()
+    for entry in feed.findall("a:entry", NS):
+        link = entry.find("a:link", NS)
+        entry_id = entry.findtext("a:id", "", NS)
+        entry_ids.add(entry_id)
+        prev = previous.entries.get(link.get("href", "")) if link is not None else None
+        if (
+            prev is not None
+            and prev.id == entry_id
+            and prev.digest == entry_digest(entry)
+        ):
+            updated_element = entry.find("a:updated", NS)
+            if updated_element is not None:
+                updated_element.text = prev.updated
+        else:
+            changed += 1
+
+    previous_ids = {state.id for state in previous.entries.values()}
+    if changed == 0 and entry_ids == previous_ids and previous.updated:
+        updated_element = feed.find("a:updated", NS)
+        if updated_element is not None:
+            updated_element.text = previous.updated
+    return changed
+
+
+def _int_or_none(text: str | None) -> int | None:
+    return int(text) if text and text.isdigit() else None
+
+
+def read_feed_repos(path: Path) -> list[TrendingRepo]:
+    """Read the repositories back from a feed written by append_repository_entry()."""
+    return feed_repos(etree.parse(path, etree.XMLParser()).getroot())
+
+
+def feed_repos(root: etree._Element) -> list[TrendingRepo]:
+    """The repositories of a parsed feed, in document order.
+
+    Rank, stars, etc. come from the trending extension elements (None/0 in
+    feeds written before they existed); the description comes from the
+    last <div> of the content HTML.
+    """
+    repos: list[TrendingRepo] = []
+    for entry in root.findall("a:entry", NS):
+        link = entry.find("a:link", NS)
+        href = link.get("href") if link is not None else None
+        if not href or not href.startswith(GITHUB_URL):
+            continue
+
+        description = ""
+        content = entry.findtext("a:content", "", NS)
+        if content:
+            divs = html.fragment_fromstring(content, create_parent="div").findall(
+                ".//div"
+            )
+            if divs:
+                description = divs[-1].text_content().strip()
+
+        repos.append(
+            TrendingRepo(
+                path=href.removeprefix(GITHUB_URL),
+                description=description,
+                rank=_int_or_none(entry.findtext("trending:rank", None, NS)) or 0,
+                programming_language=entry.findtext(
+                    "trending:programmingLanguage", None, NS
+                ),
+                stars=_int_or_none(entry.findtext("trending:stars", None, NS)),
+                forks=_int_or_none(entry.findtext("trending:forks", None, NS)),
+                stars_gained=_int_or_none(
+                    entry.findtext("trending:starsGained", None, NS)
+                ),
+                contributors=tuple(
+                    element.text
+                    for element in entry.findall("trending:builtBy", NS)
+                    if element.text
+                ),
+            )
+        )
+    return repos
+
+
+def to_xml(feed: etree._Element) -> str:
+    # pretty print
+    etree.indent(feed)
+
+    # get xml
+    return etree.tostring(feed, encoding="utf-8", xml_declaration=True).decode("utf-8")
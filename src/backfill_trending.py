@@ -0,0 +1,374 @@
+import os
+import sys
+import time
+import logging
+import warnings
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Sequence
+from urllib.parse import unquote
+
+import click
+
+from feed_layout import PERIODS, read_languages
+from scrape_trending import ScrapeError, build_atom_feed, write_feed
+from scrape_trending_batch import parse_page
+from sweep_pipeline import Job, run_pipeline
+from trending_archive import (
+    ArchivedPage,
+    iter_html_pages,
+    iter_warc_pages,
+    normalize_language,
+    trending_rows_html,
+)
+from trending_records import RecordWriter, to_records
+from trending_repo import TrendingRepo
+
+
+def setup_logging(level: int = logging.INFO) -> logging.Logger:
+    # Making Python loggers output all messages to stdout in addition to log file
+    # https://stackoverflow.com/questions/14058453/making-python-loggers-output-all-messages-to-stdout-in-addition-to-log-file
+    formatter = logging.Formatter(
+        "%(asctime)s - %(pathname)s:%(lineno)d - %(levelname)s - %(message)s"
+    )
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+
+    logger = logging.getLogger(__name__)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+    return logger
+
+
+appLogger = setup_logging()
+
+# アーカイブの読み出しは1本のストリームなので、I/Oスレッドはデコード (gzip/chunked) の分だけあればよい
+READ_THREADS = 2
+
+# 進捗を出す間隔 (ページ数)
+PROGRESS_EVERY = 1000
+
+
+@dataclass(slots=True)
+class BackfillConfig:
+    output_dir: Path
+    warc_paths: Sequence[Path] = ()
+    html_dirs: Sequence[Path] = ()
+    records_path: Path | None = None
+    # languages.txt の表記. None なら全言語
+    languages: frozenset[str] | None = None
+    periods: tuple[str, ...] = PERIODS
+    overwrite: bool = False
+    parse_processes: int = 0
+    queue_size: int = 64
+
+
+@dataclass(slots=True)
+class BackfillStats:
+    pages: int = 0
+    written: int = 0
+    # 同じ言語・期間・日付の2件目以降の取得 (最初の1件を使う)
+    duplicates: int = 0
+    existing: int = 0
+    filtered: int = 0
+    empty: int = 0
+    failed: int = 0
+    unusable: int = 0
+    failed_sources: list[str] = field(default_factory=list)
+
+
+def archive_relative_path(language: str, period: str, snapshot: str) -> str:
+    # scrape_daemon.py / ワークフローが作るアーカイブと同じ場所
+    return f"{unquote(language)}/{period}/{period}-{snapshot}.atom"
+
+
+def run_backfill(config: BackfillConfig) -> BackfillStats:
+    """Parse the saved pages in parallel and write one dated feed (and records) per page.
+
+    Sources are read one record at a time in a single stream; existing
+    snapshots are kept unless `overwrite`. Unreadable sources are logged
+    and skipped; a feed or record that cannot be written raises
+    ScrapeError or OSError.
+    """
+    stats = BackfillStats()
+    seen: set[str] = set()
+    # I/Oスレッドが取り出すまでのページ (キーを渡してから fetch で取り出すので、高々 READ_THREADS 件)
+    pending: dict[str, ArchivedPage] = {}
+
+    def skipped(source: str, reason: str) -> None:
+        stats.unusable += 1
+        appLogger.warning(f"skipped {source}: {reason}")
+
+    def guarded(source: Path, pages: Iterator[ArchivedPage]) -> Iterator[ArchivedPage]:
+        # 壊れたアーカイブはそこで読むのをやめ、次のソースへ進む
+        try:
+            yield from pages
+        except (OSError, EOFError, ValueError) as e:
+            appLogger.error(f"cannot read {source}: {e}")
+            stats.failed_sources.append(str(source))
+
+    def iter_pages() -> Iterator[ArchivedPage]:
+        for path in config.warc_paths:
+            yield from guarded(path, iter_warc_pages(path, skipped))
+        for root in config.html_dirs:
+            yield from guarded(root, iter_html_pages(root, skipped))
+
+    def keys() -> Iterator[str]:
+        # run_pipeline のI/Oスレッドからロックつきで呼ばれる
+        for page in iter_pages():
+            stats.pages += 1
+            if (
+                config.languages is not None and page.language not in config.languages
+            ) or page.period not in config.periods:
+                stats.filtered += 1
+                continue
+            key = archive_relative_path(page.language, page.period, page.snapshot)
+            if key in seen:
+                stats.duplicates += 1
+                continue
+            seen.add(key)
+            if not config.overwrite and (config.output_dir / key).exists():
+                stats.existing += 1
+                continue
+            pending[key] = page
+            yield key
+
+    def fetch(key: str) -> Job:
+        page = pending.pop(key)
+        started = time.monotonic()
+        try:
+            # パース段 (別プロセス) へ送るのはリポジトリの行の部分だけ
+            text = trending_rows_html(page.read())
+        except (OSError, ValueError) as e:
+            return Job(key, fetched=e, fetch_elapsed=time.monotonic() - started)
+        # 書き込み段まで運ぶのはページの情報だけ (本文はパース段へ)
+        page.body = None
+        return Job(
+            key,
+            fetched=page,
+            payload=text,
+            fetch_elapsed=time.monotonic() - started,
+        )
+
+    records: RecordWriter | None = None
+    if config.records_path:
+        records = RecordWriter(config.records_path, append=True)
+
+    started = time.monotonic()
+
+    def write(job: Job) -> None:
+        if isinstance(job.fetched, Exception):
+            stats.failed += 1
+            appLogger.warning(f"cannot decode {job.key}: {job.fetched}")
+            return
+        page: ArchivedPage = job.fetched
+        outcome: list[TrendingRepo] | ScrapeError = job.parsed
+        if isinstance(outcome, ScrapeError):
+            stats.failed += 1
+            appLogger.warning(f"cannot parse {page.source}: {outcome}")
+            return
+        if not outcome:
+            # マークアップの違う古いページなど
+            stats.empty += 1
+            appLogger.debug(f"no repositories in {page.source}")
+            return
+
+        write_feed(
+            config.output_dir / job.key,
+            build_atom_feed(page.language, page.period, outcome, page.captured),
+        )
+        if records:
+            records.write(
+                to_records(outcome, page.language, page.period, page.captured)
+            )
+        stats.written += 1
+        if stats.written % PROGRESS_EVERY == 0:
+            elapsed = time.monotonic() - started
+            appLogger.info(
+                f"{stats.written} snapshots written "
+                f"({stats.written / elapsed * 60:.0f} pages/min)"
+            )
+
+    try:
+        stages, wall = run_pipeline(
+            keys(),
+            fetch,
+            parse_page,
+            write,
+            io_workers=READ_THREADS,
+            parse_processes=config.parse_processes,
+            queue_size=config.queue_size,
+        )
+    finally:
+        if records:
+            records.close()
+
+    appLogger.info(
+        f"pipeline: {wall:.1f}s, "
+        + ", ".join(
+            f"{stage.name} {stage.utilization(wall):.0%} of {stage.workers} "
+            f"({stage.items} items)"
+            for stage in stages
+        )
+    )
+    return stats
+
+
+@click.command()
+@click.option(
+    "--warc",
+    "warcPaths",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    multiple=True,
+    help="トレンドページを含むWARCファイル (.warc / .warc.gz, 複数指定可)",
+)
+@click.option(
+    "--html-dir",
+    "htmlDirs",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    multiple=True,
+    help="保存したHTMLのディレクトリ (<lang>/<period>/<YYYYMMDDhhmmss または YYYY-MM-DD を含む名前>.html, 複数指定可)",
+)
+@click.option(
+    "--output-dir",
+    "outputDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=True,
+    help="フィードの出力先 (docs/feeds). <lang>/<period>/<period>-YYYY-MM-DD.atom を書き込む",
+)
+@click.option(
+    "--records",
+    "recordsPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="レコードを追記するファイル (.jsonl / .msgpack)",
+)
+@click.option(
+    "--languages",
+    "languagesPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="対象の言語 (languages.txt). 省略時はアーカイブにある全言語",
+)
+@click.option(
+    "--period",
+    "periods",
+    type=click.Choice(PERIODS, case_sensitive=True),
+    multiple=True,
+    default=PERIODS,
+    show_default=True,
+)
+@click.option(
+    "--overwrite",
+    is_flag=True,
+    default=False,
+    help="既にある日付のフィードも上書きする (省略時は残す)",
+)
+@click.option(
+    "--parse-processes",
+    type=click.IntRange(min=0),
+    default=os.cpu_count() or 1,
+    show_default="CPU数",
+    help="HTMLのパースに使うプロセス数 (0 は読み出しスレッドでパースする)",
+)
+@click.option(
+    "--queue-size",
+    type=click.IntRange(min=1),
+    default=64,
+    show_default=True,
+    help="読み出し・パース・書き込みの段の間で待たせておくページ数の上限",
+)
+@click.option("--verbose", is_flag=True, default=False, show_default=True, help="")
+def main(
+    warcPaths: tuple[Path, ...],
+    htmlDirs: tuple[Path, ...],
+    outputDir: Path,
+    recordsPath: Path | None,
+    languagesPath: Path | None,
+    periods: tuple[str, ...],
+    overwrite: bool,
+    parse_processes: int,
+    queue_size: int,
+    verbose: bool,
+) -> None:
+    appLogger.info("start app")
+    appLogger.info(f"command-line argument: --warc = {warcPaths}")
+    appLogger.info(f"command-line argument: --html-dir = {htmlDirs}")
+    appLogger.info(f"command-line argument: --output-dir = {outputDir}")
+    appLogger.info(f"command-line argument: --records = {recordsPath}")
+    appLogger.info(f"command-line argument: --languages = {languagesPath}")
+    appLogger.info(f"command-line argument: --period = {periods}")
+    appLogger.info(f"command-line argument: --overwrite = {overwrite}")
+    appLogger.info(f"command-line argument: --parse-processes = {parse_processes}")
+    appLogger.info(f"command-line argument: --queue-size = {queue_size}")
+
+    if verbose:
+        appLogger.setLevel(logging.DEBUG)
+    else:
+        # scrape_trending.py と同様に dateparser の DeprecationWarning を抑止する
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+        # フィードごとの "generated: ..." は数千ページ分になるので出さない
+        logging.getLogger("scrape_trending").setLevel(logging.WARNING)
+
+    if not warcPaths and not htmlDirs:
+        appLogger.error("specify at least one --warc or --html-dir")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    languages: frozenset[str] | None = None
+    if languagesPath:
+        languages = frozenset(
+            normalize_language(language) for language in read_languages(languagesPath)
+        )
+
+    config = BackfillConfig(
+        output_dir=outputDir,
+        warc_paths=warcPaths,
+        html_dirs=htmlDirs,
+        records_path=recordsPath,
+        languages=languages,
+        periods=periods,
+        overwrite=overwrite,
+        parse_processes=parse_processes,
+        queue_size=queue_size,
+    )
+    started = time.monotonic()
+    try:
+        stats = run_backfill(config)
+    except ScrapeError as e:
+        appLogger.error(str(e))
+        appLogger.error("app failed")
+        sys.exit(e.return_code.value)
+    except (OSError, ValueError) as e:
+        appLogger.error(f"record file error: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    elapsed = time.monotonic() - started
+
+    appLogger.info(
+        f"{stats.pages} pages read in {elapsed:.1f}s "
+        f"({stats.pages / elapsed * 60 if elapsed else 0:.0f} pages/min): "
+        f"{stats.written} snapshots written, {stats.existing} already present, "
+        f"{stats.duplicates} duplicate captures, {stats.filtered} filtered out"
+    )
+    if stats.empty or stats.failed or stats.unusable:
+        appLogger.warning(
+            f"{stats.empty} pages without repositories, {stats.failed} could not be "
+            f"decoded or parsed, {stats.unusable} unusable records or files"
+        )
+    if stats.failed_sources:
+        appLogger.error(
+            f"{len(stats.failed_sources)} sources could not be read: "
+            + ", ".join(stats.failed_sources)
+        )
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    appLogger.info("app finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 import sys
 import logging
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator
 
 import click
 from lxml import etree
 
+from feed_changes import detect_changes, select_changed, write_state
+from feed_layout import (
+    FEED_NAMES,
+    iter_feed_paths,
+    iter_manifest_feed_paths,
+    read_languages,
+)
+from trending_records import iter_records
+
 
 def setup_logging(level: int = logging.INFO) -> logging.Logger:
     # Making Python loggers output all messages to stdout in addition to log file
@@ -29,10 +38,22 @@ appLogger = setup_logging()
 NS = {"a": "http://www.w3.org/2005/Atom"}
 
 
-def iter_atom_paths(root: Path, pattern: str) -> Iterator[Path]:
-    """Iterate over files matching pattern recursively, excluding symlinked directories."""
+def iter_atom_paths(
+    root: Path, pattern: str, languages: list[str] | None = None
+) -> Iterator[Path]:
+    """Iterate over files matching pattern recursively, excluding symlinked directories.
+
+    A current feed name (daily.atom, ...) uses the layout-aware walker that
+    skips archive subdirectories; other patterns fall back to rglob.
+    """
     try:
-        yield from root.rglob(pattern, recurse_symlinks=False)
+        if pattern in FEED_NAMES:
+            if languages is not None:
+                yield from iter_manifest_feed_paths(root, languages, [pattern])
+            else:
+                yield from iter_feed_paths(root, [pattern])
+        else:
+            yield from root.rglob(pattern, recurse_symlinks=False)
     except Exception as e:
         appLogger.error(f"Error iterating paths in {root} with pattern {pattern}: {e}")
         appLogger.error("app failed")
@@ -44,9 +65,16 @@ def iter_atom_paths(root: Path, pattern: str) -> Iterator[Path]:
     "--dir",
     "dirPath",
     type=click.Path(exists=True, file_okay=False, path_type=Path),
-    required=True,
+    required=False,
     help="ファイルを再帰探索するディレクトリ",
 )
+@click.option(
+    "--records",
+    "recordsPaths",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    multiple=True,
+    help="Atomの代わりにscrape_trending.pyのレコードファイル (.jsonl / .msgpack) を読む",
+)
 @click.option(
     "--output",
     "outputPath",
@@ -60,22 +88,90 @@ def iter_atom_paths(root: Path, pattern: str) -> Iterator[Path]:
     default="*.atom",
     help="検索するファイルパターン",
 )
+@click.option(
+    "--layout-manifest",
+    "layoutManifestPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="--dir の言語一覧 (languages.txt). --pattern が daily.atom などのときディレクトリを走査せずに済む",
+)
 @click.option(
     "--incremental", is_flag=True, help="Only add new urls to existing output file"
 )
-def main(dirPath: Path, outputPath: Path, pattern: str, incremental: bool) -> None:
+@click.option(
+    "--since-commit",
+    "sinceCommit",
+    type=str,
+    required=False,
+    help="このリビジョンからHEADまでにgitで変更されたファイルだけを読む (--incremental が必要)",
+)
+@click.option(
+    "--changed-files",
+    "changedFilesPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="変更されたファイルの一覧 (バッチのマニフェスト、または1行1パス) だけを読む (--incremental が必要)",
+)
+@click.option(
+    "--state-file",
+    "statePath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="処理したHEADを記録するファイル. --since-commit 省略時は前回のリビジョンをここから読む",
+)
+def main(
+    dirPath: Path,
+    recordsPaths: tuple[Path, ...],
+    outputPath: Path,
+    pattern: str,
+    layoutManifestPath: Path | None,
+    incremental: bool,
+    sinceCommit: str | None,
+    changedFilesPath: Path | None,
+    statePath: Path | None,
+) -> None:
     appLogger.info("start app")
     appLogger.info(f"command-line argument: --dir = {dirPath}")
+    appLogger.info(f"command-line argument: --records = {list(map(str, recordsPaths))}")
     appLogger.info(f"command-line argument: --output = {outputPath}")
     appLogger.info(f"command-line argument: --pattern = {pattern}")
+    appLogger.info(f"command-line argument: --layout-manifest = {layoutManifestPath}")
     appLogger.info(f"command-line argument: --incremental = {incremental}")
+    appLogger.info(f"command-line argument: --since-commit = {sinceCommit}")
+    appLogger.info(f"command-line argument: --changed-files = {changedFilesPath}")
+    appLogger.info(f"command-line argument: --state-file = {statePath}")
+
+    if not dirPath and not recordsPaths:
+        appLogger.error("Either --dir or --records must be specified")
+        sys.exit(1)
 
     # Validate input directory
-    if not dirPath.is_dir():
+    if dirPath and not dirPath.is_dir():
         appLogger.error(f"Directory does not exist or is not a directory: {dirPath}")
         sys.exit(1)
 
-    appLogger.info(f"file searching in {dirPath} with pattern {pattern}")
+    detecting = sinceCommit or changedFilesPath or statePath
+    if detecting:
+        if sinceCommit and changedFilesPath:
+            appLogger.error(
+                "Cannot specify --since-commit and --changed-files together"
+            )
+            appLogger.error("app failed")
+            sys.exit(1)
+        if not dirPath:
+            appLogger.error(
+                "--since-commit, --changed-files and --state-file require --dir"
+            )
+            appLogger.error("app failed")
+            sys.exit(1)
+        # 変更のないファイルのURLは既存の出力にしか残っていないので、追記でないと消えてしまう
+        if not incremental:
+            appLogger.error(
+                "--since-commit, --changed-files and --state-file require --incremental"
+            )
+            appLogger.error("app failed")
+            sys.exit(1)
+
     urls: set[str] = set()
 
     # Load existing URLs if incremental mode is enabled
@@ -91,7 +187,53 @@ def main(dirPath: Path, outputPath: Path, pattern: str, incremental: bool) -> No
             appLogger.error(f"Error reading existing URLs from {outputPath}: {e}")
             sys.exit(1)
 
-    for atom_path in iter_atom_paths(dirPath, pattern):
+    # レコードファイルはURLをそのまま持っているので、XMLのパースが要らない
+    for records_path in recordsPaths:
+        appLogger.debug(f"reading {records_path}")
+        try:
+            urls.update(record["url"] for record in iter_records(records_path))
+        except (OSError, ValueError, KeyError) as e:
+            appLogger.error(f"Error reading records {records_path}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    languages: list[str] | None = None
+    if layoutManifestPath:
+        if pattern not in FEED_NAMES:
+            appLogger.error(
+                f"--layout-manifest requires --pattern to be one of {', '.join(sorted(FEED_NAMES))}"
+            )
+            appLogger.error("app failed")
+            sys.exit(1)
+        try:
+            languages = read_languages(layoutManifestPath)
+        except OSError as e:
+            appLogger.error(f"Error reading {layoutManifestPath}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    revision: str | None = None
+    atom_paths: Iterable[Path] = []
+    full_scan = True
+    if dirPath and detecting:
+        try:
+            changes = detect_changes(dirPath, sinceCommit, changedFilesPath, statePath)
+        except (OSError, ValueError, KeyError) as e:
+            appLogger.error(f"Error detecting changed files: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+        appLogger.info(f"change detection: {changes.reason}")
+        revision = changes.revision
+        if changes.paths is not None:
+            changed_paths = select_changed(changes.paths, dirPath, [pattern])
+            appLogger.info(f"{len(changed_paths)} changed files match {pattern}")
+            atom_paths = changed_paths
+            full_scan = False
+    if dirPath and full_scan:
+        appLogger.info(f"file searching in {dirPath} with pattern {pattern}")
+        atom_paths = iter_atom_paths(dirPath, pattern, languages)
+
+    for atom_path in atom_paths:
         appLogger.debug(f"reading {atom_path}")
         try:
             # Parse XML with security settings
@@ -144,6 +286,16 @@ def main(dirPath: Path, outputPath: Path, pattern: str, incremental: bool) -> No
 
     appLogger.info(f"wrote {len(urls)} unique URLs to {outputPath}")
 
+    # 出力を書き終えてから、処理済みのリビジョンを記録する
+    if statePath and revision:
+        try:
+            write_state(statePath, revision)
+        except OSError as e:
+            appLogger.error(f"Error writing state {statePath}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+        appLogger.info(f"recorded revision {revision[:12]} in {statePath}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,202 @@
+import os
+import json
+import datetime
+import subprocess
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable
+
+from feed_layout import ARCHIVE_DIR_NAMES, FEED_NAMES
+
+
+# 変更されたファイルだけを処理するための変更検出
+#
+# - --changed-files : 変更されたファイルの一覧
+#                     (scrape_trending_batch.py / merge_shards.py のマニフェスト、または1行1パスのテキスト)
+# - --since-commit  : 指定のリビジョンからHEADまでに変わったファイル (git diff-tree)
+# - --state-file    : 前回処理したHEADを記録するファイル. --since-commit を省略するとここから読む
+#
+# どれも使えないとき (stateがない、リビジョンがshallow cloneにない、gitがない) は全走査する
+GIT_TIMEOUT = 60
+
+
+class ChangeDetectionError(Exception):
+    """Changed files could not be determined; the caller falls back to a full scan."""
+
+
+def _git(cwd: Path, *args: str) -> str:
+    try:
+        completed = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            timeout=GIT_TIMEOUT,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise ChangeDetectionError(f"git {args[0]} failed: {e}") from e
+    if completed.returncode != 0:
+        raise ChangeDetectionError(
+            f"git {args[0]} failed: {completed.stderr.strip() or completed.returncode}"
+        )
+    return completed.stdout
+
+
+def git_toplevel(path: Path) -> Path:
+    return Path(_git(path, "rev-parse", "--show-toplevel").strip())
+
+
+def git_head(path: Path) -> str:
+    return _git(path, "rev-parse", "--verify", "HEAD^{commit}").strip()
+
+
+def git_changed_paths(path: Path, since: str, until: str = "HEAD") -> list[Path]:
+    """Files added or modified between two revisions of the repository containing `path`.
+
+    Uses `git diff-tree`, so only the two trees are compared and no file is
+    read. Renames are reported as a deletion plus an addition.
+    """
+    top = git_toplevel(path)
+    # shallow cloneで前回のリビジョンがない場合はここで失敗する
+    since = _git(top, "rev-parse", "--verify", f"{since}^{{commit}}").strip()
+    output = _git(
+        top,
+        "diff-tree",
+        "-r",
+        "-z",
+        "--name-only",
+        "--no-renames",
+        "--diff-filter=AM",
+        since,
+        until,
+    )
+    return [top / name for name in output.split("\0") if name]
+
+
+def read_changed_files(path: Path) -> list[Path]:
+    """Read a list of changed files.
+
+    A JSON manifest of scrape_trending_batch.py / merge_shards.py yields the
+    outputs whose `changed` is true (relative to its `output_dir`). Any other
+    file is read as one path per line, relative to the current directory.
+    """
+    with path.open("r", encoding="utf-8") as f:
+        text = f.read()
+    if path.suffix == ".json":
+        manifest = json.loads(text)
+        output_dir = path.parent / manifest["output_dir"]
+        return [
+            output_dir / result["output"]
+            for result in manifest["results"]
+            if result.get("changed")
+        ]
+    return [Path(line.strip()) for line in text.splitlines() if line.strip()]
+
+
+def read_state(path: Path) -> str | None:
+    """The last processed revision, or None when there is no state yet."""
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f).get("revision")
+    except FileNotFoundError:
+        return None
+
+
+def write_state(path: Path, revision: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "revision": revision,
+                "updated": datetime.datetime.now(datetime.timezone.utc).isoformat(
+                    timespec="seconds"
+                ),
+            },
+            f,
+            indent=2,
+        )
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+@dataclass(slots=True)
+class ChangeSet:
+    # 変更されたファイル (絶対パス). None は全走査
+    paths: frozenset[Path] | None
+    # 処理後に --state-file に記録するHEAD (gitの外ならNone)
+    revision: str | None
+    # ログ用の説明
+    reason: str
+
+
+def detect_changes(
+    root: Path,
+    since_commit: str | None = None,
+    changed_files: Path | None = None,
+    state_path: Path | None = None,
+) -> ChangeSet:
+    """Work out which files under `root` need processing.
+
+    Raises OSError / ValueError / KeyError for an unreadable --changed-files
+    list; every git problem falls back to a full scan instead.
+    """
+    revision: str | None = None
+    if state_path is not None or since_commit is not None:
+        try:
+            revision = git_head(root)
+        except ChangeDetectionError:
+            revision = None
+
+    if changed_files is not None:
+        paths = frozenset(p.resolve() for p in read_changed_files(changed_files))
+        return ChangeSet(
+            paths, revision, f"{len(paths)} files listed in {changed_files}"
+        )
+
+    since = since_commit
+    if since is None and state_path is not None:
+        since = read_state(state_path)
+        if since is None:
+            return ChangeSet(
+                None, revision, f"no previous revision in {state_path}, full scan"
+            )
+    if since is None:
+        return ChangeSet(None, revision, "full scan")
+
+    try:
+        paths = frozenset(p.resolve() for p in git_changed_paths(root, since))
+    except ChangeDetectionError as e:
+        return ChangeSet(None, revision, f"{e}; falling back to a full scan")
+    return ChangeSet(paths, revision, f"{len(paths)} files changed since {since[:12]}")
+
+
+def select_changed(
+    changed: Iterable[Path], root: Path, patterns: Iterable[str]
+) -> list[Path]:
+    """The changed files under `root` that a full scan with `patterns` would visit.
+
+    Current feed names (daily.atom, ...) exclude the archive directories,
+    as iter_feed_paths() does. Files that no longer exist are dropped.
+    """
+    root = root.resolve()
+    patterns = list(patterns)
+    selected: list[Path] = []
+    for path in changed:
+        try:
+            parts = path.relative_to(root).parts
+        except ValueError:
+            continue
+        name = parts[-1]
+        for pattern in patterns:
+            if not fnmatch(name, pattern):
+                continue
+            if pattern in FEED_NAMES and ARCHIVE_DIR_NAMES.intersection(parts[:-1]):
+                continue
+            if path.is_file():
+                selected.append(path)
+            break
+    return sorted(selected)
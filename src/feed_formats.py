@@ -0,0 +1,126 @@
+import json
+from pathlib import Path
+from typing import Any, Iterator
+
+from lxml import etree
+
+from atom_feed import ATOM_NAMESPACE, NS, TRENDING_NAMESPACE, to_xml
+
+
+# 1回組み立てたフィード (lxmlの<feed>) から、複数の形式を書き出す
+#
+# - atom     : これまでどおりのAtom
+# - jsonfeed : JSON Feed 1.1 (https://www.jsonfeed.org/version/1.1/). 1行に詰めて書き出す
+# - urls     : リポジトリのURLを1行に1つ
+#
+# どの形式もメモリ上のツリーから直接シリアライズするので、書き出したAtomを読み直すことはない
+FORMATS = ("atom", "jsonfeed", "urls")
+FORMAT_SUFFIXES = {"atom": ".atom", "jsonfeed": ".json", "urls": ".txt"}
+JSON_FEED_VERSION = "https://jsonfeed.org/version/1.1"
+
+# 拡張要素 → JSON Feed の _trending のキーと型
+TRENDING_FIELDS = {
+    "rank": ("rank", int),
+    "stars": ("stars", int),
+    "forks": ("forks", int),
+    "starsGained": ("stars_gained", int),
+    "programmingLanguage": ("programming_language", str),
+}
+
+
+def format_path(output: Path, format: str, formats: tuple[str, ...]) -> Path:
+    """Where `format` is written: `output` itself for a single format, else its suffix swapped."""
+    if len(formats) == 1:
+        return output
+    return output.with_suffix(FORMAT_SUFFIXES[format])
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _link(element: etree._Element, rel: str | None) -> str | None:
+    for link in element.findall("a:link", NS):
+        if link.get("rel") == rel:
+            return link.get("href")
+    return None
+
+
+def json_feed_item(entry: etree._Element) -> dict[str, Any]:
+    """The JSON Feed item of one <entry>; trending extensions go under `_trending`."""
+    # append_repository_entry() のリンクは rel なし
+    url = _link(entry, None) or _link(entry, "alternate")
+    item: dict[str, Any] = {
+        "id": entry.findtext("a:id", "", NS),
+        "url": url,
+        "title": entry.findtext("a:title", "", NS),
+        "content_html": entry.findtext("a:content", "", NS),
+        "date_modified": entry.findtext("a:updated", None, NS),
+    }
+    trending: dict[str, Any] = {}
+    built_by: list[str] = []
+    for child in entry:
+        if not isinstance(child.tag, str) or not child.tag.startswith(
+            f"{{{TRENDING_NAMESPACE}}}"
+        ):
+            continue
+        name = etree.QName(child).localname
+        if name == "builtBy" and child.text:
+            built_by.append(child.text)
+        elif name in TRENDING_FIELDS and child.text:
+            key, cast = TRENDING_FIELDS[name]
+            try:
+                trending[key] = cast(child.text)
+            except ValueError:
+                continue
+    if built_by:
+        trending["built_by"] = built_by
+    if trending:
+        item["_trending"] = trending
+    return {key: value for key, value in item.items() if value is not None}
+
+
+def iter_json_feed(feed: etree._Element) -> Iterator[str]:
+    """Serialize a <feed> as compact JSON Feed, one item at a time."""
+    self_url = _link(feed, "self") or feed.findtext("a:id", "", NS)
+    header: dict[str, Any] = {
+        "version": JSON_FEED_VERSION,
+        "title": feed.findtext("a:title", "", NS),
+        "home_page_url": _link(feed, "alternate"),
+        "feed_url": self_url.removesuffix(".atom") + ".json"
+        if self_url.endswith(".atom")
+        else self_url,
+        "favicon": feed.findtext("a:icon", None, NS),
+        "authors": [
+            {"name": name}
+            for name in feed.xpath("a:author/a:name/text()", namespaces=NS)
+        ],
+        "language": feed.get("{http://www.w3.org/XML/1998/namespace}lang"),
+    }
+    header = {key: value for key, value in header.items() if value}
+    # "items" を最後に置き、1件ずつ書き出す
+    yield _json(header)[:-1] + ',"items":['
+    for i, entry in enumerate(feed.iterchildren(f"{{{ATOM_NAMESPACE}}}entry")):
+        yield ("," if i else "") + _json(json_feed_item(entry))
+    yield "]}\n"
+
+
+def iter_url_list(feed: etree._Element) -> Iterator[str]:
+    for entry in feed.iterchildren(f"{{{ATOM_NAMESPACE}}}entry"):
+        url = _link(entry, None) or _link(entry, "alternate")
+        if url:
+            yield url + "\n"
+
+
+def serialize(feed: etree._Element, format: str) -> Iterator[str]:
+    """The chunks of `feed` in one of FORMATS."""
+    if format == "atom":
+        yield to_xml(feed)
+    elif format == "jsonfeed":
+        yield from iter_json_feed(feed)
+    elif format == "urls":
+        yield from iter_url_list(feed)
+    else:
+        raise ValueError(
+            f"unknown format {format!r}, expected one of {', '.join(FORMATS)}"
+        )
@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+from urllib.parse import unquote
+
+
+# docs/feeds 以下のレイアウト
+#
+# docs/feeds/<lang>/<period>.atom                      ... 最新のフィード (言語ごとに1つ)
+# docs/feeds/<lang>/<period>/<period>-YYYY-MM-DD.atom  ... 日付ごとのアーカイブ (増え続ける)
+#
+# docs/new-arrivals/<period>.atom と docs/new-arrivals/<period>/ も同じ形
+PERIODS = ("daily", "weekly", "monthly")
+
+# 最新のフィードのファイル名
+FEED_NAMES = frozenset(f"{period}.atom" for period in PERIODS)
+
+# アーカイブのディレクトリ名 (最新のフィードはこの中にはない)
+ARCHIVE_DIR_NAMES = frozenset(PERIODS)
+
+
+def read_languages(languages_file: Path) -> list[str]:
+    """Read languages.txt, skipping blank lines and lines commented out with '#'."""
+    languages: list[str] = []
+    seen: set[str] = set()
+    with languages_file.open("r", encoding="utf-8") as f:
+        for line in f:
+            language = line.strip()
+            if not language or language.startswith("#") or language in seen:
+                continue
+            seen.add(language)
+            languages.append(language)
+    return languages
+
+
+def feed_relative_path(language: str, period: str) -> str:
+    # ディレクトリ名はURLデコードした言語名 (例: c%23 -> c#)
+    return f"{unquote(language)}/{period}.atom"
+
+
+def iter_feed_paths(root: Path, names: Iterable[str]) -> Iterator[Path]:
+    """Yield the current feeds named `names` under root, in path order.
+
+    Archive directories (<lang>/daily/, ...) are never entered, so the walk
+    costs the same however many snapshots they hold. Symlinked directories
+    are not followed, as with rglob(recurse_symlinks=False).
+    """
+    wanted = frozenset(names)
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+
+        subdirectories: list[Path] = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in ARCHIVE_DIR_NAMES:
+                    subdirectories.append(Path(entry.path))
+            elif entry.name in wanted and entry.is_file():
+                yield Path(entry.path)
+
+        # スタックなので逆順に積み、名前順に処理する
+        stack.extend(reversed(subdirectories))
+
+
+def iter_manifest_feed_paths(
+    root: Path, languages: Iterable[str], names: Iterable[str]
+) -> Iterator[Path]:
+    """Yield root/<lang>/<name> for the languages of a layout manifest (languages.txt).
+
+    Nothing is listed: each candidate costs one stat. Missing files are
+    skipped. The order matches iter_feed_paths().
+    """
+    wanted = sorted(frozenset(names))
+    for directory in sorted({unquote(language) for language in languages}):
+        for name in wanted:
+            path = root / directory / name
+            if path.is_file():
+                yield path
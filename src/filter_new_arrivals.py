@@ -3,12 +3,23 @@ import logging
 import datetime
 import re
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator
 from urllib.parse import unquote
 
 import click
 from lxml import etree
 
+from atom_feed import ATOM_NAMESPACE, append_repository_entry, new_feed, to_xml
+from feed_changes import detect_changes, select_changed, write_state
+from feed_formats import format_path, serialize
+from feed_layout import (
+    PERIODS,
+    iter_feed_paths,
+    iter_manifest_feed_paths,
+    read_languages,
+)
+from trending_records import from_record, iter_records
+
 
 def setup_logging(level: int = logging.INFO) -> logging.Logger:
     # Making Python loggers output all messages to stdout in addition to log file
@@ -32,16 +43,391 @@ appLogger = setup_logging()
 NS = {"a": "http://www.w3.org/2005/Atom"}
 
 
-def iter_atom_paths(root: Path, atomName: str) -> Iterator[Path]:
-    """Iterate over atom files recursively, excluding symlinked directories."""
+# --urls / --output 中で期間名に置き換えるプレースホルダ
+PERIOD_PLACEHOLDER = "{period}"
+
+# RFC 5005 (Feed Paging and Archiving) の <fh:archive/> の名前空間
+HISTORY_NAMESPACE = "http://purl.org/syndication/history/1.0"
+
+# --page-size 指定時のアーカイブページ: <output の親>/<period>-archive/page-000001.atom
+# 一度書いたページは書き換えない (番号は古い順に振る)
+ARCHIVE_PAGE_PATTERN = re.compile(r"^page-(?P<number>\d+)\.atom$")
+NEW_ARRIVALS_URL = "https://aazw.github.io/github-trending-feeds/new-arrivals"
+
+# <lang>/<period>.atom の言語部分を feed の <id> から取り出す
+FEED_ID_PATTERN = re.compile(
+    r"^https://[^/]+/github-trending-feeds/feeds/"
+    r"(?P<lang>[^/]+)/"  # ← 抽出したい部分
+    r"(daily|weekly|monthly)\.atom$"
+)
+
+
+def iter_atom_paths(
+    root: Path, atomNames: Iterable[str], languages: list[str] | None = None
+) -> Iterator[Path]:
+    """Iterate over the current feeds with any of the given names in one walk.
+
+    Archive subdirectories are skipped; with `languages` (from a layout
+    manifest) the tree is not listed at all.
+    """
     try:
-        yield from root.rglob(atomName, recurse_symlinks=False)
+        if languages is not None:
+            yield from iter_manifest_feed_paths(root, languages, atomNames)
+        else:
+            yield from iter_feed_paths(root, atomNames)
     except Exception as e:
         appLogger.error(f"Error iterating atom paths in {root}: {e}")
         appLogger.error("app failed")
         sys.exit(1)
 
 
+def expand_period(path: Path, period: str) -> Path:
+    return Path(str(path).replace(PERIOD_PLACEHOLDER, period))
+
+
+def read_url_list(urlsPath: Path) -> set[str]:
+    # urlsからURL一覧を読み込み (このURL一覧は過去登場したURLの一覧)
+    existingURLs: set[str] = set()
+    try:
+        with urlsPath.open("r", encoding="utf-8") as fp:
+            for line in fp:
+                # 空行を無視
+                url = line.strip()
+                if not url:
+                    continue
+                existingURLs.add(url)
+    except PermissionError as e:
+        appLogger.error(f"Permission denied reading {urlsPath}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    except OSError as e:
+        appLogger.error(f"OS error reading {urlsPath}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    except Exception as e:
+        appLogger.error(f"Unexpected error reading {urlsPath}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    return existingURLs
+
+
+class NewArrivals:
+    """URLs/entries of one period that are not in its past URL list."""
+
+    def __init__(self, period: str, existingURLs: set[str]):
+        self.period = period
+        self.existingURLs = existingURLs
+        self.newUrls: set[str] = set()
+        self.newEntries: dict[str, etree._Element] = {}
+
+
+def collect_atom(atom_path: Path, arrivals: NewArrivals) -> None:
+    appLogger.debug(f"reading {atom_path}")
+
+    root: etree._Element | None = None
+    try:
+        # Parse XML with security settings
+        parser = etree.XMLParser()
+
+        root = etree.parse(atom_path, parser).getroot()
+    except etree.XMLSyntaxError as e:
+        appLogger.warning(f"XML parse error in {atom_path}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    except Exception as e:
+        appLogger.error(f"Unexpected error reading {atom_path}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    # 言語情報抽出
+    id_element = root.find("a:id", NS)
+    language: str | None = None
+    if id_element is not None and id_element.text is not None:
+        m = FEED_ID_PATTERN.match(id_element.text)
+        if m:
+            language = m["lang"]
+
+    # 各エントリ精査
+    try:
+        for entry in root.findall("a:entry", NS):
+            link = entry.find("a:link", NS)
+            if link is None:
+                continue
+
+            rel = link.get("rel")
+            if rel in ("self", "alternate"):
+                continue
+
+            href = link.get("href")
+            if href:
+                # atomに含まれるURLが完全新規かをチェック (過去URL一覧に含まれないか)
+                if href not in arrivals.existingURLs:
+                    arrivals.newUrls.add(href)
+
+                    if (
+                        id_element is not None
+                        and id_element.text is not None
+                        and language is not None
+                    ):
+                        # タイトルに "[Go] " のようなprefixをつける
+                        title = entry.find("a:title", NS)
+                        if title is not None:
+                            title.text = f"[{unquote(language)}] " + (title.text or "")
+                    arrivals.newEntries[href] = entry
+    except Exception as e:
+        appLogger.error(f"Error processing entries in {atom_path}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+
+def write_text(outputPath: Path, text: str | Iterable[str]) -> None:
+    try:
+        # Ensure parent directory exists
+        outputPath.parent.mkdir(parents=True, exist_ok=True)
+
+        with outputPath.open("w", encoding="utf-8") as f:
+            if isinstance(text, str):
+                f.write(text)
+            else:
+                f.writelines(text)
+    except PermissionError as e:
+        appLogger.error(f"Permission denied writing to {outputPath}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    except OSError as e:
+        appLogger.error(f"OS error writing to {outputPath}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    except Exception as e:
+        appLogger.error(f"Unexpected error writing to {outputPath}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+
+def entry_href(entry: etree._Element) -> str | None:
+    link = entry.find("a:link", NS)
+    return None if link is None else link.get("href")
+
+
+def archive_page_name(number: int) -> str:
+    return f"page-{number:06d}.atom"
+
+
+def archive_page_url(period: str, number: int) -> str:
+    return f"{NEW_ARRIVALS_URL}/{period}-archive/{archive_page_name(number)}"
+
+
+def last_archive_page(archiveDir: Path) -> int:
+    """Number of the newest archive page in `archiveDir` (0 when there is none)."""
+    if not archiveDir.is_dir():
+        return 0
+    numbers = [
+        int(m["number"])
+        for m in map(ARCHIVE_PAGE_PATTERN.match, (p.name for p in archiveDir.iterdir()))
+        if m
+    ]
+    return max(numbers, default=0)
+
+
+def read_paged_document(path: Path) -> tuple[list[etree._Element], int]:
+    """Entries of a previously written feed document and the archive page it links to.
+
+    Returns ([], 0) when the document does not exist.
+    """
+    if not path.is_file():
+        return [], 0
+    try:
+        root = etree.parse(path, etree.XMLParser()).getroot()
+    except etree.XMLSyntaxError as e:
+        appLogger.error(f"XML parse error in {path}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    except OSError as e:
+        appLogger.error(f"OS error reading {path}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    prev_page = 0
+    prev = root.find("a:link[@rel='prev-archive']", NS)
+    if prev is not None:
+        m = ARCHIVE_PAGE_PATTERN.match(prev.get("href", "").rsplit("/", 1)[-1])
+        if m:
+            prev_page = int(m["number"])
+    return root.findall("a:entry", NS), prev_page
+
+
+def new_archive_page(
+    period: str,
+    atom_title: str,
+    number: int,
+    entries: list[etree._Element],
+    updated: datetime.datetime,
+) -> str:
+    feed = new_feed(
+        archive_page_url(period, number), f"{atom_title} - page {number}", updated
+    )
+    feed.insert(
+        0,
+        etree.Element(
+            f"{{{HISTORY_NAMESPACE}}}archive", nsmap={"fh": HISTORY_NAMESPACE}
+        ),
+    )
+    etree.SubElement(
+        feed,
+        f"{{{ATOM_NAMESPACE}}}link",
+        href=f"{NEW_ARRIVALS_URL}/{period}.atom",
+        rel="current",
+    )
+    if number > 1:
+        etree.SubElement(
+            feed,
+            f"{{{ATOM_NAMESPACE}}}link",
+            href=archive_page_url(period, number - 1),
+            rel="prev-archive",
+        )
+    # next-archive は入れない: 次のページは書いた時点では存在せず、ページは書き換えない
+    # (RFC 5005 では任意. 読む側は current から prev-archive をたどる)
+    for entry in entries:
+        feed.append(entry)
+    return to_xml(feed)
+
+
+def write_archive_page(path: Path, text: str) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # アーカイブは不変: 既存のページは上書きしない
+        with path.open("x", encoding="utf-8") as f:
+            f.write(text)
+    except FileExistsError:
+        appLogger.error(f"Archive page {path} already exists")
+        appLogger.error("app failed")
+        sys.exit(1)
+    except OSError as e:
+        appLogger.error(f"OS error writing to {path}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+
+def write_paged_arrivals(
+    arrivals: NewArrivals, outputPath: Path, pageSize: int
+) -> None:
+    """Write the new arrivals as an RFC 5005 archived feed.
+
+    The entries of the previous current document are kept and the new ones
+    appended after them, so unlike the unpaged output the current document
+    also holds earlier arrivals until a page fills up. While there are more
+    than `pageSize` entries, the oldest `pageSize` are moved to a new
+    archive page, so the current document never holds more than `pageSize`
+    entries. Pages link back (prev-archive) only, since they are never
+    rewritten once written.
+    """
+    period = arrivals.period
+    atom_title = f"GitHub New Arrivals ({period})"
+    updated = datetime.datetime.now(datetime.timezone.utc)
+    archiveDir = outputPath.parent / f"{period}-archive"
+    last_page = last_archive_page(archiveDir)
+
+    previous, prev_page = read_paged_document(outputPath)
+
+    # 前回がページを書いた後、current を書く前に止まっていた場合は
+    # current が指すページより新しいページに移したエントリを current に残さない
+    archived: set[str | None] = set()
+    for number in range(prev_page + 1, last_page + 1):
+        entries, _ = read_paged_document(archiveDir / archive_page_name(number))
+        archived.update(map(entry_href, entries))
+    entries = [
+        entry
+        for entry in previous
+        if entry_href(entry) not in archived
+        and entry_href(entry) not in arrivals.newEntries
+    ]
+    entries.extend(arrivals.newEntries.values())
+
+    while len(entries) > pageSize:
+        last_page += 1
+        page_path = archiveDir / archive_page_name(last_page)
+        write_archive_page(
+            page_path,
+            new_archive_page(
+                period, atom_title, last_page, entries[:pageSize], updated
+            ),
+        )
+        appLogger.info(f"archived {pageSize} entries to {page_path}")
+        entries = entries[pageSize:]
+
+    root = new_feed(f"{NEW_ARRIVALS_URL}/{period}.atom", atom_title, updated)
+    if last_page:
+        etree.SubElement(
+            root,
+            f"{{{ATOM_NAMESPACE}}}link",
+            href=archive_page_url(period, last_page),
+            rel="prev-archive",
+        )
+    for entry in entries:
+        root.append(entry)
+    write_text(outputPath, to_xml(root))
+    appLogger.info(
+        f"{len(entries)} entries in {outputPath} ({last_page} archive pages)"
+    )
+
+
+def write_arrivals(
+    arrivals: NewArrivals,
+    formats: tuple[str, ...],
+    outputPath: Path | None,
+    pageSize: int | None = None,
+) -> None:
+    period = arrivals.period
+    appLogger.info(f"{len(arrivals.newUrls)} urls is new ({period})")
+
+    def target(format: str) -> Path | None:
+        # plain はURL一覧 (.txt)
+        if outputPath is None:
+            return None
+        return format_path(outputPath, "urls" if format == "plain" else format, formats)
+
+    if "plain" in formats:
+        text = "".join(url + "\n" for url in sorted(arrivals.newUrls))
+        plainPath = target("plain")
+        if plainPath:
+            write_text(plainPath, text)
+        else:
+            for url in sorted(arrivals.newUrls):
+                print(url)
+
+    # atom / jsonfeed は同じ<feed>から書き出す
+    root: etree._Element | None = None
+    if "jsonfeed" in formats or ("atom" in formats and not pageSize):
+        atom_advertise_url = f"{NEW_ARRIVALS_URL}/{period}.atom"
+        atom_title = f"GitHub New Arrivals ({period})"
+        updated = datetime.datetime.now(datetime.timezone.utc)
+
+        root = new_feed(atom_advertise_url, atom_title, updated)
+
+        # entries
+        for entry in arrivals.newEntries.values():
+            root.append(entry)
+
+    if root is not None and "jsonfeed" in formats:
+        jsonPath = target("jsonfeed")
+        if jsonPath:
+            write_text(jsonPath, serialize(root, "jsonfeed"))
+        else:
+            sys.stdout.writelines(serialize(root, "jsonfeed"))
+
+    if "atom" in formats:
+        atomPath = target("atom")
+        if atomPath and pageSize:
+            # ページングでは前回の新着も読むので、jsonfeed を書いた後にエントリを移す
+            write_paged_arrivals(arrivals, atomPath, pageSize)
+        elif root is not None:
+            feed_xml = to_xml(root)
+
+            if atomPath:
+                write_text(atomPath, feed_xml)
+            else:
+                print(feed_xml)
+
+
 @click.command()
 @click.option(
     "--dir",
@@ -58,268 +444,267 @@ def iter_atom_paths(root: Path, atomName: str) -> Iterator[Path]:
     help="単一のAtomファイルを処理",
 )
 @click.option(
-    "--period",
-    type=click.Choice(["daily", "weekly", "monthly"], case_sensitive=True),
+    "--layout-manifest",
+    "layoutManifestPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
     required=False,
-    default="daily",
-    help="",
+    help="--dir の言語一覧 (languages.txt). 指定するとディレクトリを走査せず <dir>/<lang>/<period>.atom だけを見る",
+)
+@click.option(
+    "--records",
+    "recordsPaths",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    multiple=True,
+    help="Atomの代わりにscrape_trending.pyのレコードファイル (.jsonl / .msgpack) を読む",
+)
+@click.option(
+    "--period",
+    "periods",
+    type=click.Choice(PERIODS, case_sensitive=True),
+    multiple=True,
+    default=("daily",),
+    show_default=True,
+    help="複数指定すると1回の走査で各期間の新着をまとめて求める (--urls / --output に {period} を含めること)",
 )
 @click.option(
     "--urls",
     "urlsPath",
-    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    type=click.Path(dir_okay=False, path_type=Path),
     required=True,
-    help="URL一覧を読み込むテキストファイル",
+    help="URL一覧を読み込むテキストファイル ({period} は期間名に置き換える)",
 )
 @click.option(
     "--format",
-    "format",
-    type=click.Choice(["plain", "atom"], case_sensitive=False),
-    required=False,
-    default="plain",
-    help="書き出しフォーマット",
+    "formats",
+    type=click.Choice(["plain", "atom", "jsonfeed"], case_sensitive=False),
+    multiple=True,
+    default=("plain",),
+    show_default=True,
+    help="書き出しフォーマット. 複数指定すると --output の拡張子を形式ごとに置き換える (plain: .txt / atom: .atom / jsonfeed: .json)",
 )
 @click.option(
     "--output",
     "outputPath",
     type=click.Path(dir_okay=False, writable=True, path_type=Path),
     required=False,
-    help="新着一覧を書き出すファイル",
+    help="新着一覧を書き出すファイル ({period} は期間名に置き換える)",
+)
+@click.option(
+    "--page-size",
+    "pageSize",
+    type=click.IntRange(min=1),
+    required=False,
+    help="atom: 今回の新着だけでなく前回までの新着も残し、この件数を超えた古いエントリを <output の親>/<period>-archive/ のページ (RFC 5005) へ移す",
+)
+@click.option(
+    "--since-commit",
+    "sinceCommit",
+    type=str,
+    required=False,
+    help="--dir のうち、このリビジョンからHEADまでにgitで変更されたフィードだけを読む",
+)
+@click.option(
+    "--changed-files",
+    "changedFilesPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="--dir のうち、一覧 (バッチのマニフェスト、または1行1パス) にあるフィードだけを読む",
+)
+@click.option(
+    "--state-file",
+    "statePath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="処理したHEADを記録するファイル. --since-commit 省略時は前回のリビジョンをここから読む",
 )
 def main(
     dirPath: Path,
     atomPath: Path,
-    period: str,
+    layoutManifestPath: Path | None,
+    recordsPaths: tuple[Path, ...],
+    periods: tuple[str, ...],
     urlsPath: Path,
-    format: str,
+    formats: tuple[str, ...],
     outputPath: Path,
+    pageSize: int | None,
+    sinceCommit: str | None,
+    changedFilesPath: Path | None,
+    statePath: Path | None,
 ) -> None:
     appLogger.info("start app")
 
-    # 引数検証: --dir または --atom のいずれかが必要
-    if not dirPath and not atomPath:
-        appLogger.error("Either --dir or --atom must be specified")
+    # 引数検証: --dir / --atom / --records のいずれか1つが必要
+    sources = [
+        option
+        for option, value in (
+            ("--dir", dirPath),
+            ("--atom", atomPath),
+            ("--records", recordsPaths),
+        )
+        if value
+    ]
+    if not sources:
+        appLogger.error("Either --dir, --atom or --records must be specified")
         appLogger.error("app failed")
         sys.exit(1)
 
-    if dirPath and atomPath:
-        appLogger.error("Cannot specify both --dir and --atom options")
+    if len(sources) > 1:
+        appLogger.error(f"Cannot specify {' and '.join(sources)} options together")
         appLogger.error("app failed")
         sys.exit(1)
 
+    # 期間は指定順を保ったまま重複を除く
+    periods = tuple(dict.fromkeys(periods))
+
     appLogger.info(f"command-line argument: --dir = {dirPath}")
     appLogger.info(f"command-line argument: --atom = {atomPath}")
-    appLogger.info(f"command-line argument: --period = {period}")
+    appLogger.info(f"command-line argument: --layout-manifest = {layoutManifestPath}")
+    appLogger.info(f"command-line argument: --records = {list(map(str, recordsPaths))}")
+    appLogger.info(f"command-line argument: --period = {', '.join(periods)}")
     appLogger.info(f"command-line argument: --urls = {urlsPath}")
-    appLogger.info(f"command-line argument: --format = {format}")
+    formats = tuple(dict.fromkeys(f.lower() for f in formats))
+    appLogger.info(f"command-line argument: --format = {', '.join(formats)}")
     appLogger.info(f"command-line argument: --output = {outputPath}")
+    appLogger.info(f"command-line argument: --page-size = {pageSize}")
+    appLogger.info(f"command-line argument: --since-commit = {sinceCommit}")
+    appLogger.info(f"command-line argument: --changed-files = {changedFilesPath}")
+    appLogger.info(f"command-line argument: --state-file = {statePath}")
 
-    # urlsからURL一覧を読み込み (このURL一覧は過去登場したURLの一覧)
-    existingURLs: set[str] = set()
-    try:
-        with urlsPath.open("r", encoding="utf-8") as fp:
-            for line in fp:
-                # 空行を無視
-                url = line.strip()
-                if not url:
-                    continue
-                existingURLs.add(url)
-    except PermissionError as e:
-        appLogger.error(f"Permission denied reading {urlsPath}: {e}")
-        appLogger.error("app failed")
-        sys.exit(1)
-    except OSError as e:
-        appLogger.error(f"OS error reading {urlsPath}: {e}")
+    if pageSize and ("atom" not in formats or not outputPath):
+        appLogger.error("--page-size requires --format atom and --output")
         appLogger.error("app failed")
         sys.exit(1)
-    except Exception as e:
-        appLogger.error(f"Unexpected error reading {urlsPath}: {e}")
+
+    if len(formats) > 1 and not outputPath:
+        appLogger.error("--output is required when --format is given more than once")
         appLogger.error("app failed")
         sys.exit(1)
 
-    # atomファイルの処理
-    newUrls: set[str] = set()
-    newEntries: dict[str, etree._Element] = {}
+    detecting = sinceCommit or changedFilesPath or statePath
+    if detecting:
+        if sinceCommit and changedFilesPath:
+            appLogger.error(
+                "Cannot specify --since-commit and --changed-files together"
+            )
+            appLogger.error("app failed")
+            sys.exit(1)
+        if not dirPath:
+            appLogger.error(
+                "--since-commit, --changed-files and --state-file require --dir"
+            )
+            appLogger.error("app failed")
+            sys.exit(1)
 
-    atom_paths: list[Path] = []
-    if dirPath:
-        appLogger.info(f"atom file searching in {dirPath}")
-        atom_paths = list(iter_atom_paths(dirPath, f"{period}.atom"))
-    else:
-        appLogger.info(f"processing single atom file: {atomPath}")
-        atom_paths = [atomPath]
+    # 複数期間では期間ごとにURL一覧と出力先を分ける必要がある
+    if len(periods) > 1:
+        if atomPath:
+            appLogger.error("--atom can be used with a single --period only")
+            appLogger.error("app failed")
+            sys.exit(1)
+        for option, path in (("--urls", urlsPath), ("--output", outputPath)):
+            if not path or PERIOD_PLACEHOLDER not in str(path):
+                appLogger.error(
+                    f"{option} must contain {PERIOD_PLACEHOLDER} when --period is given more than once"
+                )
+                appLogger.error("app failed")
+                sys.exit(1)
 
-    for atom_path in atom_paths:
-        appLogger.debug(f"reading {atom_path}")
+    arrivals: dict[str, NewArrivals] = {}
+    for period in periods:
+        periodUrlsPath = expand_period(urlsPath, period)
+        if not periodUrlsPath.is_file():
+            appLogger.error(f"URL list {periodUrlsPath} does not exist")
+            appLogger.error("app failed")
+            sys.exit(1)
+        arrivals[period] = NewArrivals(period, read_url_list(periodUrlsPath))
 
-        root: etree._Element | None = None
+    languages: list[str] | None = None
+    if layoutManifestPath:
         try:
-            # Parse XML with security settings
-            parser = etree.XMLParser()
-
-            root = etree.parse(atom_path, parser).getroot()
-        except etree.XMLSyntaxError as e:
-            appLogger.warning(f"XML parse error in {atom_path}: {e}")
+            languages = read_languages(layoutManifestPath)
+        except OSError as e:
+            appLogger.error(f"Error reading {layoutManifestPath}: {e}")
             appLogger.error("app failed")
             sys.exit(1)
-        except Exception as e:
-            appLogger.error(f"Unexpected error reading {atom_path}: {e}")
+
+    # atomファイルの処理 (全期間まとめて1回だけ走査する)
+    atom_paths: list[tuple[str, Path]] = []
+    atomNames = [f"{p}.atom" for p in periods]
+    revision: str | None = None
+    full_scan = True
+    if dirPath and detecting:
+        # 変更のないフィードのURLは前回までにURL一覧へ入っているので、新着は出ない
+        try:
+            changes = detect_changes(dirPath, sinceCommit, changedFilesPath, statePath)
+        except (OSError, ValueError, KeyError) as e:
+            appLogger.error(f"Error detecting changed files: {e}")
             appLogger.error("app failed")
             sys.exit(1)
+        appLogger.info(f"change detection: {changes.reason}")
+        revision = changes.revision
+        if changes.paths is not None:
+            atom_paths = [
+                (path.stem, path)
+                for path in select_changed(changes.paths, dirPath, atomNames)
+            ]
+            appLogger.info(f"{len(atom_paths)} changed feeds to read")
+            full_scan = False
+    if dirPath and full_scan:
+        appLogger.info(f"atom file searching in {dirPath}")
+        atom_paths = [
+            (path.stem, path) for path in iter_atom_paths(dirPath, atomNames, languages)
+        ]
+    elif atomPath:
+        appLogger.info(f"processing single atom file: {atomPath}")
+        atom_paths = [(periods[0], atomPath)]
 
-        # 言語情報抽出
-        id_element = root.find("a:id", NS)
-        language: str | None = None
-        if id_element is not None and id_element.text is not None:
-            pattern = re.compile(
-                r"^https://[^/]+/github-trending-feeds/feeds/"
-                r"(?P<lang>[^/]+)/"  # ← 抽出したい部分
-                r"(daily|weekly|monthly)\.atom$"
-            )
-            m = pattern.match(id_element.text)
-            if m:
-                language = m["lang"]
-
-        # 各エントリ精査
+    # レコードファイルにはURLと言語がそのまま入っているので、XMLを読まずに済む
+    # エントリは一時的な<feed>に組み立て、出力時に出力用の<feed>へ移す
+    record_entries = etree.Element(f"{{{ATOM_NAMESPACE}}}feed")
+    for records_path in recordsPaths:
+        appLogger.debug(f"reading {records_path}")
         try:
-            for entry in root.findall("a:entry", NS):
-                link = entry.find("a:link", NS)
-                if link is None:
+            for record in iter_records(records_path):
+                period_arrivals = arrivals.get(record["period"])
+                if period_arrivals is None:
                     continue
-
-                rel = link.get("rel")
-                if rel in ("self", "alternate"):
+                href = record["url"]
+                if href in period_arrivals.existingURLs:
                     continue
-
-                href = link.get("href")
-                if href:
-                    # atomに含まれるURLが完全新規かをチェック (過去URL一覧に含まれないか)
-                    if href not in existingURLs:
-                        newUrls.add(href)
-
-                        if (
-                            id_element is not None
-                            and id_element.text is not None
-                            and language is not None
-                        ):
-                            # タイトルに "[Go] " のようなprefixをつける
-                            title = entry.find("a:title", NS)
-                            if title is not None:
-                                title.text = f"[{unquote(language)}] " + (
-                                    title.text or ""
-                                )
-                        newEntries[href] = entry
-        except Exception as e:
-            appLogger.error(f"Error processing entries in {atom_path}: {e}")
+                period_arrivals.newUrls.add(href)
+                period_arrivals.newEntries[href] = append_repository_entry(
+                    record_entries,
+                    from_record(record),
+                    record["language"],
+                    datetime.datetime.fromisoformat(record["snapshot"]),
+                    # タイトルに "[Go] " のようなprefixをつける
+                    title_prefix=f"[{unquote(record['language'])}] ",
+                )
+        except (OSError, ValueError, KeyError) as e:
+            appLogger.error(f"Error reading records {records_path}: {e}")
             appLogger.error("app failed")
             sys.exit(1)
 
-    appLogger.info(f"{len(newUrls)} urls is new")
-
-    if format.lower() == "plain":
-        if outputPath:
-            try:
-                # Ensure parent directory exists
-                outputPath.parent.mkdir(parents=True, exist_ok=True)
-
-                with outputPath.open("w", encoding="utf-8") as f:
-                    for url in sorted(newUrls):
-                        f.write(url + "\n")
-            except PermissionError as e:
-                appLogger.error(f"Permission denied writing to {outputPath}: {e}")
-                appLogger.error("app failed")
-                sys.exit(1)
-            except OSError as e:
-                appLogger.error(f"OS error writing to {outputPath}: {e}")
-                appLogger.error("app failed")
-                sys.exit(1)
-            except Exception as e:
-                appLogger.error(f"Unexpected error writing to {outputPath}: {e}")
-                appLogger.error("app failed")
-                sys.exit(1)
-        else:
-            for url in sorted(newUrls):
-                print(url)
-    elif format.lower() == "atom":
-        atom_advertise_url = (
-            f"https://aazw.github.io/github-trending-feeds/new-arrivals/{period}.atom"
-        )
-        atom_advertise_alt_url = "https://aazw.github.io/github-trending-feeds/"
-        atom_title = f"GitHub New Arrivals ({period})"
-        atom_author = "aazw"
-        updated = datetime.datetime.now(datetime.timezone.utc)
-
-        ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
-        root = etree.Element(f"{{{ATOM_NAMESPACE}}}feed")
-        root.set("{http://www.w3.org/XML/1998/namespace}lang", "en")
-
-        # id
-        etree.SubElement(root, f"{{{ATOM_NAMESPACE}}}id").text = atom_advertise_url
-
-        # title
-        etree.SubElement(root, f"{{{ATOM_NAMESPACE}}}title").text = atom_title
+    for period, atom_path in atom_paths:
+        collect_atom(atom_path, arrivals[period])
 
-        # link (self)
-        etree.SubElement(
-            root,
-            f"{{{ATOM_NAMESPACE}}}link",
-            attrib={"href": atom_advertise_url, "rel": "self"},
-        )
-
-        # link (alternate)
-        etree.SubElement(
-            root,
-            f"{{{ATOM_NAMESPACE}}}link",
-            attrib={"href": atom_advertise_alt_url, "rel": "alternate"},
-        )
-
-        # icon
-        etree.SubElement(
-            root, f"{{{ATOM_NAMESPACE}}}icon"
-        ).text = "https://github.githubassets.com/favicons/favicon.svg"
-
-        # updated
-        etree.SubElement(root, f"{{{ATOM_NAMESPACE}}}updated").text = updated.isoformat(
-            timespec="seconds"
-        )
-
-        # author
-        author = etree.SubElement(root, f"{{{ATOM_NAMESPACE}}}author")
-        etree.SubElement(author, f"{{{ATOM_NAMESPACE}}}name").text = atom_author
-
-        # entries
-        for entry in newEntries.values():
-            root.append(entry)
-
-        # pretty print
-        etree.indent(root)
-
-        # get xml
-        feed_xml = etree.tostring(root, encoding="utf-8", xml_declaration=True).decode(
-            "utf-8"
+    for period in periods:
+        write_arrivals(
+            arrivals[period],
+            formats,
+            expand_period(outputPath, period) if outputPath else None,
+            pageSize,
         )
 
-        if outputPath:
-            try:
-                # Ensure parent directory exists
-                outputPath.parent.mkdir(parents=True, exist_ok=True)
-
-                with outputPath.open("w", encoding="utf-8") as f:
-                    f.write(feed_xml)
-            except PermissionError as e:
-                appLogger.error(f"Permission denied writing to {outputPath}: {e}")
-                appLogger.error("app failed")
-                sys.exit(1)
-            except OSError as e:
-                appLogger.error(f"OS error writing to {outputPath}: {e}")
-                appLogger.error("app failed")
-                sys.exit(1)
-            except Exception as e:
-                appLogger.error(f"Unexpected error writing to {outputPath}: {e}")
-                appLogger.error("app failed")
-                sys.exit(1)
-        else:
-            print(feed_xml)
+    # 出力を書き終えてから、処理済みのリビジョンを記録する
+    if statePath and revision:
+        try:
+            write_state(statePath, revision)
+        except OSError as e:
+            appLogger.error(f"Error writing state {statePath}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+        appLogger.info(f"recorded revision {revision[:12]} in {statePath}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,713 @@
+import time
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Mapping, Protocol
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+from requests.exceptions import (  # https://requests.readthedocs.io/en/latest/_modules/requests/exceptions/
+    RequestException,
+    HTTPError,
+    ContentDecodingError,
+    ConnectionError,
+    Timeout,
+    ConnectTimeout,
+    ReadTimeout,
+    InvalidURL,
+    InvalidSchema,
+    RetryError,
+    TooManyRedirects,
+)
+
+
+# リトライ方針 (requests / HTTP/2 の両バックエンドで共通)
+# https://qiita.com/toshitanian/items/c28a65fe2f32884e067c
+RETRY_TOTAL = 5
+RETRY_BACKOFF_FACTOR = 1
+RETRY_BACKOFF_MAX = 120
+RETRY_STATUS_FORCELIST = (500, 502, 503, 504)
+
+# 接続・読み取りのタイムアウト (秒)
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 10
+
+TRANSPORTS = ("requests", "http2")
+
+# 送信するAccept-Encoding
+# brotli / zstd はデコーダ (brotli / zstandard パッケージ) が入っている場合だけ含まれる
+# (両バックエンドとも同じパッケージで展開するので、urllib3の判定をそのまま使う)
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+# ボディを読み進める単位. 展開はこの単位で行うが、ボディは全部読んでからパースする
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# ヘッジ (遅いリクエストの複製) の既定値
+# - 成功したリクエストの所要時間の直近 LATENCY_WINDOW 件から HEDGE_QUANTILE 分位点を求め、
+#   それを超えても応答がなければ同じGETをもう1本送る
+# - 実績が LATENCY_MIN_SAMPLES 件に満たないうちはヘッジしない
+# - 複製するのは全リクエストの DEFAULT_HEDGE_BUDGET の割合まで
+HEDGE_QUANTILE = 0.95
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 10
+DEFAULT_HEDGE_BUDGET = 0.1
+
+
+@dataclass(slots=True)
+class FetchResponse:
+    """Backend-independent response of a successful GET."""
+
+    status_code: int
+    url: str
+    content: bytes
+    encoding: str | None = None
+    headers: Mapping[str, str] = field(default_factory=dict)
+    # 実際に受信したボディのバイト数 (圧縮されたまま)
+    wire_bytes: int = 0
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    @property
+    def decoded_bytes(self) -> int:
+        return len(self.content)
+
+    @property
+    def content_encoding(self) -> str:
+        return self.headers.get("content-encoding") or "identity"
+
+
+@dataclass(slots=True)
+class Transfer:
+    requests: int = 0
+    wire_bytes: int = 0
+    decoded_bytes: int = 0
+
+
+class TransferStats:
+    """Thread-safe per-key (language) byte accounting for a run."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.by_key: dict[str, Transfer] = {}
+
+    def record(self, key: str, response: FetchResponse) -> None:
+        with self._lock:
+            transfer = self.by_key.setdefault(key, Transfer())
+            transfer.requests += 1
+            transfer.wire_bytes += response.wire_bytes
+            transfer.decoded_bytes += response.decoded_bytes
+
+    def get(self, key: str) -> Transfer | None:
+        with self._lock:
+            return self.by_key.get(key)
+
+    def total(self) -> Transfer:
+        total = Transfer()
+        with self._lock:
+            for transfer in self.by_key.values():
+                total.requests += transfer.requests
+                total.wire_bytes += transfer.wire_bytes
+                total.decoded_bytes += transfer.decoded_bytes
+        return total
+
+    def top(self, count: int) -> list[tuple[str, Transfer]]:
+        """The `count` keys with the most bytes on the wire."""
+        with self._lock:
+            items = list(self.by_key.items())
+        items.sort(key=lambda item: (-item[1].wire_bytes, item[0]))
+        return items[:count]
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+# get() のtimeout: 秒 (接続・読み取り共通) または (接続, 読み取り)
+TimeoutSpec = float | tuple[float, float]
+
+
+@dataclass(frozen=True, slots=True)
+class ClientConfig:
+    """Fetch behaviour shared by every transport; tune it here rather than per script."""
+
+    # 同時に保持する接続数 (同時に取得する数に合わせる)
+    pool_size: int = 10
+    retry_total: int = RETRY_TOTAL
+    backoff_factor: float = RETRY_BACKOFF_FACTOR
+    backoff_max: float = RETRY_BACKOFF_MAX
+    status_forcelist: tuple[int, ...] = RETRY_STATUS_FORCELIST
+    # get() でtimeoutを省略したときの接続・読み取りのタイムアウト (秒)
+    connect_timeout: float = CONNECT_TIMEOUT
+    read_timeout: float = READ_TIMEOUT
+    # None はバックエンドの既定値 (python-requests/x.y など)
+    user_agent: str | None = None
+    accept_encoding: str = ACCEPT_ENCODING
+    hooks: tuple["FetchHook", ...] = ()
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def headers(self) -> dict[str, str]:
+        headers = {"Accept-Encoding": self.accept_encoding}
+        if self.user_agent:
+            headers["User-Agent"] = self.user_agent
+        return headers
+
+
+class FetchHook:
+    """Hook point around every GET (caching, metrics, ...); override what you need.
+
+    Hooks run on the calling thread, possibly from several threads at once.
+    """
+
+    def before_request(self, url: str) -> FetchResponse | None:
+        """Return a response to answer the request without going to the network."""
+        return None
+
+    def after_response(self, url: str, response: FetchResponse, elapsed: float) -> None:
+        """Called after a successful fetch (not for responses from before_request)."""
+
+    def on_error(self, url: str, error: RequestException, elapsed: float) -> None:
+        """Called when the fetch failed; the error is re-raised afterwards."""
+
+
+class Transport(Protocol):
+    """Fetch backend used by the trending scrapers.
+
+    get() raises the requests exceptions (HTTPError for 4xx/5xx, RetryError
+    when a status_forcelist status outlasts the retries, Timeout,
+    ConnectionError, ...) whatever the backend, so callers map failures to
+    return codes in one place. `timeout` is seconds for both phases or a
+    (connect, read) pair; None uses the ClientConfig timeouts.
+    """
+
+    def get(self, url: str, timeout: TimeoutSpec | None = None) -> FetchResponse: ...
+
+    def close(self) -> None: ...
+
+
+# HedgedTransport が試行ごとのスレッドに置く「見捨てた」フラグ.
+# 立っていれば、バックエンドは再試行をやめて AttemptAbandoned を送出する
+# (期限切れや負けた複製が、裏で再試行を続けてリクエストを送らないように)
+_attempt_state = threading.local()
+
+
+class AttemptAbandoned(ConnectionError):
+    """The HedgedTransport attempt was abandoned, so its retries were stopped."""
+
+
+def _abandoned_event() -> threading.Event | None:
+    return getattr(_attempt_state, "abandoned", None)
+
+
+def retry_sleep(seconds: float) -> None:
+    """Sleep before a retry; raises AttemptAbandoned if the attempt is abandoned meanwhile."""
+    abandoned = _abandoned_event()
+    if abandoned is None:
+        if seconds > 0:
+            time.sleep(seconds)
+        return
+    if abandoned.wait(seconds) if seconds > 0 else abandoned.is_set():
+        raise AttemptAbandoned("attempt abandoned, retries stopped")
+
+
+class AbandonableRetry(Retry):
+    """urllib3 Retry that stops as soon as the HedgedTransport attempt running it is abandoned."""
+
+    def increment(self, *args: Any, **kwargs: Any) -> Any:
+        abandoned = _abandoned_event()
+        if abandoned is not None and abandoned.is_set():
+            raise AttemptAbandoned("attempt abandoned, retries stopped")
+        return super().increment(*args, **kwargs)
+
+    def sleep(self, response: Any = None) -> None:
+        if _abandoned_event() is None:
+            super().sleep(response)
+            return
+        delay: float | None = None
+        if self.respect_retry_after_header and response:
+            delay = self.get_retry_after(response)
+        retry_sleep(self.get_backoff_time() if delay is None else delay)
+
+
+def make_config(config: ClientConfig | None = None, **overrides: Any) -> ClientConfig:
+    """`config` (or the defaults) with some fields replaced."""
+    return replace(config or ClientConfig(), **overrides)
+
+
+def create_session(
+    pool_size: int = 10, config: ClientConfig | None = None
+) -> requests.Session:
+    config = make_config(config, pool_size=pool_size)
+    retries = AbandonableRetry(
+        total=config.retry_total,
+        backoff_factor=config.backoff_factor,
+        backoff_max=config.backoff_max,
+        status_forcelist=list(config.status_forcelist),
+    )
+    s = requests.Session()
+    adapter = HTTPAdapter(
+        max_retries=retries,
+        pool_connections=config.pool_size,
+        pool_maxsize=config.pool_size,
+    )
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update(config.headers())
+    return s
+
+
+class BaseTransport:
+    """Runs the hooks and resolves the timeout around the backend's _fetch()."""
+
+    def __init__(self, config: ClientConfig):
+        self.config = config
+
+    def _fetch(self, url: str, timeout: tuple[float, float]) -> FetchResponse:
+        raise NotImplementedError
+
+    def get(self, url: str, timeout: TimeoutSpec | None = None) -> FetchResponse:
+        hooks = self.config.hooks
+        for hook in hooks:
+            cached = hook.before_request(url)
+            if cached is not None:
+                return cached
+
+        if timeout is None:
+            resolved = self.config.timeout
+        elif isinstance(timeout, tuple):
+            resolved = timeout
+        else:
+            resolved = (timeout, timeout)
+
+        started = time.monotonic()
+        try:
+            response = self._fetch(url, resolved)
+        except RequestException as e:
+            for hook in hooks:
+                hook.on_error(url, e, time.monotonic() - started)
+            raise
+        for hook in hooks:
+            hook.after_response(url, response, time.monotonic() - started)
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class RequestsTransport(BaseTransport):
+    """HTTP/1.1 backend on a pooled requests.Session (one connection per in-flight request)."""
+
+    def __init__(self, config: ClientConfig | None = None, **overrides: Any):
+        super().__init__(make_config(config, **overrides))
+        self.session = create_session(self.config.pool_size, self.config)
+
+    def _fetch(self, url: str, timeout: tuple[float, float]) -> FetchResponse:
+        res = self.session.get(url, timeout=timeout, stream=True)
+        try:
+            res.raise_for_status()  # HTTPError
+            # 展開はチャンクごとだが、パーサーには展開後のボディ全体を渡す (転送量を数えるため stream で読む)
+            content = b"".join(res.iter_content(STREAM_CHUNK_SIZE))
+            return FetchResponse(
+                status_code=res.status_code,
+                url=res.url,
+                content=content,
+                encoding=res.encoding,
+                headers=res.headers,
+                # urllib3が読んだ展開前のバイト数
+                wire_bytes=res.raw.tell(),
+            )
+        finally:
+            res.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class Http2Transport(BaseTransport):
+    """HTTP/2 backend on httpx: concurrent requests share one multiplexed connection.
+
+    Requires httpx with the http2 extra (`httpx[http2]`).
+    `http1=False` speaks HTTP/2 with prior knowledge, which also works over
+    plain http:// (used against local stand-in servers).
+    """
+
+    def __init__(
+        self,
+        config: ClientConfig | None = None,
+        http1: bool = True,
+        **overrides: Any,
+    ):
+        super().__init__(make_config(config, **overrides))
+        try:
+            import httpx
+        except ImportError:
+            raise ValueError(
+                "the http2 transport requires httpx[http2] to be installed"
+            ) from None
+
+        self._httpx = httpx
+        self.client = httpx.Client(
+            http1=http1,
+            http2=True,
+            follow_redirects=True,
+            headers=self.config.headers(),
+            limits=httpx.Limits(
+                max_connections=self.config.pool_size,
+                max_keepalive_connections=self.config.pool_size,
+            ),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        # urllib3.util.retry.Retry と同じ: 1回目の再試行は即時、以降は factor * 2^(n-1)
+        if attempt <= 1:
+            return 0
+        return min(
+            self.config.backoff_max,
+            self.config.backoff_factor * (2 ** (attempt - 1)),
+        )
+
+    def _fetch(self, url: str, timeout: tuple[float, float]) -> FetchResponse:
+        httpx = self._httpx
+        connect_timeout, read_timeout = timeout
+        # requestsと同じく、書き込み・プール待ちは読み取りのタイムアウトに含める
+        httpx_timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        attempt = 0
+        while True:
+            try:
+                request = self.client.build_request("GET", url, timeout=httpx_timeout)
+                res = self.client.send(request, stream=True)
+                try:
+                    if res.status_code in self.config.status_forcelist:
+                        if attempt < self.config.retry_total:
+                            attempt += 1
+                            retry_sleep(self._backoff(attempt))
+                            continue
+                        # requestsは再試行を使い切ると (MaxRetryError) RetryError にするので、それに合わせる
+                        raise RetryError(
+                            f"Max retries exceeded with url: {url} "
+                            f"(Caused by ResponseError('too many {res.status_code} error responses'))"
+                        )
+                    res.raise_for_status()
+                    # 展開はチャンクごとだが、パーサーには展開後のボディ全体を渡す
+                    content = b"".join(res.iter_bytes(STREAM_CHUNK_SIZE))
+                    return FetchResponse(
+                        status_code=res.status_code,
+                        url=str(res.url),
+                        content=content,
+                        encoding=res.encoding,
+                        headers=res.headers,
+                        wire_bytes=res.num_bytes_downloaded,
+                    )
+                finally:
+                    res.close()
+            except httpx.UnsupportedProtocol as e:
+                raise InvalidSchema(str(e)) from e
+            except httpx.TransportError as e:
+                # urllib3のRetryと同様に、接続・読み取りのエラーはGETなので再試行する
+                if attempt < self.config.retry_total:
+                    attempt += 1
+                    retry_sleep(self._backoff(attempt))
+                    continue
+                # requestsは再試行を使い切ると (MaxRetryError) 接続タイムアウト以外を
+                # ConnectionError にするので、それに合わせる
+                if isinstance(e, httpx.ConnectTimeout):
+                    raise ConnectTimeout(str(e)) from e
+                raise ConnectionError(str(e)) from e
+            except httpx.HTTPError as e:
+                raise self._translate(e) from e
+            except httpx.InvalidURL as e:
+                raise InvalidURL(str(e)) from e
+
+    def _translate(self, e: Exception) -> RequestException:
+        """Map an httpx exception to the equivalent requests exception."""
+        httpx = self._httpx
+        if isinstance(e, httpx.HTTPStatusError):
+            response = requests.Response()
+            response.status_code = e.response.status_code
+            response.url = str(e.request.url)
+            return HTTPError(str(e), response=response)
+        if isinstance(e, httpx.DecodingError):
+            return ContentDecodingError(str(e))
+        if isinstance(e, httpx.TooManyRedirects):
+            return TooManyRedirects(str(e))
+        if isinstance(e, httpx.ConnectTimeout):
+            return ConnectTimeout(str(e))
+        if isinstance(e, httpx.ReadTimeout):
+            return ReadTimeout(str(e))
+        if isinstance(e, httpx.TimeoutException):
+            return Timeout(str(e))
+        if isinstance(e, httpx.UnsupportedProtocol):
+            return InvalidSchema(str(e))
+        if isinstance(e, httpx.TransportError):
+            return ConnectionError(str(e))
+        return RequestException(str(e))
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class LatencyTracker:
+    """Thread-safe sliding window of successful request latencies."""
+
+    def __init__(
+        self, window: int = LATENCY_WINDOW, min_samples: int = LATENCY_MIN_SAMPLES
+    ):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """The q-quantile (nearest rank) of the window; None until min_samples are in."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+@dataclass(slots=True)
+class HedgeStats:
+    requests: int = 0
+    # 複製を送った数 / そのうち複製の方が先に返った数
+    hedged: int = 0
+    hedge_wins: int = 0
+    # 期限までに応答がなかった数
+    deadline_exceeded: int = 0
+    # hedge_gate (レート制限) にトークンがなく、複製を送らなかった数
+    hedges_denied: int = 0
+
+
+class HedgedTransport:
+    """Bounds the total time of each GET and optionally hedges slow ones.
+
+    Wraps another transport. Each attempt runs in a daemon thread, so the
+    caller gets an answer (or a requests Timeout) within `deadline`
+    seconds even while the inner transport is still retrying. An abandoned
+    attempt sends no further retries (see AbandonableRetry); a request
+    already in flight runs to its timeout and its result is dropped.
+
+    With `hedge`, a GET that has not answered within the observed
+    HEDGE_QUANTILE latency gets one duplicate, and whichever succeeds
+    first is returned. At most `hedge_budget` of all requests are
+    duplicated, and only when `hedge_gate` (e.g. a rate limiter that
+    does not wait) grants it. An error is raised only after every attempt
+    has failed.
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        deadline: float | None = None,
+        hedge: bool = False,
+        hedge_budget: float = DEFAULT_HEDGE_BUDGET,
+        hedge_quantile: float = HEDGE_QUANTILE,
+        latency: LatencyTracker | None = None,
+        hedge_gate: Callable[[], bool] | None = None,
+    ):
+        if deadline is not None and deadline <= 0:
+            raise ValueError(f"deadline must be positive, got {deadline}")
+        if not 0 <= hedge_budget <= 1:
+            raise ValueError(
+                f"hedge budget must be between 0 and 1, got {hedge_budget}"
+            )
+        self.transport = transport
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_budget = hedge_budget
+        self.hedge_quantile = hedge_quantile
+        self.latency = latency or LatencyTracker()
+        self.hedge_gate = hedge_gate
+        self.stats = HedgeStats()
+        self._lock = threading.Lock()
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.stats.hedged + 1 > self.hedge_budget * self.stats.requests:
+                return False
+            self.stats.hedged += 1
+        # 複製もリクエスト数の予算 (間隔・共有のレート制限) から取る. 待ってまで送らない
+        if self.hedge_gate is not None and not self.hedge_gate():
+            with self._lock:
+                self.stats.hedged -= 1
+                self.stats.hedges_denied += 1
+            return False
+        return True
+
+    def get(self, url: str, timeout: TimeoutSpec | None = None) -> FetchResponse:
+        started = time.monotonic()
+        with self._lock:
+            self.stats.requests += 1
+
+        if timeout is not None and self.deadline is not None:
+            # 1回の接続・読み取りも残り時間を超えないようにする
+            connect, read = (
+                timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            )
+            timeout = (min(connect, self.deadline), min(read, self.deadline))
+
+        results: queue.Queue[tuple[int, FetchResponse | None, BaseException | None]] = (
+            queue.Queue()
+        )
+        # get() から戻ったら (勝ち負け・期限切れに関わらず) 残りの試行の再試行を止める
+        abandoned = threading.Event()
+
+        def attempt(index: int) -> None:
+            _attempt_state.abandoned = abandoned
+            attempt_started = time.monotonic()
+            try:
+                response = self.transport.get(url, timeout=timeout)
+            except BaseException as e:
+                results.put((index, None, e))
+                return
+            self.latency.record(time.monotonic() - attempt_started)
+            results.put((index, response, None))
+
+        def launch(index: int) -> None:
+            threading.Thread(
+                target=attempt, args=(index,), name=f"get-{index}", daemon=True
+            ).start()
+
+        try:
+            return self._wait(url, started, results, launch)
+        finally:
+            abandoned.set()
+
+    def _wait(
+        self,
+        url: str,
+        started: float,
+        results: queue.Queue[tuple[int, FetchResponse | None, BaseException | None]],
+        launch: Callable[[int], None],
+    ) -> FetchResponse:
+        launch(0)
+        attempts = 1
+        errors: list[BaseException] = []
+        hedge_at: float | None = None
+        if self.hedge:
+            delay = self.latency.quantile(self.hedge_quantile)
+            hedge_at = started + delay if delay is not None else None
+
+        while True:
+            now = time.monotonic()
+            waits: list[float] = []
+            if self.deadline is not None:
+                waits.append(started + self.deadline - now)
+            if hedge_at is not None:
+                waits.append(hedge_at - now)
+            try:
+                index, response, error = results.get(
+                    timeout=max(min(waits), 0) if waits else None
+                )
+            except queue.Empty:
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    # 複製は1回だけ
+                    hedge_at = None
+                    if self._take_hedge():
+                        launch(attempts)
+                        attempts += 1
+                    continue
+                with self._lock:
+                    self.stats.deadline_exceeded += 1
+                raise Timeout(
+                    f"no response from {url} within the {self.deadline:g}s deadline"
+                ) from None
+
+            if response is not None:
+                if index > 0:
+                    with self._lock:
+                        self.stats.hedge_wins += 1
+                return response
+            assert error is not None
+            errors.append(error)
+            if len(errors) == attempts:
+                # 複製を送る前の失敗 (4xxなど) は、複製しても同じなのでそのまま返す
+                raise errors[0]
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+def create_transport(
+    name: str,
+    pool_size: int | None = None,
+    config: ClientConfig | None = None,
+    **options: Any,
+) -> Transport:
+    """Create a transport; `options` override fields of `config` (e.g. accept_encoding)."""
+    if pool_size is not None:
+        options["pool_size"] = pool_size
+    if name == "requests":
+        return RequestsTransport(config, **options)
+    if name == "http2":
+        return Http2Transport(config, **options)
+    raise ValueError(f"unknown transport {name!r}, expected one of {TRANSPORTS}")
+
+
+_default_transport: Transport | None = None
+_default_transport_lock = threading.Lock()
+
+
+def default_transport() -> Transport:
+    """The process-wide requests transport with the default ClientConfig.
+
+    Created on first use and kept open, so scripts that run in the same
+    process (e.g. scrape_languages and scrape_trending) reuse its connections.
+    """
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = RequestsTransport()
+        return _default_transport
+
+
+def close_default_transport() -> None:
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is not None:
+            _default_transport.close()
+            _default_transport = None
+
+
+class Pacer:
+    """Space request starts at least `interval` seconds apart across threads."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def try_take(self) -> bool:
+        """Claim the next start only if it is due now (never waits)."""
+        if self.interval <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                return False
+            self._next = now + self.interval
+        return True
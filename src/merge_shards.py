@@ -0,0 +1,186 @@
+import sys
+import os
+import shutil
+import logging
+from pathlib import Path
+from typing import Any
+
+import click
+
+from sweep_manifest import read_manifest, write_manifest
+from sweep_stats import load_stats, save_stats, update_stats
+
+
+def setup_logging(level: int = logging.INFO) -> logging.Logger:
+    # Making Python loggers output all messages to stdout in addition to log file
+    # https://stackoverflow.com/questions/14058453/making-python-loggers-output-all-messages-to-stdout-in-addition-to-log-file
+    formatter = logging.Formatter(
+        "%(asctime)s - %(pathname)s:%(lineno)d - %(levelname)s - %(message)s"
+    )
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+
+    logger = logging.getLogger(__name__)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+    return logger
+
+
+appLogger = setup_logging()
+
+
+@click.command()
+@click.argument(
+    "manifest_paths",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--output-dir",
+    "outputDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=True,
+    help="各シャードの出力をまとめる先のディレクトリ",
+)
+@click.option(
+    "--manifest-output",
+    "manifestOutputPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="統合したマニフェストの書き出し先",
+)
+@click.option(
+    "--stats",
+    "statsPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="言語ごとの過去の所要時間 (今回の実績で更新する)",
+)
+def main(
+    manifest_paths: tuple[Path, ...],
+    outputDir: Path,
+    manifestOutputPath: Path | None,
+    statsPath: Path | None,
+) -> None:
+    """Combine the outputs and manifests of `scrape_trending_batch.py --shard` runs."""
+    appLogger.info("start app")
+    appLogger.info(
+        f"command-line argument: MANIFESTS = {list(map(str, manifest_paths))}"
+    )
+    appLogger.info(f"command-line argument: --output-dir = {outputDir}")
+    appLogger.info(f"command-line argument: --manifest-output = {manifestOutputPath}")
+    appLogger.info(f"command-line argument: --stats = {statsPath}")
+
+    manifests: list[tuple[Path, dict[str, Any]]] = []
+    for manifest_path in manifest_paths:
+        try:
+            manifests.append((manifest_path, read_manifest(manifest_path)))
+        except (OSError, ValueError) as e:
+            appLogger.error(f"Error reading manifest {manifest_path}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    # 同じ実行 (period / snapshot) のシャードだけを統合する
+    period = manifests[0][1]["period"]
+    snapshot = manifests[0][1]["snapshot"]
+    for manifest_path, manifest in manifests:
+        if manifest["period"] != period or manifest["snapshot"] != snapshot:
+            appLogger.error(
+                f"{manifest_path} is for {manifest['period']} {manifest['snapshot']}, "
+                f"expected {period} {snapshot}"
+            )
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    shard_counts = {int(m["shard"].split("/")[1]) for _, m in manifests}
+    if len(shard_counts) != 1:
+        appLogger.error(f"manifests come from different shard counts: {shard_counts}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    shard_count = shard_counts.pop()
+    present = {m["shard"] for _, m in manifests}
+    missing = [f"{i}/{shard_count}" for i in range(1, shard_count + 1)]
+    missing = [s for s in missing if s not in present]
+    if missing:
+        appLogger.warning(f"missing shards: {', '.join(missing)}")
+
+    results: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    copied = 0
+    transfer = {"requests": 0, "wire_bytes": 0, "decoded_bytes": 0}
+    for manifest_path, manifest in manifests:
+        shard_dir = manifest_path.parent / manifest["output_dir"]
+        for key, value in manifest.get("transfer", {}).items():
+            transfer[key] = transfer.get(key, 0) + value
+        for result in manifest["results"]:
+            if result["language"] in seen:
+                appLogger.error(
+                    f"language {result['language']} appears in more than one shard"
+                )
+                appLogger.error("app failed")
+                sys.exit(1)
+            seen.add(result["language"])
+            results.append(result)
+
+            if result["status"] != "ok":
+                continue
+
+            src = shard_dir / result["output"]
+            dst = outputDir / result["output"]
+            if src.resolve() == dst.resolve():
+                continue
+            try:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(src, dst)
+            except OSError as e:
+                appLogger.error(f"Error copying {src} to {dst}: {e}")
+                appLogger.error("app failed")
+                sys.exit(1)
+            copied += 1
+
+    results.sort(key=lambda r: r["language"])
+    changed = sum(1 for r in results if r.get("changed"))
+    failed = sum(1 for r in results if r["status"] == "failed")
+    deferred = sum(1 for r in results if r["status"] == "deferred")
+    appLogger.info(
+        f"merged {len(manifests)} shards: {len(results)} languages, "
+        f"{copied} files copied, {changed} changed, {failed} failed, {deferred} deferred"
+    )
+
+    if manifestOutputPath:
+        try:
+            write_manifest(
+                manifestOutputPath,
+                {
+                    "period": period,
+                    "snapshot": snapshot,
+                    "shard": "1/1",
+                    "output_dir": os.path.relpath(outputDir, manifestOutputPath.parent),
+                    "transfer": transfer,
+                    "results": results,
+                },
+            )
+        except OSError as e:
+            appLogger.error(f"Error writing manifest {manifestOutputPath}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    if statsPath:
+        try:
+            stats = load_stats(statsPath)
+            update_stats(stats, results)
+            save_stats(statsPath, stats)
+        except (OSError, ValueError) as e:
+            appLogger.error(f"Error updating stats {statsPath}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    appLogger.info("app finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import re
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from trending_repo import TrendingRepo
+
+
+# スイープの前に、トレンドが途切れることのない言語のページを取得して抽出結果を確かめる
+#
+# GitHubがトレンドページのマークアップを変えると、全言語で0件になる (空のフィードで上書きされる).
+# 抽出結果が次のどれかに当てはまるページは「壊れている」とみなす
+#
+# - MIN_REPOS 件より少ない
+# - パスが /owner/repo の形でないものがある、または重複がある
+# - 説明が1件もない、または MAX_DESCRIPTION_LENGTH 文字を超える説明がある (ページの別の部分を拾っている)
+# - 行の半分以上からリポジトリを取り出せていない (順位が件数の2倍を超える)
+DEFAULT_PREFLIGHT_LANGUAGES = ("python", "javascript", "typescript")
+MIN_REPOS = 5
+MAX_DESCRIPTION_LENGTH = 1000
+
+# GitHubのユーザー名 (英数字とハイフン、39文字まで) / リポジトリ名
+REPO_PATH_PATTERN = re.compile(
+    r"^/[A-Za-z0-9][A-Za-z0-9-]{0,38}/[A-Za-z0-9._-]{1,100}$"
+)
+
+
+@dataclass(slots=True)
+class Probe:
+    """The outcome of fetching and checking one preflight language."""
+
+    language: str
+    repos: int = 0
+    problems: list[str] = field(default_factory=list)
+    # 取得自体に失敗した場合 (ページの構造については何もわからない)
+    error: str | None = None
+
+    @property
+    def conclusive(self) -> bool:
+        return self.error is None
+
+    @property
+    def broken(self) -> bool:
+        return self.conclusive and bool(self.problems)
+
+
+def check_repos(repos: Sequence[TrendingRepo]) -> list[str]:
+    """Problems that suggest the page markup changed; empty if the page looks fine."""
+    if len(repos) < MIN_REPOS:
+        return [f"only {len(repos)} repositories extracted (expected {MIN_REPOS}+)"]
+
+    problems: list[str] = []
+    malformed = [repo.path for repo in repos if not REPO_PATH_PATTERN.match(repo.path)]
+    if malformed:
+        problems.append(
+            f"{len(malformed)} malformed repository paths (e.g. {malformed[0]!r})"
+        )
+    if len({repo.path for repo in repos}) != len(repos):
+        problems.append("duplicate repositories")
+
+    descriptions = [repo.description for repo in repos if repo.description]
+    if not descriptions:
+        problems.append("no repository has a description")
+    too_long = sum(1 for text in descriptions if len(text) > MAX_DESCRIPTION_LENGTH)
+    if too_long:
+        problems.append(
+            f"{too_long} descriptions longer than {MAX_DESCRIPTION_LENGTH} characters"
+        )
+
+    if max(repo.rank for repo in repos) > 2 * len(repos):
+        problems.append("most rows of the page did not yield a repository")
+    return problems
+
+
+def page_looks_broken(probes: Sequence[Probe]) -> bool:
+    """True when every probe that could be fetched failed the checks.
+
+    Markup changes hit every language at once, so one odd page among good
+    ones is not enough. Probes that could not be fetched say nothing
+    about the markup; if none could be fetched, the sweep goes ahead and
+    records the failures as usual.
+    """
+    conclusive = [probe for probe in probes if probe.conclusive]
+    return bool(conclusive) and all(probe.broken for probe in conclusive)
@@ -0,0 +1,102 @@
+import os
+import json
+import time
+from pathlib import Path
+
+
+# 同じホストで動くすべてのスクレイパー (daily / weekly / monthly のバッチ、デーモン、
+# 手動の再実行、ローカルでのデバッグ) で共有するトークンバケット
+#
+# 状態 {"tokens": 残りトークン数, "updated": 最後に更新した時刻} はファイルに置き、
+# flockで排他して読み書きする
+#
+# - トークンは rate 個/秒 で補充され、burst 個まで貯まる
+# - リクエストの開始ごとに1個使う. 足りなければ前借りし、補充される時刻まで待つ
+#   (前借りした順に待ち時間が長くなるので、同時に走るプロセス間でも順番が保たれる)
+# - 時刻はプロセス間で共通の time.time() を使う
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 4.0
+
+
+class SharedRateLimiter:
+    """A token bucket whose state lives in a locked file, shared by every process on the host.
+
+    All processes (and threads) that use the same `path` stay within
+    `rate` requests per second together, with bursts of up to `burst`.
+    Raises ValueError for invalid settings or where flock is not available.
+    """
+
+    def __init__(
+        self, path: Path, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST
+    ):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, got {burst}")
+        try:
+            import fcntl
+        except ImportError:
+            raise ValueError(
+                "the shared rate limiter is not supported on this platform"
+            ) from None
+
+        self._fcntl = fcntl
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def interval(self) -> float:
+        """The average spacing of requests once the burst is used up."""
+        return 1 / self.rate
+
+    def _refill(self, state: dict[str, float], now: float) -> float:
+        try:
+            tokens = float(state["tokens"])
+            updated = float(state["updated"])
+        except (KeyError, TypeError, ValueError):
+            # 初回 (空のファイル) や壊れた状態は満タンから始める
+            return self.burst
+        # 時計が戻った場合は補充しない
+        elapsed = max(now - updated, 0.0)
+        return min(tokens + elapsed * self.rate, self.burst)
+
+    def _take(self, wait: bool) -> float | None:
+        # トークンを1個使った後の残り (wait=False で足りなければ使わずに None)
+        fcntl = self._fcntl
+        # 呼び出しごとに開き直すので、同じプロセスのスレッド同士もflockで排他される
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                state = json.loads(f.read() or "{}")
+            except json.JSONDecodeError:
+                state = {}
+            now = time.time()
+            tokens = self._refill(state if isinstance(state, dict) else {}, now) - 1
+            if tokens < 0 and not wait:
+                return None
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({"tokens": tokens, "updated": now}))
+            f.flush()
+            # ロックはファイルを閉じると解放される
+        return tokens
+
+    def reserve(self) -> float:
+        """Take one token; returns the seconds to wait before the request may start."""
+        tokens = self._take(wait=True)
+        assert tokens is not None
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+    def try_acquire(self) -> bool:
+        """Take one token only if one is available now (never borrows or waits)."""
+        return self._take(wait=False) is not None
+
+    def acquire(self) -> float:
+        """Wait for a token; returns the seconds waited."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
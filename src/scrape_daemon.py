@@ -0,0 +1,883 @@
+import sys
+import json
+import time
+import shutil
+import signal
+import logging
+import datetime
+import threading
+import warnings
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import click
+
+from feed_layout import PERIODS
+from http_client import (
+    ACCEPT_ENCODING,
+    CONNECT_TIMEOUT,
+    DEFAULT_HEDGE_BUDGET,
+    READ_TIMEOUT,
+    TRANSPORTS,
+    Transport,
+    create_transport,
+)
+from preflight import DEFAULT_PREFLIGHT_LANGUAGES
+from rate_limiter import DEFAULT_BURST, DEFAULT_RATE
+from scrape_trending import ScrapeError, parse_updated_date
+from scrape_trending_batch import (
+    SweepConfig,
+    SweepError,
+    SweepLockedError,
+    SweepResult,
+    run_sweep,
+)
+from sweep_schedule import parse_duration
+
+
+def setup_logging(level: int = logging.INFO) -> logging.Logger:
+    # Making Python loggers output all messages to stdout in addition to log file
+    # https://stackoverflow.com/questions/14058453/making-python-loggers-output-all-messages-to-stdout-in-addition-to-log-file
+    formatter = logging.Formatter(
+        "%(asctime)s - %(pathname)s:%(lineno)d - %(levelname)s - %(message)s"
+    )
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+
+    logger = logging.getLogger(__name__)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+    return logger
+
+
+appLogger = setup_logging()
+
+# GitHub Actionsのワークフロー (.github/workflows/scrape_trending_*.yml) と同じ時刻 (UTC)
+DEFAULT_SCHEDULES = {
+    "daily": "0 15 * * *",
+    "weekly": "0 16 * * 1",
+    "monthly": "0 17 1 * *",
+}
+
+# (名前, 最小値, 最大値)
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 7),
+)
+
+# 何年先まで探して一致しなければ、ありえない指定 (2/30 など) とみなすか
+CRON_SEARCH_YEARS = 5
+
+
+def parse_cron_field(text: str, name: str, low: int, high: int) -> frozenset[int]:
+    """Parse one cron field: *, */n, a, a-b, a-b/n and comma-separated lists of them."""
+    values: set[int] = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) < 1:
+                raise ValueError(f"invalid step in {name} field: {text!r}")
+            step = int(step_text)
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            if not (start_text.isdigit() and end_text.isdigit()):
+                raise ValueError(f"invalid range in {name} field: {text!r}")
+            start, end = int(start_text), int(end_text)
+        elif part.isdigit():
+            start = int(part)
+            # "5/10" は "5-最大値/10" と同じ
+            end = high if step > 1 else start
+        else:
+            raise ValueError(f"invalid {name} field: {text!r}")
+
+        if not (low <= start <= end <= high):
+            raise ValueError(f"{name} field out of range {low}-{high}: {text!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True, slots=True)
+class CronSchedule:
+    """A 5-field cron expression (minute hour day-of-month month day-of-week), in UTC."""
+
+    expression: str
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]
+    # day-of-month / day-of-week が "*" 以外か (両方指定時はcronと同じくどちらかに一致すればよい)
+    days_restricted: bool
+    weekdays_restricted: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "CronSchedule":
+        fields = expression.split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(
+                f"cron expression must have {len(CRON_FIELDS)} fields: {expression!r}"
+            )
+        minutes, hours, days, months, weekdays = (
+            parse_cron_field(text, name, low, high)
+            for text, (name, low, high) in zip(fields, CRON_FIELDS)
+        )
+        schedule = cls(
+            expression=expression,
+            minutes=minutes,
+            hours=hours,
+            days=days,
+            months=months,
+            # 7 も日曜日
+            weekdays=frozenset(d % 7 for d in weekdays),
+            days_restricted=fields[2] != "*",
+            weekdays_restricted=fields[4] != "*",
+        )
+        # 2/30 のように決して来ない指定はここで弾く
+        schedule.next_after(datetime.datetime(2000, 1, 1, tzinfo=datetime.UTC))
+        return schedule
+
+    def _day_matches(self, t: datetime.datetime) -> bool:
+        day = t.day in self.days
+        # cronの曜日は日曜日が0 (datetime.weekday() は月曜日が0)
+        weekday = (t.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day or weekday
+        return day and weekday
+
+    def next_after(self, after: datetime.datetime) -> datetime.datetime:
+        """The first matching minute strictly after `after` (an aware datetime)."""
+        t = after.astimezone(datetime.UTC).replace(second=0, microsecond=0)
+        t += datetime.timedelta(minutes=1)
+        limit = t.year + CRON_SEARCH_YEARS
+        # 一致しない月・日・時はまとめて飛ばす
+        while t.year <= limit:
+            if t.month not in self.months:
+                t = (
+                    t.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)
+                ).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += datetime.timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"cron expression never matches: {self.expression!r}")
+
+
+def parse_schedules(specs: tuple[str, ...]) -> dict[str, CronSchedule]:
+    """Parse --schedule period=CRON options; without any, use DEFAULT_SCHEDULES."""
+    if not specs:
+        return {
+            period: CronSchedule.parse(expression)
+            for period, expression in DEFAULT_SCHEDULES.items()
+        }
+    schedules: dict[str, CronSchedule] = {}
+    for spec in specs:
+        period, sep, expression = spec.partition("=")
+        period = period.strip()
+        if not sep or period not in PERIODS:
+            raise ValueError(
+                f"--schedule must be <period>=<cron> with period in {', '.join(PERIODS)}: {spec!r}"
+            )
+        if period in schedules:
+            raise ValueError(f"--schedule given twice for {period}")
+        schedules[period] = CronSchedule.parse(expression.strip())
+    return schedules
+
+
+@dataclass(slots=True)
+class PeriodStatus:
+    schedule: str
+    next_run: datetime.datetime | None = None
+    running: bool = False
+    # "ok" / "error" / "skipped" (別のスイープがロックを持っていた) ごとの回数
+    runs: dict[str, int] = field(
+        default_factory=lambda: {"ok": 0, "error": 0, "skipped": 0}
+    )
+    last_status: str | None = None
+    last_error: str | None = None
+    last_started: datetime.datetime | None = None
+    last_success: datetime.datetime | None = None
+    last_duration: float | None = None
+    languages_ok: int = 0
+    languages_failed: int = 0
+    languages_deferred: int = 0
+    wire_bytes_total: int = 0
+
+
+class DaemonState:
+    """Thread-safe run history shared by the scheduler and the HTTP endpoint."""
+
+    def __init__(self, schedules: dict[str, CronSchedule]):
+        self._lock = threading.Lock()
+        self.started = datetime.datetime.now(datetime.UTC)
+        self.periods = {
+            period: PeriodStatus(schedule=schedule.expression)
+            for period, schedule in schedules.items()
+        }
+
+    def set_next_run(self, period: str, next_run: datetime.datetime) -> None:
+        with self._lock:
+            self.periods[period].next_run = next_run
+
+    def sweep_started(self, period: str, started: datetime.datetime) -> None:
+        with self._lock:
+            status = self.periods[period]
+            status.running = True
+            status.last_started = started
+
+    def sweep_finished(
+        self,
+        period: str,
+        outcome: str,
+        duration: float,
+        results: list[SweepResult] | None = None,
+        error: str | None = None,
+    ) -> None:
+        with self._lock:
+            status = self.periods[period]
+            status.running = False
+            status.runs[outcome] += 1
+            status.last_status = outcome
+            status.last_error = error
+            status.last_duration = duration
+            if results is not None:
+                status.last_success = datetime.datetime.now(datetime.UTC)
+                status.languages_ok = sum(1 for r in results if r.status == "ok")
+                status.languages_failed = sum(
+                    1 for r in results if r.status == "failed"
+                )
+                status.languages_deferred = sum(
+                    1 for r in results if r.status == "deferred"
+                )
+                status.wire_bytes_total += sum(r.wire_bytes or 0 for r in results)
+
+    def health(self) -> dict[str, Any]:
+        def iso(value: datetime.datetime | None) -> str | None:
+            return value.isoformat() if value else None
+
+        with self._lock:
+            return {
+                "status": "ok",
+                "started": iso(self.started),
+                "periods": {
+                    period: {
+                        "schedule": s.schedule,
+                        "running": s.running,
+                        "next_run": iso(s.next_run),
+                        "last_status": s.last_status,
+                        "last_error": s.last_error,
+                        "last_started": iso(s.last_started),
+                        "last_success": iso(s.last_success),
+                        "last_duration": s.last_duration,
+                        "languages_ok": s.languages_ok,
+                        "languages_failed": s.languages_failed,
+                        "languages_deferred": s.languages_deferred,
+                        "runs": dict(s.runs),
+                    }
+                    for period, s in self.periods.items()
+                },
+            }
+
+    def metrics(self) -> str:
+        """Prometheus text exposition format."""
+
+        def timestamp(value: datetime.datetime | None) -> str:
+            return f"{value.timestamp():.0f}" if value else "0"
+
+        lines = [
+            "# HELP trending_daemon_start_time_seconds Start time of the daemon.",
+            "# TYPE trending_daemon_start_time_seconds gauge",
+            f"trending_daemon_start_time_seconds {timestamp(self.started)}",
+        ]
+        with self._lock:
+            items = list(self.periods.items())
+            metrics: list[tuple[str, str, str, list[tuple[str, Any]]]] = [
+                (
+                    "trending_sweep_runs_total",
+                    "counter",
+                    "Sweeps by outcome (skipped: another sweep held the lock).",
+                    [
+                        (f'period="{p}",status="{outcome}"', count)
+                        for p, s in items
+                        for outcome, count in s.runs.items()
+                    ],
+                ),
+                (
+                    "trending_sweep_running",
+                    "gauge",
+                    "1 while a sweep of the period is running.",
+                    [(f'period="{p}"', int(s.running)) for p, s in items],
+                ),
+                (
+                    "trending_sweep_last_success_timestamp_seconds",
+                    "gauge",
+                    "End time of the last sweep that ran to completion.",
+                    [(f'period="{p}"', timestamp(s.last_success)) for p, s in items],
+                ),
+                (
+                    "trending_sweep_last_duration_seconds",
+                    "gauge",
+                    "Duration of the last sweep.",
+                    [
+                        (f'period="{p}"', f"{s.last_duration or 0:.3f}")
+                        for p, s in items
+                    ],
+                ),
+                (
+                    "trending_sweep_next_run_timestamp_seconds",
+                    "gauge",
+                    "Next scheduled start.",
+                    [(f'period="{p}"', timestamp(s.next_run)) for p, s in items],
+                ),
+                (
+                    "trending_sweep_languages",
+                    "gauge",
+                    "Languages of the last completed sweep by status.",
+                    [
+                        (f'period="{p}",status="{status}"', count)
+                        for p, s in items
+                        for status, count in (
+                            ("ok", s.languages_ok),
+                            ("failed", s.languages_failed),
+                            ("deferred", s.languages_deferred),
+                        )
+                    ],
+                ),
+                (
+                    "trending_sweep_wire_bytes_total",
+                    "counter",
+                    "Response bytes received on the wire (compressed).",
+                    [(f'period="{p}"', s.wire_bytes_total) for p, s in items],
+                ),
+            ]
+        for name, kind, help_text, samples in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+def start_status_server(
+    state: DaemonState, host: str, port: int
+) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/healthz":
+                body = json.dumps(state.health(), ensure_ascii=False).encode("utf-8")
+                content_type = "application/json"
+            elif self.path == "/metrics":
+                body = state.metrics().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            appLogger.debug(f"status endpoint: {format % args}")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_listen(listen: str) -> tuple[str, int]:
+    host, sep, port = listen.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"--listen must be <host>:<port>: {listen!r}")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+def archive_feeds(
+    output_dir: Path, period: str, snapshot: str, results: list[SweepResult]
+) -> int:
+    """Copy each fetched feed to <lang>/<period>/<period>-YYYY-MM-DD.atom, as the workflows do."""
+    copied = 0
+    for result in results:
+        if result.status != "ok":
+            continue
+        source = output_dir / result.output
+        archive = source.parent / period / f"{period}-{snapshot}.atom"
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, archive)
+        copied += 1
+    return copied
+
+
+class Daemon:
+    """Run the sweeps on their schedules, one at a time, over one warm transport."""
+
+    def __init__(
+        self,
+        schedules: dict[str, CronSchedule],
+        base_config: SweepConfig,
+        state_dir: Path | None,
+        archive: bool,
+        transport_client: Transport,
+        state: DaemonState,
+    ):
+        self.schedules = schedules
+        self.base_config = base_config
+        self.state_dir = state_dir
+        self.archive = archive
+        self.transport_client = transport_client
+        self.state = state
+        self.stop_event = threading.Event()
+
+    def sweep_config(self, period: str, now: datetime.datetime) -> SweepConfig:
+        snapshot = now.date().isoformat()
+        # スクリプト (scrape_trending_*.sh) と同じく、その日の0時をupdatedにする
+        config = replace(
+            self.base_config, period=period, atom_updated_date=f"{snapshot}T00:00:00"
+        )
+        if self.state_dir:
+            config.stats_path = self.state_dir / f"{period}-stats.json"
+            config.manifest_path = self.state_dir / f"{period}-manifest.json"
+            # 途中で止めても、同じ日のうちに再開すれば完了済みの言語は取り直さない
+            config.journal_path = self.state_dir / f"{period}-journal.jsonl"
+            config.resume = True
+        return config
+
+    def run_once(self, period: str) -> None:
+        started = datetime.datetime.now(datetime.UTC)
+        config = self.sweep_config(period, started)
+        appLogger.info(f"sweep {period}: started")
+        self.state.sweep_started(period, started)
+        clock = time.monotonic()
+        try:
+            results = run_sweep(config, self.transport_client)
+            if self.archive:
+                copied = archive_feeds(
+                    config.output_dir, period, started.date().isoformat(), results
+                )
+                appLogger.info(f"sweep {period}: archived {copied} feeds")
+        except SweepLockedError as e:
+            appLogger.warning(f"sweep {period}: {e}")
+            self.state.sweep_finished(
+                period, "skipped", time.monotonic() - clock, error=str(e)
+            )
+            return
+        except (SweepError, OSError) as e:
+            appLogger.error(f"sweep {period} failed: {e}")
+            self.state.sweep_finished(
+                period, "error", time.monotonic() - clock, error=str(e)
+            )
+            return
+        except Exception as e:
+            # 想定外の不具合でもスケジューラーは止めず、次の予定を待つ
+            appLogger.exception(f"sweep {period} failed unexpectedly: {e}")
+            self.state.sweep_finished(
+                period,
+                "error",
+                time.monotonic() - clock,
+                error=f"{type(e).__name__}: {e}",
+            )
+            return
+        elapsed = time.monotonic() - clock
+        self.state.sweep_finished(period, "ok", elapsed, results=results)
+        appLogger.info(f"sweep {period}: finished in {elapsed:.1f}s")
+
+    def run(self) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        next_runs = {
+            period: schedule.next_after(now)
+            for period, schedule in self.schedules.items()
+        }
+        while not self.stop_event.is_set():
+            for period, next_run in next_runs.items():
+                self.state.set_next_run(period, next_run)
+            period, next_run = min(next_runs.items(), key=lambda item: item[1])
+            appLogger.info(f"next sweep: {period} at {next_run.isoformat()}")
+            wait = (next_run - datetime.datetime.now(datetime.UTC)).total_seconds()
+            if self.stop_event.wait(max(0.0, wait)):
+                break
+
+            # スイープは1つずつ順に実行する. 実行中に来た時刻の分は、終わってから1回だけ実行する
+            self.run_once(period)
+            next_runs[period] = self.schedules[period].next_after(
+                max(next_run, datetime.datetime.now(datetime.UTC))
+            )
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+
+@click.command()
+@click.option(
+    "--schedule",
+    "scheduleSpecs",
+    type=str,
+    multiple=True,
+    help="<period>=<cron> (UTC). 複数指定可. 省略時はワークフローと同じ daily '0 15 * * *', weekly '0 16 * * 1', monthly '0 17 1 * *'",
+)
+@click.option(
+    "--languages",
+    "languagesPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=Path("languages.txt"),
+    show_default=True,
+    help="取得対象の言語一覧",
+)
+@click.option(
+    "--output-dir",
+    "outputDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("docs/feeds"),
+    show_default=True,
+    help="<lang>/<period>.atom を書き出すディレクトリ",
+)
+@click.option(
+    "--aggregate-dir",
+    "aggregateDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=False,
+    help="全言語をまとめたフィード (<group>/<period>.atom) を書き出すディレクトリ",
+)
+@click.option(
+    "--aggregate-groups",
+    "aggregateGroupsPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="まとめる言語のグループ (TOML). 省略時は全言語の all のみ",
+)
+@click.option(
+    "--state-dir",
+    "stateDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=False,
+    help="periodごとの所要時間・ジャーナル・マニフェストを置くディレクトリ (同じ日の再開に使う)",
+)
+@click.option(
+    "--lock-file",
+    "lockPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="スイープ中にflockするファイル. 省略時は <output-dir>/../.scrape.lock",
+)
+@click.option(
+    "--deadline",
+    type=str,
+    required=False,
+    help="1回のスイープの制限時間 (例: 45m). 優先度の高い言語から処理し、間に合わない言語は後回しにする",
+)
+@click.option(
+    "--priorities",
+    "prioritiesPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="--deadline で使う言語ごとの重要度 (TOML)",
+)
+@click.option(
+    "--archive/--no-archive",
+    default=True,
+    show_default=True,
+    help="取得したフィードを <lang>/<period>/<period>-YYYY-MM-DD.atom にもコピーする",
+)
+@click.option(
+    "--stable-ids",
+    is_flag=True,
+    default=False,
+    help="エントリのidをトレンド入りしている間は固定し、内容が変わらなければupdatedも前回の値を保つ",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="リクエストの開始間隔 (秒)",
+)
+@click.option(
+    "--connect-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=CONNECT_TIMEOUT,
+    show_default=True,
+    help="接続のタイムアウト (秒)",
+)
+@click.option(
+    "--read-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=READ_TIMEOUT,
+    show_default=True,
+    help="応答の読み取りのタイムアウト (秒. データが届かない間隔)",
+)
+@click.option(
+    "--language-deadline",
+    type=click.FloatRange(min=0, min_open=True),
+    required=False,
+    help="1言語の取得 (再試行を含む) の制限時間 (秒). 超えた言語はタイムアウトとして失敗する",
+)
+@click.option(
+    "--hedge",
+    is_flag=True,
+    default=False,
+    help="これまでのp95を超えて応答のないリクエストをもう1本送り、先に返った方を使う",
+)
+@click.option(
+    "--hedge-budget",
+    type=click.FloatRange(min=0, max=1),
+    default=DEFAULT_HEDGE_BUDGET,
+    show_default=True,
+    help="--hedge で複製してよいリクエストの割合",
+)
+@click.option(
+    "--preflight/--no-preflight",
+    default=True,
+    show_default=True,
+    help="スイープの前に --preflight-language のページを取得し、抽出結果がおかしければフィードを書かずに中止する (終了コード 41)",
+)
+@click.option(
+    "--preflight-language",
+    "preflight_languages",
+    type=str,
+    multiple=True,
+    default=DEFAULT_PREFLIGHT_LANGUAGES,
+    show_default=True,
+    help="事前確認に使う言語 (複数指定可. 取得したページはスイープでもそのまま使う)",
+)
+@click.option(
+    "--rate-limit-file",
+    "rateLimitPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="ホスト上の全スクレイパーで共有するトークンバケットの状態ファイル (バッチの --rate-limit-file と同じ)",
+)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_RATE,
+    show_default=True,
+    help="--rate-limit-file の全体のリクエスト数 (回/秒)",
+)
+@click.option(
+    "--rate-burst",
+    type=click.FloatRange(min=1),
+    default=DEFAULT_BURST,
+    show_default=True,
+    help="--rate-limit-file で続けて送れるリクエスト数の上限",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="同時に取得する言語数",
+)
+@click.option(
+    "--transport",
+    type=click.Choice(TRANSPORTS, case_sensitive=True),
+    default="requests",
+    show_default=True,
+    help="HTTPクライアントのバックエンド (http2は1本の接続で多重化する. httpx[http2]が必要)",
+)
+@click.option(
+    "--accept-encoding",
+    type=str,
+    default=ACCEPT_ENCODING,
+    show_default=True,
+    help="送信するAccept-Encoding (identityで圧縮なし)",
+)
+@click.option(
+    "--user-agent",
+    type=str,
+    required=False,
+    help="送信するUser-Agent (省略時はHTTPクライアントの既定値)",
+)
+@click.option(
+    "--listen",
+    type=str,
+    default="127.0.0.1:8787",
+    show_default=True,
+    help="/healthz と /metrics を返すアドレス",
+)
+@click.option("--verbose", is_flag=True, default=False, show_default=True, help="")
+@click.option(
+    "--timeout",
+    type=float,
+    required=False,
+    hidden=True,
+    help="接続・読み取り共通のタイムアウト (秒). 互換のため残している",
+)
+def main(
+    scheduleSpecs: tuple[str, ...],
+    languagesPath: Path,
+    outputDir: Path,
+    aggregateDir: Path | None,
+    aggregateGroupsPath: Path | None,
+    stateDir: Path | None,
+    lockPath: Path | None,
+    deadline: str | None,
+    prioritiesPath: Path | None,
+    archive: bool,
+    stable_ids: bool,
+    interval: float,
+    connect_timeout: float,
+    read_timeout: float,
+    language_deadline: float | None,
+    hedge: bool,
+    hedge_budget: float,
+    preflight: bool,
+    preflight_languages: tuple[str, ...],
+    rateLimitPath: Path | None,
+    rate_limit: float,
+    rate_burst: float,
+    workers: int,
+    transport: str,
+    accept_encoding: str,
+    user_agent: str | None,
+    listen: str,
+    verbose: bool,
+    timeout: float | None,
+) -> None:
+    appLogger.info("start app")
+    appLogger.info(f"command-line argument: --schedule = {list(scheduleSpecs)}")
+    appLogger.info(f"command-line argument: --languages = {languagesPath}")
+    appLogger.info(f"command-line argument: --output-dir = {outputDir}")
+    appLogger.info(f"command-line argument: --aggregate-dir = {aggregateDir}")
+    appLogger.info(f"command-line argument: --aggregate-groups = {aggregateGroupsPath}")
+    appLogger.info(f"command-line argument: --state-dir = {stateDir}")
+    appLogger.info(f"command-line argument: --lock-file = {lockPath}")
+    appLogger.info(f"command-line argument: --deadline = {deadline}")
+    appLogger.info(f"command-line argument: --priorities = {prioritiesPath}")
+    appLogger.info(f"command-line argument: --archive = {archive}")
+    appLogger.info(f"command-line argument: --stable-ids = {stable_ids}")
+    appLogger.info(f"command-line argument: --interval = {interval}")
+    appLogger.info(f"command-line argument: --connect-timeout = {connect_timeout}")
+    appLogger.info(f"command-line argument: --read-timeout = {read_timeout}")
+    appLogger.info(f"command-line argument: --language-deadline = {language_deadline}")
+    appLogger.info(f"command-line argument: --hedge = {hedge}")
+    appLogger.info(f"command-line argument: --hedge-budget = {hedge_budget}")
+    appLogger.info(f"command-line argument: --preflight = {preflight}")
+    appLogger.info(
+        f"command-line argument: --preflight-language = {preflight_languages}"
+    )
+    appLogger.info(f"command-line argument: --rate-limit-file = {rateLimitPath}")
+    appLogger.info(f"command-line argument: --rate-limit = {rate_limit}")
+    appLogger.info(f"command-line argument: --rate-burst = {rate_burst}")
+    appLogger.info(f"command-line argument: --workers = {workers}")
+    appLogger.info(f"command-line argument: --transport = {transport}")
+    appLogger.info(f"command-line argument: --accept-encoding = {accept_encoding}")
+    appLogger.info(f"command-line argument: --user-agent = {user_agent}")
+    appLogger.info(f"command-line argument: --listen = {listen}")
+
+    if verbose:
+        appLogger.setLevel(logging.DEBUG)
+    else:
+        # scrape_trending.py と同様に dateparser の DeprecationWarning を抑止する
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    try:
+        schedules = parse_schedules(scheduleSpecs)
+        host, port = parse_listen(listen)
+        deadline_seconds = parse_duration(deadline) if deadline else None
+        if prioritiesPath and deadline_seconds is None:
+            raise ValueError("--priorities requires --deadline")
+    except ValueError as e:
+        appLogger.error(str(e))
+        appLogger.error("app failed")
+        sys.exit(1)
+    for period, schedule in schedules.items():
+        appLogger.info(f"schedule: {period} = {schedule.expression} (UTC)")
+
+    # 同じ出力先に対するワークフローや手動実行のスイープとも重ならないよう、
+    # 出力先の隣のファイルで排他する
+    if lockPath is None:
+        lockPath = outputDir.resolve().parent / ".scrape.lock"
+
+    # dateparserは初回の解析で言語データを読み込むので、スケジュールの前に済ませておく
+    try:
+        parse_updated_date(
+            datetime.datetime.now(datetime.UTC).date().isoformat() + "T00:00:00"
+        )
+    except ScrapeError as e:
+        appLogger.error("app failed")
+        sys.exit(e.return_code.value)
+
+    try:
+        transport_client = create_transport(
+            transport,
+            pool_size=workers,
+            accept_encoding=accept_encoding,
+            user_agent=user_agent,
+        )
+    except ValueError as e:
+        appLogger.error(f"transport error: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    base_config = SweepConfig(
+        period=PERIODS[0],
+        languages_path=languagesPath,
+        output_dir=outputDir,
+        stable_ids=stable_ids,
+        aggregate_dir=aggregateDir,
+        aggregate_groups_path=aggregateGroupsPath,
+        interval=interval,
+        rate_limit_path=rateLimitPath,
+        rate_limit=rate_limit,
+        rate_burst=rate_burst,
+        workers=workers,
+        transport=transport,
+        accept_encoding=accept_encoding,
+        user_agent=user_agent,
+        timeout=timeout if timeout is not None else (connect_timeout, read_timeout),
+        language_deadline=language_deadline,
+        hedge=hedge,
+        hedge_budget=hedge_budget,
+        preflight_languages=preflight_languages if preflight else (),
+        lock_path=lockPath,
+        deadline=deadline_seconds,
+        priorities_path=prioritiesPath,
+    )
+    state = DaemonState(schedules)
+    daemon = Daemon(schedules, base_config, stateDir, archive, transport_client, state)
+
+    try:
+        server = start_status_server(state, host, port)
+    except OSError as e:
+        appLogger.error(f"cannot listen on {listen}: {e}")
+        appLogger.error("app failed")
+        transport_client.close()
+        sys.exit(1)
+    appLogger.info(
+        f"status endpoint: http://{host}:{server.server_address[1]}/healthz, /metrics"
+    )
+
+    def handle_signal(signum: int, frame: Any) -> None:
+        # 実行中のスイープは最後まで終わらせてから止める
+        appLogger.info(f"received {signal.Signals(signum).name}, stopping")
+        daemon.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    try:
+        daemon.run()
+    finally:
+        server.shutdown()
+        transport_client.close()
+
+    appLogger.info("app finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ import click
 from bs4 import BeautifulSoup, Tag
 from bs4.element import PageElement
 
+from http_client import FetchResponse, default_transport
+
 
 URL: str = "https://github.com/trending"
 
@@ -36,8 +38,9 @@ def scrape_languages(sort: bool, output: Optional[Path], incremental: bool) -> N
     """Scrape GitHub trending languages and output them as a list."""
 
     try:
-        response: requests.Response = requests.get(URL)
-        response.raise_for_status()
+        # 共有のクライアント (接続プール・再試行・タイムアウトはhttp_client.pyで設定)
+        # raises HTTPError on 4xx/5xx
+        response: FetchResponse = default_transport().get(URL)
 
         soup: BeautifulSoup = BeautifulSoup(response.content, "html.parser")
 
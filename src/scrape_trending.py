@@ -1,17 +1,15 @@
 import sys
+import re
 import traceback
 import logging
 import datetime
 import warnings
 from pathlib import Path
-from urllib3.util.retry import Retry
+from typing import Any, Iterable
 from enum import Enum
 
 import click
 import dateparser
-import requests
-from lxml import etree
-from requests.adapters import HTTPAdapter
 from requests.exceptions import (  # https://requests.readthedocs.io/en/latest/_modules/requests/exceptions/
     RequestException,
     HTTPError,
@@ -22,7 +20,47 @@ from requests.exceptions import (  # https://requests.readthedocs.io/en/latest/_
     InvalidURL,
     TooManyRedirects,
 )
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+from lxml import etree
+
+from atom_feed import (
+    ATOM_AUTHOR,
+    SITE_URL,
+    FeedState,
+    append_repository_entry,
+    carry_over_updated,
+    feed_state,
+    new_feed,
+    stable_entry_id,
+    stable_entry_id_prefix,
+    to_xml,
+)
+from feed_formats import FORMATS, format_path, serialize
+from http_client import (
+    ACCEPT_ENCODING,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    TRANSPORTS,
+    FetchResponse,
+    HedgedTransport,
+    TimeoutSpec,
+    Transport,
+    TransferStats,
+    create_transport,
+    default_transport,
+    make_config,
+)
+from rate_limiter import DEFAULT_BURST, DEFAULT_RATE, SharedRateLimiter
+from trending_diff import (
+    Snapshot,
+    TrendingDiff,
+    build_changes_feed,
+    compute_diff,
+    feed_snapshot,
+    to_diff_record,
+)
+from trending_records import RecordWriter, to_records
+from trending_repo import TrendingRepo
 
 
 def setup_logging(level: int = logging.INFO) -> logging.Logger:
@@ -66,73 +104,22 @@ class ReturnCode(Enum):
     IS_DIRECTORY_ERROR = 32
     PERMISSION_ERROR = 33
     OS_ERROR = 34
+    PAGE_STRUCTURE_ERROR = 41
 
 
-@click.command()
-@click.option("--language", type=str, required=True, help="")
-@click.option(
-    "--period",
-    type=click.Choice(["daily", "weekly", "monthly"], case_sensitive=True),
-    required=True,
-    help="",
-)
-@click.option("--output", type=str, required=False, help="")
-@click.option("--atom-updated-date", type=str, required=False, help="")
-@click.option("--verbose", is_flag=True, default=False, show_default=True, help="")
-@click.option("--timeout", type=int, default=10, hidden=True, help="")
-def main(
-    language: str,
-    period: str,
-    output: str,
-    atom_updated_date: str,
-    verbose: bool,
-    timeout: int,
-):
-    appLogger.info("start app")
-    appLogger.info(f"command-line argument: --language = {language}")
-    appLogger.info(f"command-line argument: --period = {period}")
-    appLogger.info(f"command-line argument: --output = {output}")
-    appLogger.info(f"command-line argument: --atom-updated-date = {atom_updated_date}")
-    appLogger.info(f"command-line argument: --verbose = {verbose}")
-
-    if verbose:
-        appLogger.setLevel(logging.DEBUG)
-
-    if not verbose:
-        # https://stackoverflow.com/questions/879173/how-to-ignore-deprecation-warnings-in-python
-        # 以下のような警告が出るのを防ぐ
-        # ... : DeprecationWarning: Parsing dates involving a day of month without a year specified is ambiguious
-        # and fails to parse leap day. The default behavior will change in Python 3.15
-        # to either always raise an exception or to use a different default year (TBD).
-        # To avoid trouble, add a specific year to the input & format.
-        # See https://github.com/python/cpython/issues/70647.
-        #   updated = dateparser.parse(atom_updated_date)
-        warnings.filterwarnings("ignore", category=DeprecationWarning)
-
-    ### initialize phase ##############################################################
-
-    # url
-    url = f"https://github.com/trending/{language}?since={period}"
-    appLogger.info(f"generated: url = {url}")
+class ScrapeError(Exception):
+    """Raised when scraping a trending page fails; carries the exit status to use."""
 
-    # atom_title
-    atom_title = f"GitHub Trending - {language} ({period})"
-    appLogger.info(f"generated: atom_title = {atom_title}")
+    def __init__(self, return_code: ReturnCode, message: str):
+        super().__init__(message)
+        self.return_code = return_code
 
-    # atom_author
-    atom_author = "aazw"
-    appLogger.info(f"generated: atom_author = {atom_author}")
+    def __reduce__(self) -> tuple[Any, ...]:
+        # パースをプロセスプールで行う場合に、プロセス間で受け渡せるようにする
+        return (ScrapeError, (self.return_code, str(self)))
 
-    # atom_advertise_url
-    atom_advertise_url = (
-        f"https://aazw.github.io/github-trending-feeds/feeds/{language}/{period}.atom"
-    )
-    appLogger.info(f"generated: atom_advertise_url = {atom_advertise_url}")
-
-    # atom_advertise_alt_url
-    atom_advertise_alt_url = f"https://aazw.github.io/github-trending-feeds/"
-    appLogger.info(f"generated: atom_advertise_alt_url = {atom_advertise_alt_url}")
 
+def parse_updated_date(atom_updated_date: str | None) -> datetime.datetime:
     # updated (drop milliseconds)
     updated = datetime.datetime.now(datetime.timezone.utc)
     if atom_updated_date:
@@ -148,26 +135,25 @@ def main(
             appLogger.error(
                 f"Error parsing atom_updated_date: {atom_updated_date}: {e}"
             )
-            appLogger.error("app failed")
-            sys.exit(ReturnCode.DATE_PARSE_ERROR.value)
+            raise ScrapeError(ReturnCode.DATE_PARSE_ERROR, str(e)) from e
+    return updated
 
-    appLogger.info(f"generated: updated = {updated}")
 
-    ### fetch trending phase ##############################################################
+def build_trending_url(language: str, period: str) -> str:
+    return f"https://github.com/trending/{language}?since={period}"
 
-    res = None
-    try:
-        # https://qiita.com/toshitanian/items/c28a65fe2f32884e067c
-        retries = Retry(
-            total=5, backoff_factor=1, status_forcelist=[500, 502, 503, 504]
-        )
-        s = requests.Session()
-        s.mount("https://", HTTPAdapter(max_retries=retries))
-        s.mount("http://", HTTPAdapter(max_retries=retries))
 
-        # get page
-        res = s.get(url, timeout=timeout)
-        res.raise_for_status()  # HTTPError
+def fetch_trending_page(
+    transport: Transport, url: str, timeout: TimeoutSpec
+) -> FetchResponse:
+    """Fetch a trending page, mapping request failures to ScrapeError.
+
+    Every transport raises the requests exceptions, so the mapping below
+    applies to both the requests and the HTTP/2 backend.
+    """
+    try:
+        # get page (raises HTTPError on 4xx/5xx)
+        return transport.get(url, timeout=timeout)
 
     except HTTPError as e:
         # HTTPプロトコルに関連するエラー
@@ -175,282 +161,600 @@ def main(
         status_code: int = e.response.status_code
         appLogger.error(f"requests http error ({status_code}): {e}")
 
-        appLogger.error("app failed")
         if status_code >= 400 and status_code < 500:
-            sys.exit(ReturnCode.HTTP_400_ERROR.value)
+            raise ScrapeError(ReturnCode.HTTP_400_ERROR, str(e)) from e
         elif status_code >= 500 and status_code < 600:
-            sys.exit(ReturnCode.HTTP_500_ERROR.value)
+            raise ScrapeError(ReturnCode.HTTP_500_ERROR, str(e)) from e
         else:
-            sys.exit(ReturnCode.HTTP_ERROR.value)
+            raise ScrapeError(ReturnCode.HTTP_ERROR, str(e)) from e
 
     except TooManyRedirects as e:  # リダイレクトが多すぎる場合に発生
         appLogger.error(f"requests too many redirects error {e}")
-        appLogger.error("app failed")
-        sys.exit(ReturnCode.TOO_MANY_REDIRECTS_ERROR.value)
+        raise ScrapeError(ReturnCode.TOO_MANY_REDIRECTS_ERROR, str(e)) from e
 
     except (Timeout, ConnectTimeout, ReadTimeout) as e:
         # ConnectTimeout: 接続確立中のタイムアウト
         # ReadTimeout: サーバーの応答読み取り中のタイムアウト
         # Timeout: ConnectTimeout または ReadTimeout の親クラス
         appLogger.error(f"requests timeout error {e}")
-        appLogger.error("app failed")
-        sys.exit(ReturnCode.TIMEOUT_ERROR.value)
+        raise ScrapeError(ReturnCode.TIMEOUT_ERROR, str(e)) from e
 
     except ConnectionError as e:  # サーバーへの接続に失敗した場合に発生
         appLogger.error(f"requests connection error: {e}")
-        appLogger.error("app failed")
-        sys.exit(ReturnCode.CONNECTION_ERROR.value)
+        raise ScrapeError(ReturnCode.CONNECTION_ERROR, str(e)) from e
 
     except InvalidURL as e:  # URLが無効または不適切な形式の場合に発生
         appLogger.error(f"requests invalid url error {e}")
-        appLogger.error("app failed")
-        sys.exit(ReturnCode.INVALID_URL_ERROR.value)
+        raise ScrapeError(ReturnCode.INVALID_URL_ERROR, str(e)) from e
 
     except RequestException as e:  # requestsの例外の基底クラス
         appLogger.error(f"request error: {e}")
-        appLogger.error("app failed")
-        sys.exit(ReturnCode.REQUESTS_ERROR.value)
+        raise ScrapeError(ReturnCode.REQUESTS_ERROR, str(e)) from e
 
     except Exception as e:  # Unknown Error
         appLogger.error(f"requests unknown error: {e}")
         appLogger.error(f"Traceback: {''.join(traceback.format_tb(e.__traceback__))}")
-        appLogger.error("app failed")
-        sys.exit(ReturnCode.UNKNOWN_ERROR.value)
+        raise ScrapeError(ReturnCode.UNKNOWN_ERROR, str(e)) from e
+
+
+# "1,234" / "56 stars today" などから数値を取り出す
+COUNT_PATTERN = re.compile(r"\d[\d,]*")
+
+
+def parse_count(text: str) -> int | None:
+    m = COUNT_PATTERN.search(text)
+    if m is None:
+        return None
+    return int(m.group().replace(",", ""))
+
 
+def parse_repository_row(item: Tag, rank: int) -> TrendingRepo | None:
+    """Extract one article.Box-row in a single walk over its descendants."""
+    link: Tag | None = None
+    path: str | None = None
+    description: str | None = None
+    programming_language: str | None = None
+    stars: int | None = None
+    forks: int | None = None
+    stars_gained: int | None = None
+    contributors: list[str] = []
+
+    for el in item.descendants:
+        if not isinstance(el, Tag):
+            continue
+
+        if el.name == "h2":
+            # get repository path (h2 a)
+            if link is None:
+                link = el.find("a")
+
+        elif el.name == "a":
+            href = el.get("href")
+            if el is link or not isinstance(href, str):
+                continue
+            if href.endswith("/stargazers"):
+                stars = parse_count(el.get_text())
+            elif href.endswith("/forks") or href.endswith("/network/members"):
+                forks = parse_count(el.get_text())
+
+        elif el.name == "p":
+            # get description (最初のp)
+            if description is None:
+                description = el.get_text().strip()
+
+        elif el.name == "span":
+            if el.get("itemprop") == "programmingLanguage":
+                programming_language = el.get_text().strip() or None
+            elif "float-sm-right" in (el.get("class") or []):
+                stars_gained = parse_count(el.get_text())
+
+        elif el.name == "img":
+            alt = el.get("alt")
+            if "avatar" in (el.get("class") or []) and isinstance(alt, str):
+                contributors.append(alt.removeprefix("@"))
+
+    if link is None:
+        appLogger.warning("Repository link not found in item, skipping")
+        return None
+
+    path_attr = link.get("href")
+    if path_attr is None or not isinstance(path_attr, str):
+        appLogger.warning("Repository href not found in link, skipping")
+        return None
+    path = path_attr
+
+    return TrendingRepo(
+        path=path,
+        description=description or "",
+        rank=rank,
+        programming_language=programming_language,
+        stars=stars,
+        forks=forks,
+        stars_gained=stars_gained,
+        contributors=tuple(contributors),
+    )
+
+
+def parse_trending_page(html: str) -> list[TrendingRepo]:
+    """Extract the repositories listed on a trending page, sorted by URL."""
     # parse DOM with error handling
     try:
-        soup = BeautifulSoup(res.text, "html.parser")
+        soup = BeautifulSoup(html, "html.parser")
         items = soup.select("article.Box-row")
         if not items:
             appLogger.warning("No trending repositories found on the page")
     except Exception as e:
         appLogger.error(f"Error parsing HTML: {e}")
-        appLogger.error("app failed")
-        sys.exit(ReturnCode.UNKNOWN_ERROR.value)
+        raise ScrapeError(ReturnCode.UNKNOWN_ERROR, str(e)) from e
 
-    feeds: list[dict[str, str]] = []
-    for item in reversed(items):
+    repos: list[TrendingRepo] = []
+    for rank, item in enumerate(items, start=1):
         try:
-            # get repository path with error handling
-            h2_link = item.select_one("h2 a")
-            if h2_link is None:
-                appLogger.warning("Repository link not found in item, skipping")
-                continue
-
-            repository_path_attr = h2_link.get("href")
-            if repository_path_attr is None or not isinstance(
-                repository_path_attr, str
-            ):
-                appLogger.warning("Repository href not found in link, skipping")
-                continue
-            repository_path = repository_path_attr
-
-            repository_url = f"https://github.com{repository_path}"
-
-            # get description with error handling
-            repository_description = ""
-            p = item.select_one("p")
-            if p:
-                desc_text = p.get_text()
-                if desc_text:
-                    repository_description = desc_text.strip()
-
-            feeds.append(
-                {
-                    "repository_path": repository_path,
-                    "repository_url": repository_url,
-                    "repository_description": repository_description,
-                }
-            )
+            repo = parse_repository_row(item, rank)
         except Exception as e:
             appLogger.error(f"Error processing repository item: {e}")
-            appLogger.error("app failed")
-            sys.exit(ReturnCode.UNKNOWN_ERROR.value)
-
-    feeds = sorted(feeds, key=lambda x: x["repository_url"])
-
-    ### build ATOM phase ##############################################################
-
-    # 以下はATOMのサンプルをChatGPTで生成したもの
-    #
-    # <?xml version="1.0" encoding="utf-8"?>
-    # <feed xmlns="http://www.w3.org/2005/Atom">
-    #     <!-- 必須要素 -->
-    #     <title>Example Feed</title>
-    #     <id>http://example.org/feed</id>
-    #     <updated>2024-12-28T18:30:02Z</updated>
-    #
-    #     <!-- オプション要素 -->
-    #     <subtitle>This is an example of an Atom feed with all elements.</subtitle>
-    #     <icon>http://example.org/icon.png</icon>
-    #     <logo>http://example.org/logo.png</logo>
-    #     <rights>Copyright 2024 Example Organization</rights>
-    #     <generator uri="http://example.org/generator" version="1.0">Example Generator</generator>
-    #     <link rel="self" href="http://example.org/feed" />
-    #     <link rel="alternate" href="http://example.org/" />
-    #     <author>
-    #         <name>John Doe</name>
-    #         <email>johndoe@example.org</email>
-    #         <uri>http://example.org/authors/johndoe</uri>
-    #     </author>
-    #     <contributor>
-    #         <name>Jane Smith</name>
-    #     </contributor>
-    #
-    #     <!-- エントリ（記事） -->
-    #     <entry>
-    #         <!-- 必須要素 -->
-    #         <title>Example Entry</title>
-    #         <id>http://example.org/entry1</id>
-    #         <updated>2024-12-28T18:30:02Z</updated>
-    #
-    #         <!-- オプション要素 -->
-    #         <summary>This is a summary of the example entry.</summary>
-    #         <content type="html">
-    #             <![CDATA[
-    #                 <p>This is the content of the example entry. It can include HTML.</p>
-    #             ]]>
-    #         </content>
-    #         <link rel="alternate" href="http://example.org/entry1" />
-    #         <author>
-    #             <name>John Doe</name>
-    #         </author>
-    #         <contributor>
-    #             <name>Jane Smith</name>
-    #         </contributor>
-    #         <category term="Technology" scheme="http://example.org/categories" label="Tech" />
-    #         <published>2024-12-27T12:00:00Z</published>
-    #         <rights>Copyright 2024 Example Organization</rights>
-    #         <source>
-    #             <id>http://example.org/source</id>
-    #             <title>Source Feed</title>
-    #             <updated>2024-12-28T12:00:00Z</updated>
-    #         </source>
-    #     </entry>
-    # </feed>
-
-    # new feed
-    ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
-    feed = etree.Element(f"{{{ATOM_NAMESPACE}}}feed")
-    feed.set("{http://www.w3.org/XML/1998/namespace}lang", "en")
-
-    # id
-    etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}id").text = atom_advertise_url
-
-    # title
-    etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}title").text = atom_title
-
-    # link (self)
-    etree.SubElement(
-        feed, f"{{{ATOM_NAMESPACE}}}link", href=atom_advertise_url, rel="self"
-    )
+            raise ScrapeError(ReturnCode.UNKNOWN_ERROR, str(e)) from e
+        if repo is not None:
+            repos.append(repo)
 
-    # link (alternate)
-    etree.SubElement(
-        feed, f"{{{ATOM_NAMESPACE}}}link", href=atom_advertise_alt_url, rel="alternate"
-    )
+    return sorted(repos, key=lambda repo: repo.url)
 
-    # icon
-    etree.SubElement(
-        feed, f"{{{ATOM_NAMESPACE}}}icon"
-    ).text = "https://github.githubassets.com/favicons/favicon.svg"
 
-    # updated
-    etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}updated").text = updated.isoformat(
-        timespec="seconds"
+def build_atom_feed(
+    language: str,
+    period: str,
+    repos: list[TrendingRepo],
+    updated: datetime.datetime,
+    stable_ids: bool = False,
+    previous: FeedState | None = None,
+) -> str:
+    """Build the Atom XML of one language/period (see build_feed)."""
+    return to_xml(build_feed(language, period, repos, updated, stable_ids, previous))
+
+
+def build_feed(
+    language: str,
+    period: str,
+    repos: list[TrendingRepo],
+    updated: datetime.datetime,
+    stable_ids: bool = False,
+    previous: FeedState | None = None,
+) -> etree._Element:
+    """Build the feed of one language/period.
+
+    With `stable_ids`, an entry keeps its id while the repository stays in
+    the feed (one id per trending streak), and `previous` (the feed written
+    last time) is used to keep <updated> of unchanged entries and of the feed.
+    """
+    # atom_title
+    atom_title = f"GitHub Trending - {language} ({period})"
+    appLogger.info(f"generated: atom_title = {atom_title}")
+
+    # atom_author
+    appLogger.info(f"generated: atom_author = {ATOM_AUTHOR}")
+
+    # atom_advertise_url
+    atom_advertise_url = (
+        f"https://aazw.github.io/github-trending-feeds/feeds/{language}/{period}.atom"
     )
+    appLogger.info(f"generated: atom_advertise_url = {atom_advertise_url}")
+
+    # atom_advertise_alt_url
+    appLogger.info(f"generated: atom_advertise_alt_url = {SITE_URL}")
 
-    # author
-    author = etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}author")
-    etree.SubElement(author, f"{{{ATOM_NAMESPACE}}}name").text = atom_author
+    feed = new_feed(atom_advertise_url, atom_title, updated)
 
     # entries
-    for item in feeds:
-        repository_path = item["repository_path"]
-        repository_url = item["repository_url"]
-        repository_description = item["repository_description"]
-
-        # new entry
-        entry = etree.SubElement(feed, f"{{{ATOM_NAMESPACE}}}entry")
-
-        # id
-        etree.SubElement(
-            entry, f"{{{ATOM_NAMESPACE}}}id"
-        ).text = f"urn:github:{repository_url.replace('https://github.com/', '').replace('/', ':')}:{int(updated.timestamp())}"
-
-        # title
-        etree.SubElement(
-            entry, f"{{{ATOM_NAMESPACE}}}title"
-        ).text = repository_url.replace("https://github.com/", "")
-
-        # link
-        etree.SubElement(entry, f"{{{ATOM_NAMESPACE}}}link", href=repository_url)
-
-        # updated
-        etree.SubElement(
-            entry, f"{{{ATOM_NAMESPACE}}}updated"
-        ).text = updated.isoformat(timespec="seconds")
-
-        # content
-        content = etree.SubElement(entry, f"{{{ATOM_NAMESPACE}}}content", type="html")
-        content_html = f"""<div>
-<div><strong>URL:</strong> <a href="{repository_url}">{repository_url}</a></div>
-<div><strong>Language:</strong> {language}</div>
-<hr>
-<div>{repository_description}</div>
-</div>"""
-        content.text = content_html
-
-    # pretty print
-    etree.indent(feed)
-
-    # get xml
-    feed_xml = etree.tostring(feed, encoding="utf-8", xml_declaration=True).decode(
-        "utf-8"
+    for repo in repos:
+        entry_id: str | None = None
+        if stable_ids:
+            prev = previous.entries.get(repo.url) if previous else None
+            # 前回のフィードにも載っていれば同じストリークなのでidを引き継ぐ
+            if prev is not None and prev.id.startswith(
+                stable_entry_id_prefix(repo, language, period)
+            ):
+                entry_id = prev.id
+            else:
+                entry_id = stable_entry_id(repo, language, period, updated)
+        append_repository_entry(feed, repo, language, updated, entry_id=entry_id)
+
+    if stable_ids and previous is not None:
+        changed = carry_over_updated(feed, previous)
+        appLogger.info(f"generated: {changed} new or changed entries")
+
+    return feed
+
+
+def load_previous_feed(
+    path: str | Path | None, state: bool, snapshot: bool
+) -> tuple[FeedState | None, Snapshot | None]:
+    """Read the previously written feed once, for --stable-ids (state) and --diff (snapshot).
+
+    A part that is not asked for is None, and so are both when the feed is
+    missing or unreadable.
+    """
+    if path is None or not (state or snapshot) or not Path(path).exists():
+        return None, None
+    try:
+        root = etree.parse(path, etree.XMLParser()).getroot()
+    except (OSError, etree.XMLSyntaxError) as e:
+        # 読めない場合は前回分なしとして、全エントリを新規 (差分では entered) 扱いにする
+        appLogger.warning(f"Error reading previous feed {path}: {e}")
+        return None, None
+    return (
+        feed_state(root) if state else None,
+        feed_snapshot(root) if snapshot else None,
     )
 
-    # write to stdout
-    if verbose:
-        print(feed_xml)
 
-    # write to file
-    if output:
-        # ファイルの絶対パスを指定
-        file_path = Path(output)
+def diff_trending(
+    language: str,
+    period: str,
+    repos: list[TrendingRepo],
+    updated: datetime.datetime,
+    previous: Snapshot | None,
+) -> TrendingDiff:
+    """Compare the parsed repositories with the previous snapshot (read before the feed is overwritten)."""
+    diff = compute_diff(language, period, updated, repos, previous)
+    appLogger.info(
+        f"diff: {len(diff.entered)} entered, {len(diff.left)} left, "
+        f"{len(diff.moved)} moved (previous snapshot = {diff.previous_snapshot})"
+    )
+    return diff
+
 
-        # ディレクトリ部分を抽出
-        directory = file_path.parent
+def write_feed(output: str | Path, feed_xml: str | Iterable[str]) -> None:
+    # ファイルの絶対パスを指定
+    file_path = Path(output)
 
+    # ディレクトリ部分を抽出
+    directory = file_path.parent
+
+    try:
         # ディレクトリを作成
         directory.mkdir(parents=True, exist_ok=True)
 
-        try:
-            with file_path.open(mode="w", encoding="utf-8") as f:
+        with file_path.open(mode="w", encoding="utf-8") as f:
+            if isinstance(feed_xml, str):
                 f.write(feed_xml)
-        except FileNotFoundError as e:
-            # 指定されたファイルやディレクトリが見つからない場合
-            appLogger.error(f"file not found error: {e}")
-            appLogger.error("app failed")
-            sys.exit(ReturnCode.FILE_NOT_FOUND_ERROR.value)
-        except IsADirectoryError as e:
-            # 指定されたパスがディレクトリの場合
-            appLogger.error(f"is a directory error: {e}")
-            appLogger.error("app failed")
-            sys.exit(ReturnCode.IS_DIRECTORY_ERROR.value)
-        except PermissionError as e:
-            # アクセス権限がない場合
-            appLogger.error(f"permission error: {e}")
-            appLogger.error("app failed")
-            sys.exit(ReturnCode.PERMISSION_ERROR.value)
-        except OSError as e:
-            # その他のOS関連のエラー (例: I/Oエラー、デバイスエラーなど)
-            appLogger.error(f"os error: {e}")
-            appLogger.error("app failed")
-            sys.exit(ReturnCode.OS_ERROR.value)
-        except Exception as e:
-            appLogger.error(f"unknown error: {e}")
-            appLogger.error("app failed")
-            sys.exit(ReturnCode.UNKNOWN_ERROR.value)
+            else:
+                # JSON Feed などは少しずつ書き出す
+                f.writelines(feed_xml)
+    except FileNotFoundError as e:
+        # 指定されたファイルやディレクトリが見つからない場合
+        appLogger.error(f"file not found error: {e}")
+        raise ScrapeError(ReturnCode.FILE_NOT_FOUND_ERROR, str(e)) from e
+    except IsADirectoryError as e:
+        # 指定されたパスがディレクトリの場合
+        appLogger.error(f"is a directory error: {e}")
+        raise ScrapeError(ReturnCode.IS_DIRECTORY_ERROR, str(e)) from e
+    except PermissionError as e:
+        # アクセス権限がない場合
+        appLogger.error(f"permission error: {e}")
+        raise ScrapeError(ReturnCode.PERMISSION_ERROR, str(e)) from e
+    except OSError as e:
+        # その他のOS関連のエラー (例: I/Oエラー、デバイスエラーなど)
+        appLogger.error(f"os error: {e}")
+        raise ScrapeError(ReturnCode.OS_ERROR, str(e)) from e
+    except Exception as e:
+        appLogger.error(f"unknown error: {e}")
+        raise ScrapeError(ReturnCode.UNKNOWN_ERROR, str(e)) from e
+
+
+def write_records(path: str | Path, records: Iterable[dict[str, Any]]) -> None:
+    try:
+        with RecordWriter(Path(path)) as writer:
+            writer.write(records)
+    except ValueError as e:
+        # 未対応の拡張子、msgpack未インストール
+        appLogger.error(f"record file error: {e}")
+        raise ScrapeError(ReturnCode.OS_ERROR, str(e)) from e
+    except OSError as e:
+        appLogger.error(f"os error: {e}")
+        raise ScrapeError(ReturnCode.OS_ERROR, str(e)) from e
+
+
+def scrape_trending(
+    transport: Transport,
+    language: str,
+    period: str,
+    timeout: TimeoutSpec,
+    transfer: TransferStats | None = None,
+) -> list[TrendingRepo]:
+    """Fetch and parse one trending page, recording its size in `transfer` under the language."""
+    res = fetch_trending(transport, language, period, timeout, transfer)
+    return parse_trending_page(res.text)
+
+
+def fetch_trending(
+    transport: Transport,
+    language: str,
+    period: str,
+    timeout: TimeoutSpec,
+    transfer: TransferStats | None = None,
+) -> FetchResponse:
+    """Fetch one trending page without parsing it."""
+    # url
+    url = build_trending_url(language, period)
+    appLogger.info(f"generated: url = {url}")
+
+    res = fetch_trending_page(transport, url, timeout)
+    appLogger.info(
+        f"transfer: {res.wire_bytes} bytes on the wire, {res.decoded_bytes} bytes decoded "
+        f"(content-encoding = {res.content_encoding})"
+    )
+    if transfer is not None:
+        transfer.record(language, res)
+    return res
+
+
+@click.command()
+@click.option("--language", type=str, required=True, help="")
+@click.option(
+    "--period",
+    type=click.Choice(["daily", "weekly", "monthly"], case_sensitive=True),
+    required=True,
+    help="",
+)
+@click.option("--output", type=str, required=False, help="")
+@click.option(
+    "--format",
+    "formats",
+    type=click.Choice(FORMATS, case_sensitive=True),
+    multiple=True,
+    default=("atom",),
+    show_default=True,
+    help="書き出す形式. 複数指定すると --output の拡張子を形式ごとに置き換えて書き出す (.atom / .json / .txt)",
+)
+@click.option("--atom-updated-date", type=str, required=False, help="")
+@click.option(
+    "--records",
+    type=str,
+    required=False,
+    help="リポジトリごとのレコードを書き出すファイル (.jsonl / .msgpack)",
+)
+@click.option(
+    "--diff",
+    type=str,
+    required=False,
+    help="前回の --output との差分 (入った / 外れた / 順位が動いた) のレコードを書き出すファイル (.jsonl / .msgpack)",
+)
+@click.option(
+    "--changes-atom",
+    type=str,
+    required=False,
+    help="差分だけのAtomを書き出すファイル (前回の --output と比較する)",
+)
+@click.option(
+    "--transport",
+    type=click.Choice(TRANSPORTS, case_sensitive=True),
+    default="requests",
+    show_default=True,
+    help="HTTPクライアントのバックエンド (http2はhttpx[http2]が必要)",
+)
+@click.option(
+    "--accept-encoding",
+    type=str,
+    default=ACCEPT_ENCODING,
+    show_default=True,
+    help="送信するAccept-Encoding (identityで圧縮なし)",
+)
+@click.option(
+    "--user-agent",
+    type=str,
+    required=False,
+    help="送信するUser-Agent (省略時はHTTPクライアントの既定値)",
+)
+@click.option(
+    "--connect-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=CONNECT_TIMEOUT,
+    show_default=True,
+    help="接続のタイムアウト (秒)",
+)
+@click.option(
+    "--read-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=READ_TIMEOUT,
+    show_default=True,
+    help="応答の読み取りのタイムアウト (秒. データが届かない間隔)",
+)
+@click.option(
+    "--language-deadline",
+    type=click.FloatRange(min=0, min_open=True),
+    required=False,
+    help="再試行を含めた取得全体の制限時間 (秒). 超えるとタイムアウトとして失敗する",
+)
+@click.option(
+    "--rate-limit-file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="ホスト上の全スクレイパーで共有するトークンバケットの状態ファイル. 取得の前にトークンを1つ待つ",
+)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_RATE,
+    show_default=True,
+    help="--rate-limit-file の全体のリクエスト数 (回/秒)",
+)
+@click.option(
+    "--rate-burst",
+    type=click.FloatRange(min=1),
+    default=DEFAULT_BURST,
+    show_default=True,
+    help="--rate-limit-file で続けて送れるリクエスト数の上限",
+)
+@click.option(
+    "--stable-ids",
+    is_flag=True,
+    default=False,
+    help="エントリのidをトレンド入りしている間は固定し、内容が変わらなければupdatedも前回の値を保つ (--outputの前回の内容を使う)",
+)
+@click.option("--verbose", is_flag=True, default=False, show_default=True, help="")
+@click.option(
+    "--timeout",
+    type=float,
+    required=False,
+    hidden=True,
+    help="接続・読み取り共通のタイムアウト (秒). 互換のため残している",
+)
+def main(
+    language: str,
+    period: str,
+    output: str,
+    formats: tuple[str, ...],
+    atom_updated_date: str,
+    records: str,
+    diff: str | None,
+    changes_atom: str | None,
+    stable_ids: bool,
+    transport: str,
+    accept_encoding: str,
+    user_agent: str | None,
+    connect_timeout: float,
+    read_timeout: float,
+    language_deadline: float | None,
+    rate_limit_file: Path | None,
+    rate_limit: float,
+    rate_burst: float,
+    verbose: bool,
+    timeout: float | None,
+):
+    appLogger.info("start app")
+    appLogger.info(f"command-line argument: --language = {language}")
+    appLogger.info(f"command-line argument: --period = {period}")
+    appLogger.info(f"command-line argument: --output = {output}")
+    appLogger.info(f"command-line argument: --format = {', '.join(formats)}")
+    appLogger.info(f"command-line argument: --atom-updated-date = {atom_updated_date}")
+    appLogger.info(f"command-line argument: --records = {records}")
+    appLogger.info(f"command-line argument: --diff = {diff}")
+    appLogger.info(f"command-line argument: --changes-atom = {changes_atom}")
+    appLogger.info(f"command-line argument: --stable-ids = {stable_ids}")
+    appLogger.info(f"command-line argument: --transport = {transport}")
+    appLogger.info(f"command-line argument: --accept-encoding = {accept_encoding}")
+    appLogger.info(f"command-line argument: --user-agent = {user_agent}")
+    appLogger.info(f"command-line argument: --connect-timeout = {connect_timeout}")
+    appLogger.info(f"command-line argument: --read-timeout = {read_timeout}")
+    appLogger.info(f"command-line argument: --language-deadline = {language_deadline}")
+    appLogger.info(f"command-line argument: --rate-limit-file = {rate_limit_file}")
+    appLogger.info(f"command-line argument: --rate-limit = {rate_limit}")
+    appLogger.info(f"command-line argument: --rate-burst = {rate_burst}")
+    appLogger.info(f"command-line argument: --verbose = {verbose}")
+
+    if verbose:
+        appLogger.setLevel(logging.DEBUG)
+
+    if not verbose:
+        # https://stackoverflow.com/questions/879173/how-to-ignore-deprecation-warnings-in-python
+        # 以下のような警告が出るのを防ぐ
+        # ... : DeprecationWarning: Parsing dates involving a day of month without a year specified is ambiguious
+        # and fails to parse leap day. The default behavior will change in Python 3.15
+        # to either always raise an exception or to use a different default year (TBD).
+        # To avoid trouble, add a specific year to the input & format.
+        # See https://github.com/python/cpython/issues/70647.
+        #   updated = dateparser.parse(atom_updated_date)
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    if stable_ids and not output:
+        appLogger.error("--stable-ids requires --output")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    if (diff or changes_atom) and not output:
+        appLogger.error("--diff and --changes-atom require --output")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    formats = tuple(dict.fromkeys(formats))
+    if (stable_ids or diff or changes_atom) and "atom" not in formats:
+        # 前回の内容は --output のAtomから読む
+        appLogger.error("--stable-ids, --diff and --changes-atom require --format atom")
+        appLogger.error("app failed")
+        sys.exit(1)
+    atom_output = format_path(Path(output), "atom", formats) if output else None
+
+    try:
+        ### initialize phase ##############################################################
+
+        updated = parse_updated_date(atom_updated_date)
+        appLogger.info(f"generated: updated = {updated}")
+
+        ### fetch trending & build ATOM phase #############################################
+
+        config = make_config(accept_encoding=accept_encoding, user_agent=user_agent)
+        # 既定の設定なら、同じプロセス内の他のスクレイパー (scrape_languages.py など) と
+        # 接続を共有する. 共有のクライアントは閉じずに残す
+        shared = transport == "requests" and config == make_config()
+        try:
+            client = (
+                default_transport()
+                if shared
+                else create_transport(transport, config=config)
+            )
+        except ValueError as e:
+            appLogger.error(f"transport error: {e}")
+            raise ScrapeError(ReturnCode.UNKNOWN_ERROR, str(e)) from e
+        if language_deadline is not None:
+            # 再試行中でも制限時間で打ち切る (共有のクライアントは包むだけで閉じない)
+            fetcher: Transport = HedgedTransport(client, deadline=language_deadline)
+        else:
+            fetcher = client
+        timeouts: TimeoutSpec = (
+            timeout if timeout is not None else (connect_timeout, read_timeout)
+        )
+
+        try:
+            if rate_limit_file:
+                # 同時に走っている他のスクレイパーと共有する予算
+                try:
+                    limiter = SharedRateLimiter(rate_limit_file, rate_limit, rate_burst)
+                    waited = limiter.acquire()
+                except (OSError, ValueError) as e:
+                    appLogger.error(f"rate limiter error: {e}")
+                    raise ScrapeError(ReturnCode.UNKNOWN_ERROR, str(e)) from e
+                appLogger.info(f"rate limiter: waited {waited:.2f}s")
+            repos = scrape_trending(fetcher, language, period, timeouts)
+        finally:
+            if not shared:
+                client.close()
+        # 前回のフィードは上書きする前に1回だけ読み、--stable-ids と差分の両方に使う
+        previous, snapshot = load_previous_feed(
+            atom_output, stable_ids, bool(diff or changes_atom)
+        )
+        feed = build_feed(
+            language, period, repos, updated, stable_ids=stable_ids, previous=previous
+        )
+        changes = (
+            diff_trending(language, period, repos, updated, snapshot)
+            if atom_output and (diff or changes_atom)
+            else None
+        )
+
+        # write to stdout
+        if verbose:
+            print(to_xml(feed))
+
+        # write to file (どの形式も同じツリーから書き出す)
+        if output:
+            for format in formats:
+                write_feed(
+                    format_path(Path(output), format, formats), serialize(feed, format)
+                )
+
+        # write records
+        if records:
+            write_records(records, to_records(repos, language, period, updated))
+
+        # write diff
+        if changes is not None and diff:
+            write_records(diff, [to_diff_record(changes)])
+        if changes is not None and changes_atom:
+            write_feed(changes_atom, build_changes_feed(changes))
+
+    except ScrapeError as e:
+        appLogger.error("app failed")
+        sys.exit(e.return_code.value)
 
     appLogger.info("app finished")
 
@@ -0,0 +1,1174 @@
+import sys
+import os
+import time
+import hashlib
+import datetime
+import logging
+import tomllib
+import warnings
+import contextlib
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Iterator, Sequence
+
+import click
+from lxml import etree
+
+from aggregate_feeds import DEFAULT_GROUPS, FeedGroup, load_groups, write_aggregates
+from atom_feed import read_feed_repos
+from feed_layout import feed_relative_path, read_languages
+from http_client import (
+    ACCEPT_ENCODING,
+    CONNECT_TIMEOUT,
+    DEFAULT_HEDGE_BUDGET,
+    READ_TIMEOUT,
+    TRANSPORTS,
+    FetchResponse,
+    HedgedTransport,
+    Pacer,
+    TimeoutSpec,
+    Transport,
+    TransferStats,
+    create_transport,
+    format_bytes,
+)
+from scrape_trending import (
+    ReturnCode,
+    ScrapeError,
+    build_atom_feed,
+    diff_trending,
+    fetch_trending,
+    load_previous_feed,
+    parse_trending_page,
+    parse_updated_date,
+    write_feed,
+)
+from preflight import (
+    DEFAULT_PREFLIGHT_LANGUAGES,
+    Probe,
+    check_repos,
+    page_looks_broken,
+)
+from rate_limiter import DEFAULT_BURST, DEFAULT_RATE, SharedRateLimiter
+from sweep_journal import SweepJournal, load_completed
+from sweep_manifest import write_manifest
+from sweep_pipeline import Job, run_pipeline
+from sweep_schedule import (
+    Priorities,
+    load_priorities,
+    parse_duration,
+    plan_sweep,
+    priority_scores,
+)
+from sweep_stats import (
+    assign_shards,
+    estimate_costs,
+    load_stats,
+    parse_shard,
+    save_stats,
+    update_stats,
+)
+from trending_diff import build_changes_feed, to_diff_record
+from trending_records import RecordWriter, filter_records, to_records
+from trending_repo import TrendingRepo
+
+
+def setup_logging(level: int = logging.INFO) -> logging.Logger:
+    # Making Python loggers output all messages to stdout in addition to log file
+    # https://stackoverflow.com/questions/14058453/making-python-loggers-output-all-messages-to-stdout-in-addition-to-log-file
+    formatter = logging.Formatter(
+        "%(asctime)s - %(pathname)s:%(lineno)d - %(levelname)s - %(message)s"
+    )
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+
+    logger = logging.getLogger(__name__)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+    return logger
+
+
+appLogger = setup_logging()
+
+# 実行の最後に転送量の多い言語を何件表示するか
+TOP_TRANSFER_LANGUAGES = 10
+
+
+@dataclass(slots=True)
+class SweepResult:
+    language: str
+    # output-dirからの相対パス
+    output: str
+    status: str
+    return_code: int
+    changed: bool = False
+    sha256: str | None = None
+    elapsed: float | None = None
+    # 受信したバイト数 (圧縮されたまま / 展開後)
+    wire_bytes: int | None = None
+    decoded_bytes: int | None = None
+    # --resume でジャーナルから復元した (今回は取得していない)
+    resumed: bool = False
+    # 前回のフィードになかったリポジトリの割合 (前回のフィードと比較したときだけ)
+    churn: float | None = None
+
+
+def file_sha256(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def parse_page(html: str) -> list[TrendingRepo] | ScrapeError:
+    """Parse one trending page; runs in the parse process pool with --parse-processes."""
+    try:
+        return parse_trending_page(html)
+    except ScrapeError as e:
+        # 失敗も結果として書き込み段へ渡す
+        return e
+
+
+class SweepError(Exception):
+    """A sweep could not run or finish; `return_code` is the exit status for the CLI."""
+
+    def __init__(self, message: str, return_code: int = 1):
+        super().__init__(message)
+        self.return_code = return_code
+
+
+class SweepLockedError(SweepError):
+    """Another sweep holds the lock of the same output tree."""
+
+
+@dataclass(slots=True)
+class SweepConfig:
+    """Options of one sweep (the command-line options of this script)."""
+
+    period: str
+    languages_path: Path
+    output_dir: Path
+    atom_updated_date: str | None = None
+    shard: str | None = None
+    stats_path: Path | None = None
+    manifest_path: Path | None = None
+    records_path: Path | None = None
+    diff_path: Path | None = None
+    changes_dir: Path | None = None
+    journal_path: Path | None = None
+    resume: bool = False
+    stable_ids: bool = False
+    aggregate_dir: Path | None = None
+    aggregate_groups_path: Path | None = None
+    interval: float = 1.0
+    workers: int = 1
+    transport: str = "requests"
+    accept_encoding: str = ACCEPT_ENCODING
+    user_agent: str | None = None
+    timeout: TimeoutSpec = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    # 1言語の取得 (再試行を含む) の制限時間 (秒)
+    language_deadline: float | None = None
+    # p95を超えて応答のないリクエストを複製する. 複製するのは hedge_budget の割合まで
+    hedge: bool = False
+    hedge_budget: float = DEFAULT_HEDGE_BUDGET
+    # HTMLのパースに使うプロセス数 (0 はI/Oスレッドでパースする)
+    parse_processes: int = 0
+    # 段と段の間のキューの上限
+    queue_size: int = 16
+    lock_path: Path | None = None
+    # ホスト上の全スクレイパーで共有するレート制限の状態ファイル (None は使わない)
+    rate_limit_path: Path | None = None
+    rate_limit: float = DEFAULT_RATE
+    rate_burst: float = DEFAULT_BURST
+    # 全体の制限時間 (秒). 間に合わない優先度の低い言語は deferred にする
+    deadline: float | None = None
+    priorities_path: Path | None = None
+    # スイープの前に取得して抽出結果を確かめる言語 (空なら確かめない)
+    preflight_languages: tuple[str, ...] = DEFAULT_PREFLIGHT_LANGUAGES
+
+
+@contextlib.contextmanager
+def sweep_lock(path: Path | None) -> Iterator[None]:
+    """Hold an exclusive flock on `path` for the duration of a sweep.
+
+    Fails immediately with SweepLockedError instead of waiting, so an
+    overlapping sweep is skipped rather than queued. None disables locking.
+    """
+    if path is None:
+        yield
+        return
+
+    try:
+        import fcntl
+    except ImportError:
+        raise SweepError("--lock-file is not supported on this platform") from None
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+", encoding="utf-8") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise SweepLockedError(
+                f"another sweep holds {path}; skipped to avoid overlapping writes"
+            ) from None
+        try:
+            # 調査用に、ロックを持っているプロセスを書いておく
+            f.seek(0)
+            f.truncate()
+            f.write(f"{os.getpid()}\n")
+            f.flush()
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def run_preflight(
+    languages: Sequence[str],
+    fetch: Callable[[str], FetchResponse],
+    wait_turn: Callable[[], None],
+    pending: set[str],
+    prefetched: dict[str, tuple[str, float]],
+) -> list[Probe]:
+    """Fetch and check the preflight languages one by one.
+
+    Pages of languages in `pending` are kept in `prefetched` as (html,
+    fetch seconds), so the sweep does not request them again.
+    """
+    probes: list[Probe] = []
+    for language in languages:
+        probe = Probe(language)
+        probes.append(probe)
+        wait_turn()
+        started = time.monotonic()
+        try:
+            res = fetch(language)
+        except ScrapeError as e:
+            probe.error = str(e)
+            appLogger.warning(f"preflight: {language}: inconclusive, fetch failed: {e}")
+            continue
+        elapsed = time.monotonic() - started
+
+        outcome = parse_page(res.text)
+        if isinstance(outcome, ScrapeError):
+            probe.problems.append(f"parse error: {outcome}")
+        else:
+            probe.repos = len(outcome)
+            probe.problems = check_repos(outcome)
+        if probe.problems:
+            appLogger.error(f"preflight: {language}: {', '.join(probe.problems)}")
+        else:
+            appLogger.info(f"preflight: {language}: {probe.repos} repositories, ok")
+
+        if language in pending:
+            prefetched[language] = (res.text, elapsed)
+    return probes
+
+
+def run_sweep(
+    config: SweepConfig, transport_client: Transport | None = None
+) -> list[SweepResult]:
+    """Scrape every language of one period and write the feeds, manifest and stats.
+
+    `transport_client` is left open when given (the daemon keeps one warm
+    across sweeps); otherwise one is created for the sweep and closed.
+    Raises SweepError when the sweep cannot run; a failed language is only
+    recorded in its SweepResult.
+    """
+    with sweep_lock(config.lock_path):
+        return _run_sweep(config, transport_client)
+
+
+def _run_sweep(
+    config: SweepConfig, transport_client: Transport | None
+) -> list[SweepResult]:
+    # --deadline はロックを取ってからの経過時間で数える
+    sweep_started = time.monotonic()
+
+    if config.resume and not config.journal_path:
+        raise SweepError("--resume requires --journal")
+    if config.priorities_path and config.deadline is None:
+        raise SweepError("--priorities requires --deadline")
+
+    priorities = Priorities()
+    if config.priorities_path:
+        try:
+            priorities = load_priorities(config.priorities_path)
+        except (OSError, tomllib.TOMLDecodeError, ValueError) as e:
+            raise SweepError(
+                f"Error reading priorities {config.priorities_path}: {e}"
+            ) from e
+
+    limiter: SharedRateLimiter | None = None
+    if config.rate_limit_path:
+        try:
+            limiter = SharedRateLimiter(
+                config.rate_limit_path, config.rate_limit, config.rate_burst
+            )
+        except (OSError, ValueError) as e:
+            raise SweepError(f"rate limiter error: {e}") from e
+
+    try:
+        languages = read_languages(config.languages_path)
+    except OSError as e:
+        raise SweepError(f"Error reading {config.languages_path}: {e}") from e
+
+    groups: Sequence[FeedGroup] = DEFAULT_GROUPS
+    if config.aggregate_groups_path:
+        try:
+            groups = load_groups(config.aggregate_groups_path)
+        except (OSError, tomllib.TOMLDecodeError, ValueError) as e:
+            raise SweepError(
+                f"Error reading groups {config.aggregate_groups_path}: {e}"
+            ) from e
+
+    try:
+        stats = load_stats(config.stats_path)
+    except (OSError, ValueError) as e:
+        raise SweepError(f"Error reading stats {config.stats_path}: {e}") from e
+
+    shard_index, shard_count = 1, 1
+    if config.shard:
+        try:
+            shard_index, shard_count = parse_shard(config.shard)
+        except ValueError as e:
+            raise SweepError(str(e)) from e
+
+        costs = estimate_costs(languages, stats)
+        shards = assign_shards(languages, costs, shard_count)
+        for i, members in enumerate(shards, start=1):
+            appLogger.info(
+                f"shard {i}/{shard_count}: {len(members)} languages, "
+                f"estimated {sum(costs[lang] for lang in members):.1f}s"
+            )
+        languages = shards[shard_index - 1]
+
+    appLogger.info(f"{len(languages)} languages to scrape")
+
+    try:
+        updated = parse_updated_date(config.atom_updated_date)
+    except ScrapeError as e:
+        raise SweepError(str(e), e.return_code.value) from e
+    appLogger.info(f"generated: updated = {updated}")
+
+    snapshot = updated.date().isoformat()
+
+    completed: dict[str, dict[str, Any]] = {}
+    if config.resume and config.journal_path:
+        try:
+            completed = load_completed(config.journal_path, config.period, snapshot)
+        except OSError as e:
+            raise SweepError(f"Error reading journal {config.journal_path}: {e}") from e
+
+    results: list[SweepResult] = []
+    pending: list[str] = []
+    for language in languages:
+        relative = feed_relative_path(language, config.period)
+        done = completed.get(language)
+        # ジャーナル上は完了でも、出力ファイルが消えていたり書き換わっていたら取り直す
+        if done is not None and done.get("sha256") == file_sha256(
+            config.output_dir / relative
+        ):
+            results.append(
+                SweepResult(
+                    language=language,
+                    output=relative,
+                    status="ok",
+                    return_code=0,
+                    changed=bool(done.get("changed")),
+                    sha256=done["sha256"],
+                    resumed=True,
+                )
+            )
+        else:
+            pending.append(language)
+    if config.resume:
+        appLogger.info(
+            f"resume: {len(results)} languages already done for {snapshot}, "
+            f"{len(pending)} remaining"
+        )
+
+    costs = estimate_costs(pending, stats)
+    if config.language_deadline is not None:
+        # 1言語の取得は --language-deadline で打ち切られる
+        costs = {
+            lang: min(cost, config.language_deadline) for lang, cost in costs.items()
+        }
+    if config.deadline is not None:
+        scores = priority_scores(
+            pending, stats, priorities, datetime.datetime.now(datetime.timezone.utc)
+        )
+        pending, deferred = plan_sweep(
+            pending,
+            costs,
+            scores,
+            config.deadline,
+            workers=config.workers,
+            interval=max(config.interval, 1 / config.rate_limit)
+            if config.rate_limit_path
+            else config.interval,
+        )
+        appLogger.info(
+            f"deadline {config.deadline:.0f}s: {len(pending)} languages scheduled "
+            f"(estimated {sum(costs[lang] for lang in pending):.1f}s of work), "
+            f"{len(deferred)} deferred"
+            + (f": {', '.join(deferred)}" if deferred else "")
+        )
+        results.extend(
+            SweepResult(
+                language=language,
+                output=feed_relative_path(language, config.period),
+                status="deferred",
+                return_code=0,
+            )
+            for language in deferred
+        )
+
+    # デーモンから呼ばれる場合は、接続プールを温めたままのクライアントを使い回す
+    owns_transport = transport_client is None
+    if transport_client is None:
+        try:
+            transport_client = create_transport(
+                config.transport,
+                pool_size=config.workers,
+                accept_encoding=config.accept_encoding,
+                user_agent=config.user_agent,
+            )
+        except ValueError as e:
+            raise SweepError(f"transport error: {e}") from e
+    pacer = Pacer(config.interval)
+    transfer = TransferStats()
+
+    def hedge_gate() -> bool:
+        # 複製も間隔と共有のレート制限の対象. すぐに送れないなら複製しない
+        return pacer.try_take() and (limiter is None or limiter.try_acquire())
+
+    # 制限時間・ヘッジはスイープごとに包む (閉じるのは元のクライアント)
+    hedged: HedgedTransport | None = None
+    fetcher: Transport = transport_client
+    if config.language_deadline is not None or config.hedge:
+        hedged = HedgedTransport(
+            transport_client,
+            deadline=config.language_deadline,
+            hedge=config.hedge,
+            hedge_budget=config.hedge_budget,
+            hedge_gate=hedge_gate,
+        )
+        fetcher = hedged
+
+    def out_of_time(language: str) -> bool:
+        if config.deadline is None:
+            return False
+        remaining = config.deadline - (time.monotonic() - sweep_started)
+        return costs[language] > remaining
+
+    def wait_turn() -> None:
+        pacer.wait()
+        if limiter:
+            # 同時に走っている他のスクレイパーと共有する予算
+            limiter.acquire()
+
+    # 事前確認で取得したページ (スイープ対象の言語なら取り直さずに使う)
+    prefetched: dict[str, tuple[str, float]] = {}
+    try:
+        # シャード実行でもシャードごとに確認する (各シャードが自分の出力先に書き込むため)
+        if config.preflight_languages:
+            probes = run_preflight(
+                config.preflight_languages,
+                lambda language: fetch_trending(
+                    fetcher, language, config.period, config.timeout, transfer
+                ),
+                wait_turn,
+                set(pending),
+                prefetched,
+            )
+            if page_looks_broken(probes):
+                raise SweepError(
+                    "preflight: the trending page structure looks broken ("
+                    + "; ".join(
+                        f"{probe.language}: {', '.join(probe.problems)}"
+                        for probe in probes
+                        if probe.broken
+                    )
+                    + "), aborting the sweep without writing any feed",
+                    return_code=ReturnCode.PAGE_STRUCTURE_ERROR.value,
+                )
+
+        if config.resume:
+            # ジャーナルはまとめてfsyncするので、落ちる直前に書いた言語はレコードだけ残っていることがある
+            # 取り直す言語の今回のスナップショットのレコードを消してから追記する
+            snapshot_text = updated.isoformat(timespec="seconds")
+            redo = set(pending)
+            for path in (config.records_path, config.diff_path):
+                if path is None or not path.exists():
+                    continue
+                try:
+                    dropped = filter_records(
+                        path,
+                        lambda record: (
+                            not (
+                                record.get("period") == config.period
+                                and record.get("snapshot") == snapshot_text
+                                and record.get("language") in redo
+                            )
+                        ),
+                    )
+                except (OSError, ValueError) as e:
+                    raise SweepError(f"Error rewriting {path}: {e}") from e
+                if dropped:
+                    appLogger.info(
+                        f"resume: dropped {dropped} records of unfinished languages from {path}"
+                    )
+
+        records: RecordWriter | None = None
+        if config.records_path:
+            try:
+                # --resume時は完了済みの言語のレコードを残すため追記する
+                records = RecordWriter(config.records_path, append=config.resume)
+            except (OSError, ValueError) as e:
+                raise SweepError(
+                    f"Error opening records {config.records_path}: {e}"
+                ) from e
+
+        diffs: RecordWriter | None = None
+        if config.diff_path:
+            try:
+                diffs = RecordWriter(config.diff_path, append=config.resume)
+            except (OSError, ValueError) as e:
+                if records:
+                    records.close()
+                raise SweepError(f"Error opening diff {config.diff_path}: {e}") from e
+    except SweepError:
+        if owns_transport:
+            transport_client.close()
+        raise
+
+    def fetch(language: str) -> Job:
+        # I/Oスレッドでは取得だけを行い、パースは parse_page、書き込みは write で行う
+        # 取得エラーは fetched に入れる. 制限時間までに終わりそうにない言語は取得せず空のJobを返す
+        if language in prefetched:
+            text, elapsed = prefetched.pop(language)
+            return Job(language, payload=text, fetch_elapsed=elapsed)
+        if out_of_time(language):
+            return Job(language)
+        wait_turn()
+        if out_of_time(language):
+            return Job(language)
+        started = time.monotonic()
+        try:
+            res = fetch_trending(
+                fetcher, language, config.period, config.timeout, transfer
+            )
+        except ScrapeError as e:
+            return Job(language, fetched=e, fetch_elapsed=time.monotonic() - started)
+        return Job(language, payload=res.text, fetch_elapsed=time.monotonic() - started)
+
+    # --aggregate-dir 用に、パース済みの結果をそのまま取っておく
+    parsed: dict[str, list[TrendingRepo]] = {}
+
+    journal = SweepJournal(config.journal_path) if config.journal_path else None
+
+    def write(job: Job) -> None:
+        # 書き込みは呼び出し元のスレッドだけで行う
+        language = job.key
+        outcome: list[TrendingRepo] | ScrapeError | None = (
+            job.fetched if isinstance(job.fetched, ScrapeError) else job.parsed
+        )
+        if isinstance(outcome, list):
+            # 別プロセスから受け取ったパスは intern されていない
+            for repo in outcome:
+                repo.path = sys.intern(repo.path)
+        fetch_elapsed = job.fetch_elapsed + job.parse_elapsed
+        relative = feed_relative_path(language, config.period)
+        output = config.output_dir / relative
+
+        if outcome is None:
+            appLogger.warning(
+                f"language {language} deferred: deadline would be exceeded"
+            )
+            results.append(
+                SweepResult(
+                    language=language,
+                    output=relative,
+                    status="deferred",
+                    return_code=0,
+                )
+            )
+            return
+
+        started = time.monotonic()
+        try:
+            if isinstance(outcome, ScrapeError):
+                raise outcome
+            # 前回のフィードは上書きする前に1回だけ読み、--stable-ids と差分の両方に使う
+            comparing = bool(diffs or config.changes_dir or config.stats_path)
+            previous, previous_snapshot = load_previous_feed(
+                output, config.stable_ids, comparing
+            )
+            feed_xml = build_atom_feed(
+                language,
+                config.period,
+                outcome,
+                updated,
+                stable_ids=config.stable_ids,
+                previous=previous,
+            )
+            changes = (
+                diff_trending(
+                    language, config.period, outcome, updated, previous_snapshot
+                )
+                if comparing
+                else None
+            )
+            digest = hashlib.sha256(feed_xml.encode("utf-8")).hexdigest()
+            changed = digest != file_sha256(output)
+            write_feed(output, feed_xml)
+            if changes is not None and diffs:
+                diffs.write([to_diff_record(changes)])
+            if changes is not None and config.changes_dir:
+                write_feed(config.changes_dir / relative, build_changes_feed(changes))
+            if records:
+                records.write(to_records(outcome, language, config.period, updated))
+            if config.aggregate_dir:
+                parsed[language] = outcome
+            result = SweepResult(
+                language=language,
+                output=relative,
+                status="ok",
+                return_code=0,
+                changed=changed,
+                sha256=digest,
+            )
+            if changes is not None and changes.previous_snapshot:
+                # --stats の入れ替わり率 (--deadline の優先度に使う)
+                result.churn = round(len(changes.entered) / max(len(outcome), 1), 3)
+        except ScrapeError as e:
+            appLogger.error(f"language {language} failed")
+            result = SweepResult(
+                language=language,
+                output=relative,
+                status="failed",
+                return_code=e.return_code.value,
+            )
+        result.elapsed = round(fetch_elapsed + time.monotonic() - started, 3)
+        language_transfer = transfer.get(language)
+        if language_transfer is not None:
+            result.wire_bytes = language_transfer.wire_bytes
+            result.decoded_bytes = language_transfer.decoded_bytes
+        results.append(result)
+
+        if journal:
+            journal.record(
+                period=config.period,
+                snapshot=snapshot,
+                language=language,
+                status=result.status,
+                return_code=result.return_code,
+                sha256=result.sha256,
+                changed=result.changed,
+            )
+
+    try:
+        stages, wall = run_pipeline(
+            pending,
+            fetch,
+            parse_page,
+            write,
+            io_workers=config.workers,
+            parse_processes=config.parse_processes,
+            queue_size=config.queue_size,
+        )
+        appLogger.info(
+            f"pipeline: {wall:.1f}s, "
+            + ", ".join(
+                f"{stage.name} {stage.utilization(wall):.0%} of {stage.workers} "
+                f"({stage.items} items)"
+                for stage in stages
+            )
+        )
+        if hedged:
+            hedge_stats = hedged.stats
+            appLogger.info(
+                f"hedging: {hedge_stats.hedged} of {hedge_stats.requests} requests hedged "
+                f"({hedge_stats.hedge_wins} answered by the hedge, "
+                f"{hedge_stats.hedges_denied} held back by the rate limit), "
+                f"{hedge_stats.deadline_exceeded} over the language deadline"
+            )
+    finally:
+        if owns_transport:
+            transport_client.close()
+        if journal:
+            journal.close()
+        if records:
+            records.close()
+        if diffs:
+            diffs.close()
+
+    # マニフェストはlanguages.txtの順に並べる
+    order = {language: i for i, language in enumerate(languages)}
+    results.sort(key=lambda r: order[r.language])
+
+    failed = [r.language for r in results if r.status == "failed"]
+    deferred = [r.language for r in results if r.status == "deferred"]
+    appLogger.info(
+        f"{sum(1 for r in results if r.status == 'ok')} succeeded, {len(failed)} failed"
+        + (f": {', '.join(failed)}" if failed else "")
+    )
+    if deferred:
+        appLogger.warning(
+            f"{len(deferred)} deferred by --deadline: {', '.join(deferred)}"
+        )
+
+    total = transfer.total()
+    appLogger.info(
+        f"transfer: {total.requests} requests, {format_bytes(total.wire_bytes)} on the wire, "
+        f"{format_bytes(total.decoded_bytes)} decoded"
+    )
+    for language, language_transfer in transfer.top(TOP_TRANSFER_LANGUAGES):
+        appLogger.info(
+            f"transfer: {language}: {format_bytes(language_transfer.wire_bytes)} on the wire, "
+            f"{format_bytes(language_transfer.decoded_bytes)} decoded"
+        )
+
+    if config.aggregate_dir and shard_count > 1:
+        # シャードごとでは全言語がそろわないので、merge_shards.py の後に aggregate_feeds.py で作る
+        appLogger.warning(
+            "--aggregate-dir is ignored with --shard; run aggregate_feeds.py after merging"
+        )
+    elif config.aggregate_dir:
+        # --resume でスキップした言語は書き出し済みのフィードから読み直す
+        for result in results:
+            if result.resumed:
+                try:
+                    parsed[result.language] = read_feed_repos(
+                        config.output_dir / result.output
+                    )
+                except (OSError, etree.XMLSyntaxError) as e:
+                    appLogger.warning(f"Error reading {result.output}: {e}")
+        try:
+            write_aggregates(
+                parsed, config.period, groups, config.aggregate_dir, updated
+            )
+        except OSError as e:
+            raise SweepError(
+                f"Error writing aggregate feeds to {config.aggregate_dir}: {e}"
+            ) from e
+
+    if config.manifest_path:
+        manifest = {
+            "period": config.period,
+            "snapshot": snapshot,
+            "shard": f"{shard_index}/{shard_count}",
+            "output_dir": os.path.relpath(
+                config.output_dir, config.manifest_path.parent
+            ),
+            "transfer": {
+                "requests": total.requests,
+                "wire_bytes": total.wire_bytes,
+                "decoded_bytes": total.decoded_bytes,
+            },
+            "results": [asdict(r) for r in results],
+        }
+        try:
+            write_manifest(config.manifest_path, manifest)
+        except OSError as e:
+            raise SweepError(
+                f"Error writing manifest {config.manifest_path}: {e}"
+            ) from e
+
+    # シャード実行時は merge_shards.py でまとめて更新する
+    if config.stats_path and shard_count == 1:
+        update_stats(stats, (asdict(r) for r in results))
+        try:
+            save_stats(config.stats_path, stats)
+        except OSError as e:
+            raise SweepError(f"Error writing stats {config.stats_path}: {e}") from e
+
+    return results
+
+
+@click.command()
+@click.option(
+    "--period",
+    type=click.Choice(["daily", "weekly", "monthly"], case_sensitive=True),
+    required=True,
+    help="",
+)
+@click.option(
+    "--languages",
+    "languagesPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=Path("languages.txt"),
+    show_default=True,
+    help="取得対象の言語一覧",
+)
+@click.option(
+    "--output-dir",
+    "outputDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("docs/feeds"),
+    show_default=True,
+    help="<lang>/<period>.atom を書き出すディレクトリ",
+)
+@click.option("--atom-updated-date", type=str, required=False, help="")
+@click.option(
+    "--shard",
+    type=str,
+    required=False,
+    help="i/N (1始まり). 過去の所要時間で均等になるよう言語をN分割し、i番目だけ処理する",
+)
+@click.option(
+    "--stats",
+    "statsPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="言語ごとの過去の所要時間 (シャード割り当てに使う)",
+)
+@click.option(
+    "--manifest",
+    "manifestPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="処理結果 (変更されたファイルなど) を書き出すJSON",
+)
+@click.option(
+    "--records",
+    "recordsPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="全言語のリポジトリごとのレコードを書き出すファイル (.jsonl / .msgpack)",
+)
+@click.option(
+    "--diff",
+    "diffPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="言語ごとの前回のフィードとの差分 (入った / 外れた / 順位が動いた) のレコードを書き出すファイル (.jsonl / .msgpack)",
+)
+@click.option(
+    "--changes-dir",
+    "changesDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=False,
+    help="差分だけのAtom (<lang>/<period>.atom) を書き出すディレクトリ",
+)
+@click.option(
+    "--journal",
+    "journalPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="完了した言語を追記していくジャーナル (JSON Lines)",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="ジャーナル上で同じスナップショット日に完了済みの言語をスキップする",
+)
+@click.option(
+    "--stable-ids",
+    is_flag=True,
+    default=False,
+    help="エントリのidをトレンド入りしている間は固定し、内容が変わらなければupdatedも前回の値を保つ",
+)
+@click.option(
+    "--aggregate-dir",
+    "aggregateDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=False,
+    help="全言語をまとめたフィード (<group>/<period>.atom) を書き出すディレクトリ",
+)
+@click.option(
+    "--aggregate-groups",
+    "aggregateGroupsPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="まとめる言語のグループ (TOML). 省略時は全言語の all のみ",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="リクエストの開始間隔 (秒)",
+)
+@click.option(
+    "--connect-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=CONNECT_TIMEOUT,
+    show_default=True,
+    help="接続のタイムアウト (秒)",
+)
+@click.option(
+    "--read-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=READ_TIMEOUT,
+    show_default=True,
+    help="応答の読み取りのタイムアウト (秒. データが届かない間隔)",
+)
+@click.option(
+    "--language-deadline",
+    type=click.FloatRange(min=0, min_open=True),
+    required=False,
+    help="1言語の取得 (再試行を含む) の制限時間 (秒). 超えた言語はタイムアウトとして失敗する",
+)
+@click.option(
+    "--hedge",
+    is_flag=True,
+    default=False,
+    help="これまでのp95を超えて応答のないリクエストをもう1本送り、先に返った方を使う",
+)
+@click.option(
+    "--hedge-budget",
+    type=click.FloatRange(min=0, max=1),
+    default=DEFAULT_HEDGE_BUDGET,
+    show_default=True,
+    help="--hedge で複製してよいリクエストの割合",
+)
+@click.option(
+    "--preflight/--no-preflight",
+    default=True,
+    show_default=True,
+    help="スイープの前に --preflight-language のページを取得し、抽出結果がおかしければフィードを書かずに中止する (終了コード 41). --shard ではシャードごとに確認する",
+)
+@click.option(
+    "--preflight-language",
+    "preflight_languages",
+    type=str,
+    multiple=True,
+    default=DEFAULT_PREFLIGHT_LANGUAGES,
+    show_default=True,
+    help="事前確認に使う言語 (複数指定可. 取得したページはスイープでもそのまま使う)",
+)
+@click.option(
+    "--rate-limit-file",
+    "rateLimitPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="ホスト上の全スクレイパーで共有するトークンバケットの状態ファイル. 同じファイルを指定した実行は合わせて --rate-limit 以内に収まる",
+)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_RATE,
+    show_default=True,
+    help="--rate-limit-file の全体のリクエスト数 (回/秒)",
+)
+@click.option(
+    "--rate-burst",
+    type=click.FloatRange(min=1),
+    default=DEFAULT_BURST,
+    show_default=True,
+    help="--rate-limit-file で続けて送れるリクエスト数の上限",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="同時に取得する言語数",
+)
+@click.option(
+    "--parse-processes",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="HTMLのパースに使うプロセス数 (0 は取得スレッドでパースする. 全コアを使うには CPU数 を指定)",
+)
+@click.option(
+    "--queue-size",
+    type=click.IntRange(min=1),
+    default=16,
+    show_default=True,
+    help="取得・パース・書き込みの段の間で待たせておく言語数の上限",
+)
+@click.option(
+    "--transport",
+    type=click.Choice(TRANSPORTS, case_sensitive=True),
+    default="requests",
+    show_default=True,
+    help="HTTPクライアントのバックエンド (http2は1本の接続で多重化する. httpx[http2]が必要)",
+)
+@click.option(
+    "--accept-encoding",
+    type=str,
+    default=ACCEPT_ENCODING,
+    show_default=True,
+    help="送信するAccept-Encoding (identityで圧縮なし)",
+)
+@click.option(
+    "--user-agent",
+    type=str,
+    required=False,
+    help="送信するUser-Agent (省略時はHTTPクライアントの既定値)",
+)
+@click.option(
+    "--deadline",
+    type=str,
+    required=False,
+    help="全体の制限時間 (例: 45m, 1h30m, 600). 優先度の高い言語から処理し、間に合わない言語は後回し (deferred) にする",
+)
+@click.option(
+    "--priorities",
+    "prioritiesPath",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+    help="--deadline で使う言語ごとの重要度 (TOML). 省略時は全言語 1.0",
+)
+@click.option(
+    "--lock-file",
+    "lockPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="実行中はこのファイルをflockし、同じ出力先への同時実行を防ぐ",
+)
+@click.option("--verbose", is_flag=True, default=False, show_default=True, help="")
+@click.option(
+    "--timeout",
+    type=float,
+    required=False,
+    hidden=True,
+    help="接続・読み取り共通のタイムアウト (秒). 互換のため残している",
+)
+def main(
+    period: str,
+    languagesPath: Path,
+    outputDir: Path,
+    atom_updated_date: str,
+    shard: str | None,
+    statsPath: Path | None,
+    manifestPath: Path | None,
+    recordsPath: Path | None,
+    diffPath: Path | None,
+    changesDir: Path | None,
+    journalPath: Path | None,
+    resume: bool,
+    stable_ids: bool,
+    aggregateDir: Path | None,
+    aggregateGroupsPath: Path | None,
+    interval: float,
+    connect_timeout: float,
+    read_timeout: float,
+    language_deadline: float | None,
+    hedge: bool,
+    hedge_budget: float,
+    preflight: bool,
+    preflight_languages: tuple[str, ...],
+    rateLimitPath: Path | None,
+    rate_limit: float,
+    rate_burst: float,
+    workers: int,
+    parse_processes: int,
+    queue_size: int,
+    transport: str,
+    accept_encoding: str,
+    user_agent: str | None,
+    deadline: str | None,
+    prioritiesPath: Path | None,
+    lockPath: Path | None,
+    verbose: bool,
+    timeout: float | None,
+) -> None:
+    appLogger.info("start app")
+    appLogger.info(f"command-line argument: --period = {period}")
+    appLogger.info(f"command-line argument: --languages = {languagesPath}")
+    appLogger.info(f"command-line argument: --output-dir = {outputDir}")
+    appLogger.info(f"command-line argument: --atom-updated-date = {atom_updated_date}")
+    appLogger.info(f"command-line argument: --shard = {shard}")
+    appLogger.info(f"command-line argument: --stats = {statsPath}")
+    appLogger.info(f"command-line argument: --manifest = {manifestPath}")
+    appLogger.info(f"command-line argument: --records = {recordsPath}")
+    appLogger.info(f"command-line argument: --diff = {diffPath}")
+    appLogger.info(f"command-line argument: --changes-dir = {changesDir}")
+    appLogger.info(f"command-line argument: --journal = {journalPath}")
+    appLogger.info(f"command-line argument: --resume = {resume}")
+    appLogger.info(f"command-line argument: --stable-ids = {stable_ids}")
+    appLogger.info(f"command-line argument: --aggregate-dir = {aggregateDir}")
+    appLogger.info(f"command-line argument: --aggregate-groups = {aggregateGroupsPath}")
+    appLogger.info(f"command-line argument: --interval = {interval}")
+    appLogger.info(f"command-line argument: --connect-timeout = {connect_timeout}")
+    appLogger.info(f"command-line argument: --read-timeout = {read_timeout}")
+    appLogger.info(f"command-line argument: --language-deadline = {language_deadline}")
+    appLogger.info(f"command-line argument: --hedge = {hedge}")
+    appLogger.info(f"command-line argument: --hedge-budget = {hedge_budget}")
+    appLogger.info(f"command-line argument: --preflight = {preflight}")
+    appLogger.info(
+        f"command-line argument: --preflight-language = {preflight_languages}"
+    )
+    appLogger.info(f"command-line argument: --rate-limit-file = {rateLimitPath}")
+    appLogger.info(f"command-line argument: --rate-limit = {rate_limit}")
+    appLogger.info(f"command-line argument: --rate-burst = {rate_burst}")
+    appLogger.info(f"command-line argument: --workers = {workers}")
+    appLogger.info(f"command-line argument: --parse-processes = {parse_processes}")
+    appLogger.info(f"command-line argument: --queue-size = {queue_size}")
+    appLogger.info(f"command-line argument: --transport = {transport}")
+    appLogger.info(f"command-line argument: --accept-encoding = {accept_encoding}")
+    appLogger.info(f"command-line argument: --user-agent = {user_agent}")
+    appLogger.info(f"command-line argument: --deadline = {deadline}")
+    appLogger.info(f"command-line argument: --priorities = {prioritiesPath}")
+    appLogger.info(f"command-line argument: --lock-file = {lockPath}")
+
+    if verbose:
+        appLogger.setLevel(logging.DEBUG)
+    else:
+        # scrape_trending.py と同様に dateparser の DeprecationWarning を抑止する
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    deadline_seconds: float | None = None
+    if deadline:
+        try:
+            deadline_seconds = parse_duration(deadline)
+        except ValueError as e:
+            appLogger.error(str(e))
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    config = SweepConfig(
+        period=period,
+        languages_path=languagesPath,
+        output_dir=outputDir,
+        atom_updated_date=atom_updated_date,
+        shard=shard,
+        stats_path=statsPath,
+        manifest_path=manifestPath,
+        records_path=recordsPath,
+        diff_path=diffPath,
+        changes_dir=changesDir,
+        journal_path=journalPath,
+        resume=resume,
+        stable_ids=stable_ids,
+        aggregate_dir=aggregateDir,
+        aggregate_groups_path=aggregateGroupsPath,
+        interval=interval,
+        rate_limit_path=rateLimitPath,
+        rate_limit=rate_limit,
+        rate_burst=rate_burst,
+        workers=workers,
+        parse_processes=parse_processes,
+        queue_size=queue_size,
+        transport=transport,
+        accept_encoding=accept_encoding,
+        user_agent=user_agent,
+        timeout=timeout if timeout is not None else (connect_timeout, read_timeout),
+        language_deadline=language_deadline,
+        hedge=hedge,
+        hedge_budget=hedge_budget,
+        preflight_languages=preflight_languages if preflight else (),
+        lock_path=lockPath,
+        deadline=deadline_seconds,
+        priorities_path=prioritiesPath,
+    )
+    try:
+        run_sweep(config)
+    except SweepError as e:
+        appLogger.error(str(e))
+        appLogger.error("app failed")
+        sys.exit(e.return_code)
+
+    appLogger.info("app finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import json
+from pathlib import Path
+from typing import Any, TextIO
+
+
+# 何件書き込むごとにfsyncするか
+# 1件ごとにfsyncするとディスクの遅いランナーで律速になるので、まとめて同期する
+# (クラッシュ時に失うのは最後の数件だけで、それらは--resumeで再取得される)
+SYNC_EVERY = 20
+
+
+class SweepJournal:
+    """Append-only JSON Lines journal of finished languages of a sweep.
+
+    One line per finished language:
+    {"period": ..., "snapshot": ..., "language": ..., "status": ..., "sha256": ..., ...}
+    """
+
+    def __init__(self, path: Path, sync_every: int = SYNC_EVERY):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.sync_every = sync_every
+        self._pending = 0
+        self._fp: TextIO = path.open("a", encoding="utf-8")
+
+    def record(self, **fields: Any) -> None:
+        self._fp.write(json.dumps(fields, ensure_ascii=False) + "\n")
+        self._pending += 1
+        if self._pending >= self.sync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._pending = 0
+
+    def close(self) -> None:
+        if self._fp.closed:
+            return
+        self.sync()
+        self._fp.close()
+
+    def __enter__(self) -> "SweepJournal":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def load_completed(path: Path, period: str, snapshot: str) -> dict[str, dict[str, Any]]:
+    """Return the last successful journal entry per language for a period/snapshot."""
+    completed: dict[str, dict[str, Any]] = {}
+    if not path.exists():
+        return completed
+
+    with path.open("r", encoding="utf-8") as fp:
+        for line in fp:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # 書き込み途中で落ちた最終行は読み飛ばす
+                continue
+            if entry.get("period") != period or entry.get("snapshot") != snapshot:
+                continue
+            if entry.get("status") == "ok":
+                completed[entry["language"]] = entry
+            else:
+                completed.pop(entry["language"], None)
+    return completed
@@ -0,0 +1,28 @@
+import os
+import json
+from pathlib import Path
+from typing import Any
+
+
+# scrape_trending_batch.py --manifest / merge_shards.py --manifest-output が書くJSON
+#
+# {"period": "daily", "snapshot": "2025-01-02", "shard": "1/4",  # snapshot は --atom-updated-date の日付
+#  "output_dir": "docs/feeds",                  # マニフェストのディレクトリからの相対パス
+#  "transfer": {"requests": ..., "wire_bytes": ..., "decoded_bytes": ...},
+#  "results": [{"language": "go", "output": "go/daily.atom", "status": "ok", ...}]}
+#
+# results の各要素は scrape_trending_batch.SweepResult
+
+
+def write_manifest(path: Path, manifest: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def read_manifest(path: Path) -> dict[str, Any]:
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
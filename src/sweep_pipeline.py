@@ -0,0 +1,219 @@
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+
+# 取得 → パース → 書き込み の3段パイプライン
+#
+#   [I/Oスレッド × io_workers] --parse_queue--> [パース: プロセスプール] --write_queue--> [書き込み: 呼び出し元スレッド]
+#
+# - キューはどちらも上限つき. 書き込みが遅れると取得も止まるので、言語数によらずメモリは一定
+# - parse_processes = 0 ならパースはI/Oスレッドで行う (プロセスを起動しない)
+# - 書き込み段は呼び出し元のスレッドで動くので、ジャーナルなどの状態はロックなしで触れる
+QUEUE_POLL_INTERVAL = 0.1
+
+# キューの終端
+_DONE = object()
+
+
+@dataclass(slots=True)
+class Job:
+    """One item flowing through the pipeline."""
+
+    key: str
+    # I/O段の結果 (エラーなど). パース段を通らないものもここで書き込み段へ渡す
+    fetched: Any = None
+    # パース段への入力 (None ならパースしない)
+    payload: Any = None
+    # パース段の結果
+    parsed: Any = None
+    fetch_elapsed: float = 0.0
+    parse_elapsed: float = 0.0
+
+
+@dataclass(slots=True)
+class StageStats:
+    name: str
+    workers: int
+    items: int = 0
+    # 各ワーカーが処理にかかっていた秒数の合計
+    busy: float = 0.0
+
+    def utilization(self, wall: float) -> float:
+        if wall <= 0 or self.workers <= 0:
+            return 0.0
+        return min(self.busy / (wall * self.workers), 1.0)
+
+
+def _timed(parse: Callable[[Any], Any], payload: Any) -> tuple[Any, float]:
+    # プロセスプールで実行される (picklableなトップレベル関数であること)
+    started = time.perf_counter()
+    parsed = parse(payload)
+    return parsed, time.perf_counter() - started
+
+
+class _Stopped(Exception):
+    pass
+
+
+def run_pipeline(
+    keys: Iterable[str],
+    fetch: Callable[[str], Job],
+    parse: Callable[[Any], Any],
+    write: Callable[[Job], None],
+    io_workers: int = 1,
+    parse_processes: int = 0,
+    queue_size: int = 16,
+) -> tuple[list[StageStats], float]:
+    """Run fetch (threads) → parse (processes) → write (this thread) over `keys`.
+
+    `fetch` runs in `io_workers` threads and returns a Job with the time
+    it spent working (not waiting for a rate limit) in `fetch_elapsed`;
+    `parse` must be a picklable top-level function when `parse_processes`
+    > 0. Items are
+    written in completion order. An exception from any stage stops the
+    other stages and is re-raised here. Returns the per-stage stats and
+    the wall time.
+    """
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    parse_queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+    write_queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+    stats_lock = threading.Lock()
+    fetch_stats = StageStats("fetch", io_workers)
+    parse_stats = StageStats(
+        "parse", parse_processes if parse_processes > 0 else io_workers
+    )
+    write_stats = StageStats("write", 1)
+
+    def put(q: queue.Queue[Any], item: Any) -> None:
+        while True:
+            if stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=QUEUE_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def get(q: queue.Queue[Any]) -> Any:
+        while True:
+            if stop.is_set():
+                raise _Stopped()
+            try:
+                return q.get(timeout=QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def fail(e: BaseException) -> None:
+        with stats_lock:
+            errors.append(e)
+        stop.set()
+
+    key_iter = iter(keys)
+    key_lock = threading.Lock()
+
+    def io_worker() -> None:
+        try:
+            while not stop.is_set():
+                with key_lock:
+                    key = next(key_iter, None)
+                if key is None:
+                    break
+                job = fetch(key)
+                fetch_busy = job.fetch_elapsed
+                parse_busy = 0.0
+                if job.payload is not None and parse_processes == 0:
+                    job.parsed, parse_busy = _timed(parse, job.payload)
+                    job.parse_elapsed = parse_busy
+                    job.payload = None
+                with stats_lock:
+                    fetch_stats.items += 1
+                    fetch_stats.busy += fetch_busy
+                    if parse_busy:
+                        parse_stats.items += 1
+                        parse_stats.busy += parse_busy
+                put(parse_queue, job)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            fail(e)
+        finally:
+            try:
+                put(parse_queue, _DONE)
+            except _Stopped:
+                pass
+
+    def dispatcher(pool: ProcessPoolExecutor | None) -> None:
+        remaining = io_workers
+        try:
+            while remaining:
+                job = get(parse_queue)
+                if job is _DONE:
+                    remaining -= 1
+                    continue
+                future: Future[tuple[Any, float]] | None = None
+                if pool is not None and job.payload is not None:
+                    future = pool.submit(_timed, parse, job.payload)
+                    job.payload = None
+                put(write_queue, (job, future))
+        except _Stopped:
+            pass
+        except BaseException as e:
+            fail(e)
+        finally:
+            try:
+                put(write_queue, _DONE)
+            except _Stopped:
+                pass
+
+    pool: ProcessPoolExecutor | None = None
+    if parse_processes > 0:
+        # I/Oスレッドが動いているプロセスをforkしないよう、spawnで起動する
+        pool = ProcessPoolExecutor(
+            max_workers=parse_processes, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    wall_started = time.perf_counter()
+    threads = [
+        threading.Thread(target=io_worker, name=f"fetch-{i}", daemon=True)
+        for i in range(io_workers)
+    ]
+    threads.append(
+        threading.Thread(target=dispatcher, args=(pool,), name="parse", daemon=True)
+    )
+    try:
+        for thread in threads:
+            thread.start()
+        while True:
+            item = get(write_queue)
+            if item is _DONE:
+                break
+            job, future = item
+            if future is not None:
+                job.parsed, job.parse_elapsed = future.result()
+                with stats_lock:
+                    parse_stats.items += 1
+                    parse_stats.busy += job.parse_elapsed
+            started = time.perf_counter()
+            write(job)
+            write_stats.items += 1
+            write_stats.busy += time.perf_counter() - started
+    except _Stopped:
+        pass
+    except BaseException as e:
+        fail(e)
+    finally:
+        for thread in threads:
+            thread.join()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    wall = time.perf_counter() - wall_started
+
+    if errors:
+        raise errors[0]
+    return [fetch_stats, parse_stats, write_stats], wall
@@ -0,0 +1,141 @@
+import re
+import tomllib
+import datetime
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from urllib.parse import unquote
+
+
+# --deadline 指定時の言語の優先順位付け
+#
+# 優先度 = 重要度 × (CHURN_FLOOR + 入れ替わり率) × (1 + 最後に取得できてからの日数)
+#
+# - 重要度     : --priorities のTOML (購読者の多い言語を大きくする). 省略時は全言語 1.0
+# - 入れ替わり率: 1回の取得で新しく入ったリポジトリの割合の移動平均 (sweep_stats の churn)
+# - 経過日数   : sweep_stats の last_success から (上限 MAX_STALENESS_DAYS)
+#
+# 予算に入るまで「優先度 / 予想所要時間」の高い順に言語を選び、優先度の高い順に実行する
+CHURN_FLOOR = 0.1
+
+# 入れ替わり率の実績がない言語に使う値
+DEFAULT_CHURN = 0.5
+
+# 一度も取得できていない言語の経過日数
+MAX_STALENESS_DAYS = 7.0
+
+DURATION_PATTERN = re.compile(r"^(?:(?P<h>\d+)h)?(?:(?P<m>\d+)m)?(?:(?P<s>\d+)s?)?$")
+
+
+def parse_duration(text: str) -> float:
+    """Parse "1h30m", "45m", "90s" or plain seconds ("600") into seconds."""
+    m = DURATION_PATTERN.match(text.strip())
+    if not m or not any(m.groups()):
+        raise ValueError(f"invalid duration {text!r}, expected e.g. 45m, 1h30m or 600")
+    seconds = int(m["h"] or 0) * 3600 + int(m["m"] or 0) * 60 + int(m["s"] or 0)
+    if seconds <= 0:
+        raise ValueError(f"invalid duration {text!r}, must be positive")
+    return float(seconds)
+
+
+@dataclass(slots=True)
+class Priorities:
+    """Importance of each language (URL-decoded name); `default` for the rest."""
+
+    weights: dict[str, float] = field(default_factory=dict)
+    default: float = 1.0
+
+    def weight(self, language: str) -> float:
+        return self.weights.get(unquote(language), self.default)
+
+
+def load_priorities(path: Path) -> Priorities:
+    """Read the importance of the languages from a TOML file.
+
+    default = 1.0
+
+    [languages]
+    python = 5.0
+    go = 3.0
+    "c#" = 2.0
+    """
+    with path.open("rb") as f:
+        config = tomllib.load(f)
+
+    def number(key: str, value: Any) -> float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"{key} must be a non-negative number")
+        return float(value)
+
+    languages = config.get("languages", {})
+    if not isinstance(languages, dict):
+        raise ValueError("[languages] must be a table")
+    return Priorities(
+        weights={
+            unquote(name): number(f"languages.{name}", value)
+            for name, value in languages.items()
+        },
+        default=number("default", config.get("default", 1.0)),
+    )
+
+
+def staleness_days(entry: dict[str, Any], now: datetime.datetime) -> float:
+    last_success = entry.get("last_success")
+    if not last_success:
+        return MAX_STALENESS_DAYS
+    elapsed = now - datetime.datetime.fromisoformat(last_success)
+    return min(max(elapsed.total_seconds() / 86400, 0.0), MAX_STALENESS_DAYS)
+
+
+def priority_scores(
+    languages: list[str],
+    stats: dict[str, dict[str, Any]],
+    priorities: Priorities,
+    now: datetime.datetime,
+) -> dict[str, float]:
+    scores: dict[str, float] = {}
+    for lang in languages:
+        entry = stats.get(lang, {})
+        churn = float(entry.get("churn", DEFAULT_CHURN))
+        scores[lang] = (
+            priorities.weight(lang)
+            * (CHURN_FLOOR + churn)
+            * (1 + staleness_days(entry, now))
+        )
+    return scores
+
+
+def estimate_wall_time(
+    total_cost: float, count: int, workers: int, interval: float
+) -> float:
+    # 並列に取得しても、リクエストの開始は interval 秒ずつずれる
+    return max(total_cost / workers, count * interval)
+
+
+def plan_sweep(
+    languages: list[str],
+    costs: dict[str, float],
+    scores: dict[str, float],
+    budget: float,
+    workers: int = 1,
+    interval: float = 0.0,
+) -> tuple[list[str], list[str]]:
+    """Choose the languages that fit in `budget` seconds.
+
+    Languages are taken by score per second of expected cost (ties by
+    name), skipping any that would overrun the budget. Returns the chosen
+    languages by descending score, so the most valuable run first, and the
+    deferred ones in languages.txt order.
+    """
+    chosen: set[str] = set()
+    total_cost = 0.0
+    for lang in sorted(languages, key=lambda x: (-scores[x] / max(costs[x], 1e-6), x)):
+        cost = total_cost + costs[lang]
+        if estimate_wall_time(cost, len(chosen) + 1, workers, interval) > budget:
+            continue
+        chosen.add(lang)
+        total_cost = cost
+
+    scheduled = sorted(chosen, key=lambda x: (-scores[x], x))
+    deferred = [lang for lang in languages if lang not in chosen]
+    return scheduled, deferred
@@ -0,0 +1,143 @@
+import os
+import json
+import datetime
+import statistics
+from pathlib import Path
+from typing import Any, Iterable
+
+
+# 言語ごとの過去実績 (取得+パース+書き込みにかかった秒数など) を保持するJSON
+#
+# {
+#   "version": 1,
+#   "languages": {
+#     "go": {"cost": 1.23, "runs": 10, "churn": 0.2,
+#            "last_success": "2025-01-01T00:00:05+00:00"},
+#     ...
+#   }
+# }
+STATS_VERSION = 1
+
+# 指数移動平均の重み (新しい計測値の比率)
+COST_SMOOTHING = 0.3
+
+# 入れ替わり率 (新しく入ったリポジトリの割合) の指数移動平均の重み
+CHURN_SMOOTHING = 0.3
+
+# 実績のない言語に使うコスト (秒)
+DEFAULT_COST = 1.0
+
+
+def load_stats(path: Path | None) -> dict[str, dict[str, Any]]:
+    """Load per-language stats; a missing file means no history yet."""
+    if path is None or not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    languages = data.get("languages", {})
+    if not isinstance(languages, dict):
+        raise ValueError(f"invalid stats file: {path}")
+    return languages
+
+
+def save_stats(path: Path, stats: dict[str, dict[str, Any]]) -> None:
+    """Write stats atomically so a concurrent reader never sees a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(
+            {"version": STATS_VERSION, "languages": stats},
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def update_stats(
+    stats: dict[str, dict[str, Any]],
+    results: Iterable[dict[str, Any]],
+    now: datetime.datetime | None = None,
+) -> None:
+    """Fold the elapsed times of a sweep into the smoothed per-language costs.
+
+    Successful results also set `last_success` and fold their `churn`
+    (when the sweep computed one) into a smoothed churn.
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    for result in results:
+        elapsed = result.get("elapsed")
+        if elapsed is None:
+            continue
+        entry = stats.setdefault(result["language"], {})
+        previous = entry.get("cost")
+        if previous is None:
+            entry["cost"] = round(elapsed, 3)
+        else:
+            entry["cost"] = round(previous + COST_SMOOTHING * (elapsed - previous), 3)
+        entry["runs"] = entry.get("runs", 0) + 1
+
+        if result.get("status") != "ok":
+            continue
+        entry["last_success"] = now.isoformat(timespec="seconds")
+        churn = result.get("churn")
+        if churn is not None:
+            previous = entry.get("churn")
+            entry["churn"] = round(
+                churn
+                if previous is None
+                else previous + CHURN_SMOOTHING * (churn - previous),
+                3,
+            )
+
+
+def estimate_costs(
+    languages: list[str], stats: dict[str, dict[str, Any]]
+) -> dict[str, float]:
+    """Return the expected cost of each language, using the median for unknown ones."""
+    known = [
+        float(stats[lang]["cost"])
+        for lang in languages
+        if lang in stats and "cost" in stats[lang]
+    ]
+    fallback = statistics.median(known) if known else DEFAULT_COST
+    return {
+        lang: float(stats.get(lang, {}).get("cost", fallback)) for lang in languages
+    }
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """Parse "i/N" (1-based) into (i, N)."""
+    try:
+        index_text, count_text = text.split("/", 1)
+        index, count = int(index_text), int(count_text)
+    except ValueError:
+        raise ValueError(f"invalid shard {text!r}, expected i/N") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard {text!r}, expected 1 <= i <= N")
+    return index, count
+
+
+def assign_shards(
+    languages: list[str], costs: dict[str, float], count: int
+) -> list[list[str]]:
+    """Split languages into `count` shards with roughly equal total cost.
+
+    Greedy longest-processing-time assignment: the most expensive language goes
+    to the currently lightest shard. Ties are broken by language name and shard
+    number, so every runner computes the same assignment from the same inputs.
+    Each shard keeps the original languages.txt order.
+    """
+    loads = [0.0] * count
+    owner: dict[str, int] = {}
+    for lang in sorted(languages, key=lambda x: (-costs[x], x)):
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        owner[lang] = shard
+        loads[shard] += costs[lang]
+
+    shards: list[list[str]] = [[] for _ in range(count)]
+    for lang in languages:
+        shards[owner[lang]].append(lang)
+    return shards
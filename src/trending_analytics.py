@@ -0,0 +1,584 @@
+import sys
+import os
+import re
+import json
+import shutil
+import time
+import logging
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import click
+from lxml import etree
+
+from trending_history import PERIODS, iter_archive_files, parse_archive_atom
+
+
+def setup_logging(level: int = logging.INFO) -> logging.Logger:
+    # Making Python loggers output all messages to stdout in addition to log file
+    # https://stackoverflow.com/questions/14058453/making-python-loggers-output-all-messages-to-stdout-in-addition-to-log-file
+    formatter = logging.Formatter(
+        "%(asctime)s - %(pathname)s:%(lineno)d - %(levelname)s - %(message)s"
+    )
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+
+    logger = logging.getLogger(__name__)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+    return logger
+
+
+appLogger = setup_logging()
+
+# 列ストアのレイアウト
+#
+# <store>/meta.json                ... {"version": 2, "data": "data-000001", "repos": [...], "languages": [...]} (IDは添字)
+# <store>/<data>/files.txt         ... 取り込み済みのアーカイブ (feedsディレクトリからの相対パス)
+# <store>/<data>/<period>/<column>.npy
+#   repo     int32  リポジトリID
+#   language int16  言語ID
+#   day      int32  スナップショットの日付 (1970-01-01からの日数)
+#   rank     int16  順位 (順位のない古いアーカイブは0)
+#
+# 各periodの行は (repo, day, language) の順に並んでいるので、
+# リポジトリごと・スナップショットごとのまとまりが連続した区間になる
+#
+# build は列と files.txt を新しい data-NNNNNN に書き、最後に meta.json を置き換えて切り替える.
+# 途中で止まっても meta.json は前回の data を指したままなので、ストアは前回の状態で読める
+# (version 1 は data ディレクトリがなく、<store> 直下に列と files.txt を置いていた)
+STORE_VERSION = 2
+DATA_DIR_PATTERN = re.compile(r"^data-(?P<generation>\d+)$")
+COLUMNS = {"repo": "int32", "language": "int16", "day": "int32", "rank": "int16"}
+
+# トレンドページの最大件数. 順位のない出現は最下位として扱う
+TRENDING_PAGE_SIZE = 25
+
+
+def _import_numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        raise ValueError(
+            "trending_analytics.py requires numpy to be installed"
+        ) from None
+    return numpy
+
+
+@dataclass(slots=True)
+class Store:
+    repos: list[str]
+    languages: list[str]
+    # period -> column -> ndarray (読み込み時はmmap)
+    columns: dict[str, dict[str, Any]]
+    # 列と files.txt のあるディレクトリ (まだ何も書いていなければ None)
+    data_dir: Path | None = None
+
+
+def load_store(store_dir: Path, mmap: bool = True) -> Store:
+    """Open a store; the columns are memory-mapped, so nothing is parsed or copied."""
+    np = _import_numpy()
+    with (store_dir / "meta.json").open("r", encoding="utf-8") as f:
+        meta = json.load(f)
+    version = meta.get("version")
+    if version == STORE_VERSION:
+        data_dir = store_dir / meta["data"]
+    elif version == 1:
+        data_dir = store_dir
+    else:
+        raise ValueError(f"unsupported store version {version} in {store_dir}")
+    columns: dict[str, dict[str, Any]] = {}
+    for period in PERIODS:
+        period_dir = data_dir / period
+        if not (period_dir / "repo.npy").exists():
+            continue
+        columns[period] = {
+            name: np.load(period_dir / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in COLUMNS
+        }
+    return Store(
+        repos=meta["repos"],
+        languages=meta["languages"],
+        columns=columns,
+        data_dir=data_dir,
+    )
+
+
+def read_store_files(data_dir: Path) -> list[str]:
+    try:
+        with (data_dir / "files.txt").open("r", encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def next_data_dir(store_dir: Path) -> Path:
+    # 書きかけで残ったディレクトリとも重ならない番号にする
+    generations = [
+        int(m["generation"])
+        for m in map(DATA_DIR_PATTERN.match, os.listdir(store_dir))
+        if m
+    ]
+    return store_dir / f"data-{max(generations, default=0) + 1:06d}"
+
+
+def remove_stale_data(store_dir: Path, data_dir: Path) -> None:
+    """Remove the data directories (and version 1 files) that meta.json no longer points to."""
+    for entry in store_dir.iterdir():
+        if entry == data_dir:
+            continue
+        if DATA_DIR_PATTERN.match(entry.name) or entry.name in PERIODS:
+            shutil.rmtree(entry, ignore_errors=True)
+        elif entry.name == "files.txt":
+            entry.unlink(missing_ok=True)
+
+
+def build_store(store_dir: Path, feeds_dir: Path) -> tuple[int, int]:
+    """Add the archives not yet in the store; return (files, rows) added.
+
+    Only new archive files are parsed. Their rows are appended to the
+    existing columns, and each period is re-sorted and written to a new
+    data directory together with the file list; replacing meta.json then
+    switches to it in one step, so an interrupted build leaves the
+    previous store intact.
+    """
+    np = _import_numpy()
+
+    if (store_dir / "meta.json").exists():
+        # 追記して並べ直すので、mmapではなくメモリに読み込む
+        store = load_store(store_dir, mmap=False)
+    else:
+        store = Store(repos=[], languages=[], columns={})
+    known_files = read_store_files(store.data_dir) if store.data_dir else []
+    known = set(known_files)
+    repo_ids = {repo: i for i, repo in enumerate(store.repos)}
+    language_ids = {language: i for i, language in enumerate(store.languages)}
+
+    # 新しい行はarrayに溜める (タプルのリストよりずっと小さい)
+    added: dict[str, dict[str, array]] = {
+        period: {
+            "repo": array("i"),
+            "language": array("h"),
+            "day": array("i"),
+            "rank": array("h"),
+        }
+        for period in PERIODS
+    }
+    new_files: list[str] = []
+    epoch = np.datetime64("1970-01-01", "D")
+    for archive in iter_archive_files(feeds_dir):
+        relative = archive.path.relative_to(feeds_dir).as_posix()
+        if relative in known:
+            continue
+        rows = added[archive.period]
+        language_id = language_ids.setdefault(archive.language, len(language_ids))
+        day = int((np.datetime64(archive.date, "D") - epoch).astype(int))
+        for repo, rank in parse_archive_atom(archive.path):
+            rows["repo"].append(repo_ids.setdefault(repo, len(repo_ids)))
+            rows["language"].append(language_id)
+            rows["day"].append(day)
+            rows["rank"].append(rank or 0)
+        new_files.append(relative)
+        if len(new_files) % 1000 == 0:
+            appLogger.info(f"parsed {len(new_files)} files")
+
+    added_rows = sum(len(rows["repo"]) for rows in added.values())
+    if not new_files:
+        return 0, 0
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    data_dir = next_data_dir(store_dir)
+    data_dir.mkdir()
+    for period in PERIODS:
+        rows = added[period]
+        if not rows["repo"] and period not in store.columns:
+            continue
+        merged = {
+            name: np.concatenate(
+                [
+                    np.asarray(
+                        store.columns.get(period, {}).get(name, []), dtype=dtype
+                    ),
+                    np.frombuffer(rows[name], dtype=rows[name].typecode).astype(dtype),
+                ]
+            )
+            for name, dtype in COLUMNS.items()
+        }
+        # lexsortは最後のキーが第1キー
+        order = np.lexsort((merged["language"], merged["day"], merged["repo"]))
+        period_dir = data_dir / period
+        period_dir.mkdir()
+        for name in COLUMNS:
+            np.save(period_dir / f"{name}.npy", merged[name][order])
+    with (data_dir / "files.txt").open("w", encoding="utf-8") as f:
+        f.writelines(f"{relative}\n" for relative in known_files + new_files)
+
+    # 列と取り込み済みの一覧を書き終えてから、meta.json の置き換えで切り替える
+    meta = {
+        "version": STORE_VERSION,
+        "data": data_dir.name,
+        "repos": list(repo_ids),
+        "languages": list(language_ids),
+    }
+    tmp_path = store_dir / ".meta.json.tmp"
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, store_dir / "meta.json")
+    remove_stale_data(store_dir, data_dir)
+    return len(new_files), added_rows
+
+
+def snapshot_slots(period: str, days: Any) -> Any:
+    """Number the snapshots so that consecutive snapshots differ by exactly 1."""
+    np = _import_numpy()
+    if period == "daily":
+        return days.astype(np.int64)
+    if period == "weekly":
+        return days.astype(np.int64) // 7
+    # monthly: 1970-01からの月数
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+@dataclass(slots=True)
+class Snapshots:
+    """One row per (repository, snapshot), sorted by repository then snapshot."""
+
+    repo: Any
+    slot: Any
+    day: Any
+    # 言語をまたいだ最高順位 (順位なしは TRENDING_PAGE_SIZE)
+    best_rank: Any
+    # 最新のスナップショット (絞り込み前の全体での最新)
+    latest_slot: int
+
+
+def collapse_snapshots(
+    period: str, columns: dict[str, Any], language_id: int | None = None
+) -> Snapshots:
+    np = _import_numpy()
+    repo = columns["repo"]
+    day = columns["day"]
+    rank = columns["rank"]
+    latest_slot = (
+        int(snapshot_slots(period, day.max(keepdims=True))[0]) if len(day) else 0
+    )
+    if language_id is not None:
+        mask = columns["language"] == language_id
+        repo, day, rank = repo[mask], day[mask], rank[mask]
+    else:
+        repo, day, rank = np.asarray(repo), np.asarray(day), np.asarray(rank)
+
+    slot = snapshot_slots(period, day)
+    rank = np.where(rank > 0, rank, TRENDING_PAGE_SIZE).astype(np.int16)
+    if len(repo) == 0:
+        return Snapshots(repo, slot, day, rank, latest_slot)
+
+    # 同じリポジトリ・同じスナップショットの行 (複数の言語) を1行にまとめる
+    boundary = np.empty(len(repo), dtype=bool)
+    boundary[0] = True
+    boundary[1:] = (repo[1:] != repo[:-1]) | (slot[1:] != slot[:-1])
+    starts = np.flatnonzero(boundary)
+    return Snapshots(
+        repo=repo[starts],
+        slot=slot[starts],
+        day=day[starts],
+        best_rank=np.minimum.reduceat(rank, starts),
+        latest_slot=latest_slot,
+    )
+
+
+@dataclass(slots=True)
+class Streaks:
+    """Runs of consecutive snapshots, one row per run."""
+
+    repo: Any
+    start_day: Any
+    end_day: Any
+    length: Any
+    end_slot: Any
+
+
+def compute_streaks(snapshots: Snapshots) -> Streaks:
+    np = _import_numpy()
+    repo, slot = snapshots.repo, snapshots.slot
+    n = len(repo)
+    new_run = np.empty(n, dtype=bool)
+    if n:
+        new_run[0] = True
+        new_run[1:] = (repo[1:] != repo[:-1]) | (np.diff(slot) != 1)
+    starts = np.flatnonzero(new_run)
+    ends = np.append(starts[1:], n) - 1
+    return Streaks(
+        repo=repo[starts],
+        start_day=snapshots.day[starts],
+        end_day=snapshots.day[ends],
+        length=ends - starts + 1,
+        end_slot=slot[ends],
+    )
+
+
+@dataclass(slots=True)
+class Momentum:
+    repo: Any
+    score: Any
+    # 最新のスナップショットまで続いている連続回数 (0は圏外)
+    streak: Any
+    # 全期間の登場回数 (スナップショット数)
+    snapshots: Any
+    # 最新のスナップショットでの順位 (0は圏外)
+    rank: Any
+    # 前回のスナップショットからの順位の上昇幅 (前回圏外なら0)
+    rank_delta: Any
+    # 直近のウィンドウ内で登場した言語数
+    languages: Any
+
+
+def compute_momentum(
+    period: str,
+    columns: dict[str, Any],
+    repo_count: int,
+    window: int,
+    decay: float,
+    language_id: int | None = None,
+) -> Momentum:
+    """Score every repository by its recent ranks, newest snapshots weighted most.
+
+    score = sum over the last `window` snapshots of
+            decay ** age * (TRENDING_PAGE_SIZE + 1 - best rank) / TRENDING_PAGE_SIZE
+    """
+    np = _import_numpy()
+    snapshots = collapse_snapshots(period, columns, language_id)
+    latest = snapshots.latest_slot
+
+    age = latest - snapshots.slot
+    recent = age < window
+    points = (TRENDING_PAGE_SIZE + 1 - snapshots.best_rank[recent]) / TRENDING_PAGE_SIZE
+    score = np.bincount(
+        snapshots.repo[recent],
+        weights=points * decay ** age[recent],
+        minlength=repo_count,
+    )
+
+    streaks = compute_streaks(snapshots)
+    current = streaks.end_slot == latest
+    streak = np.zeros(repo_count, dtype=np.int64)
+    streak[streaks.repo[current]] = streaks.length[current]
+
+    in_latest = age == 0
+    rank = np.zeros(repo_count, dtype=np.int64)
+    rank[snapshots.repo[in_latest]] = snapshots.best_rank[in_latest]
+
+    # 同じリポジトリの直前の行が前回のスナップショットなら、順位の差をとる
+    rank_delta = np.zeros(repo_count, dtype=np.int64)
+    follows = np.zeros(len(snapshots.repo), dtype=bool)
+    follows[1:] = (snapshots.repo[1:] == snapshots.repo[:-1]) & (
+        np.diff(snapshots.slot) == 1
+    )
+    moved = in_latest & follows
+    moved_index = np.flatnonzero(moved)
+    rank_delta[snapshots.repo[moved_index]] = (
+        snapshots.best_rank[moved_index - 1].astype(np.int64)
+        - snapshots.best_rank[moved_index]
+    )
+
+    # ウィンドウ内の (リポジトリ, 言語) の組を数える
+    day_recent = snapshot_slots(period, columns["day"]) > latest - window
+    pairs = (
+        columns["repo"][day_recent].astype(np.int64) * (1 << 16)
+        + columns["language"][day_recent]
+    )
+    if language_id is not None:
+        pairs = pairs[columns["language"][day_recent] == language_id]
+    languages = np.bincount(np.unique(pairs) >> 16, minlength=repo_count)
+
+    return Momentum(
+        repo=np.arange(repo_count),
+        score=score,
+        streak=streak,
+        snapshots=np.bincount(snapshots.repo, minlength=repo_count),
+        rank=rank,
+        rank_delta=rank_delta,
+        languages=languages,
+    )
+
+
+def top_k(values: Any, k: int) -> Any:
+    """Indices of the k largest values, largest first (only the top k are sorted)."""
+    np = _import_numpy()
+    k = min(k, len(values))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-values, k - 1)[:k]
+    return candidates[np.argsort(-values[candidates], kind="stable")]
+
+
+def format_day(day: int) -> str:
+    np = _import_numpy()
+    return str(np.datetime64(int(day), "D"))
+
+
+def open_store(store_dir: Path) -> Store:
+    if not (store_dir / "meta.json").exists():
+        raise click.ClickException(
+            f"store not found: {store_dir} (run the build command first)"
+        )
+    try:
+        return load_store(store_dir)
+    except (OSError, ValueError) as e:
+        raise click.ClickException(f"Error opening store {store_dir}: {e}") from e
+
+
+def language_filter(store: Store, language: str | None) -> int | None:
+    if language is None:
+        return None
+    try:
+        return store.languages.index(language)
+    except ValueError:
+        raise click.ClickException(f"unknown language: {language}") from None
+
+
+@click.group()
+@click.option(
+    "--store",
+    "storeDir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("trending-analytics"),
+    show_default=True,
+    help="列ストア (.npy) のディレクトリ",
+)
+@click.pass_context
+def cli(ctx: click.Context, storeDir: Path) -> None:
+    """Vectorized analytics over the archived atom feeds, on a columnar NumPy store."""
+    ctx.obj = storeDir
+
+
+@cli.command()
+@click.option(
+    "--dir",
+    "dirPath",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    required=True,
+    help="アーカイブ済みAtomを含むfeedsディレクトリ",
+)
+@click.pass_obj
+def build(storeDir: Path, dirPath: Path) -> None:
+    """Compile the archived atoms into the columnar store (incrementally)."""
+    appLogger.info("start app")
+    appLogger.info(f"command-line argument: --store = {storeDir}")
+    appLogger.info(f"command-line argument: --dir = {dirPath}")
+
+    started = time.monotonic()
+    try:
+        storeDir.mkdir(parents=True, exist_ok=True)
+        files, rows = build_store(storeDir, dirPath)
+    except etree.XMLSyntaxError as e:
+        appLogger.error(f"XML parse error: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        appLogger.error(f"Error building store {storeDir}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    appLogger.info(
+        f"added {files} files ({rows} rows) in {time.monotonic() - started:.1f}s"
+    )
+    appLogger.info("app finished")
+
+
+@cli.command()
+@click.option(
+    "--period",
+    type=click.Choice(PERIODS, case_sensitive=True),
+    default="daily",
+    show_default=True,
+)
+@click.option("--language", type=str, default=None, help="言語を限定する")
+@click.option(
+    "--window",
+    type=click.IntRange(min=1),
+    default=7,
+    show_default=True,
+    help="スコアに使う直近のスナップショット数",
+)
+@click.option(
+    "--decay",
+    type=click.FloatRange(min=0, max=1),
+    default=0.8,
+    show_default=True,
+    help="1スナップショット古くなるごとの重み",
+)
+@click.option(
+    "-n", "--limit", type=click.IntRange(min=1), default=20, show_default=True
+)
+@click.pass_obj
+def rising(
+    storeDir: Path,
+    period: str,
+    language: str | None,
+    window: int,
+    decay: float,
+    limit: int,
+) -> None:
+    """Show the repositories with the most momentum in the recent snapshots.
+
+    Columns: repo, score, current streak, snapshots in total, latest rank,
+    rank change since the previous snapshot, languages in the window.
+    """
+    store = open_store(storeDir)
+    if period not in store.columns:
+        return
+    momentum = compute_momentum(
+        period,
+        store.columns[period],
+        len(store.repos),
+        window,
+        decay,
+        language_filter(store, language),
+    )
+    for i in top_k(momentum.score, limit):
+        if momentum.score[i] <= 0:
+            break
+        rank = momentum.rank[i]
+        delta = momentum.rank_delta[i]
+        click.echo(
+            f"{store.repos[i]}\t{momentum.score[i]:.3f}\t{momentum.streak[i]}\t"
+            f"{momentum.snapshots[i]}\t{rank or '-'}\t{delta:+d}\t{momentum.languages[i]}"
+        )
+
+
+@cli.command()
+@click.option(
+    "--period",
+    type=click.Choice(PERIODS, case_sensitive=True),
+    default="daily",
+    show_default=True,
+)
+@click.option("--language", type=str, default=None, help="言語を限定する")
+@click.option(
+    "-n", "--limit", type=click.IntRange(min=1), default=20, show_default=True
+)
+@click.pass_obj
+def longest(storeDir: Path, period: str, language: str | None, limit: int) -> None:
+    """Show the longest trending streaks (repo, start, end, length)."""
+    store = open_store(storeDir)
+    if period not in store.columns:
+        return
+    snapshots = collapse_snapshots(
+        period, store.columns[period], language_filter(store, language)
+    )
+    streaks = compute_streaks(snapshots)
+    for i in top_k(streaks.length, limit):
+        click.echo(
+            f"{store.repos[streaks.repo[i]]}\t{format_day(streaks.start_day[i])}\t"
+            f"{format_day(streaks.end_day[i])}\t{streaks.length[i]}"
+        )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,340 @@
+import os
+import re
+import gzip
+import zlib
+import datetime
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, cast
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from feed_layout import PERIODS
+
+
+# ネットワークの代わりに、保存済みのトレンドページを読む (過去分の埋め戻し用)
+#
+# - WARC (.warc / .warc.gz): response レコードのうち、WARC-Target-URI が
+#   https://github.com/trending/<lang>?since=<period> のもの. 取得日時は WARC-Date
+# - 保存したHTMLのディレクトリ: <dir>/<lang>/<period>/<名前>.html
+#   取得日時はファイル名の YYYYMMDDhhmmss (Wayback Machine のタイムスタンプ) か YYYY-MM-DD
+#
+# WARCはレコードを1件ずつ読み、トレンドページ以外のレコードは読み飛ばすので、
+# アーカイブ全体をメモリに載せることはない
+GITHUB_HOSTS = frozenset({"github.com", "www.github.com"})
+HTML_SUFFIXES = frozenset({".html", ".htm"})
+
+# GitHubのURLと同じく、# などURLとして書けない文字だけをエスケープする (languages.txt の表記: c%23, c++)
+LANGUAGE_SAFE_CHARS = "+'!*(),;:@&=$"
+
+WAYBACK_TIMESTAMP_PATTERN = re.compile(r"(?<!\d)(\d{14})(?!\d)")
+DATE_PATTERN = re.compile(r"(?<!\d)(\d{4}-\d{2}-\d{2})(?!\d)")
+
+
+@dataclass(slots=True)
+class ArchivedPage:
+    """One saved trending page; the body is decoded by read(), off the reading thread."""
+
+    language: str
+    period: str
+    captured: datetime.datetime
+    # どこから読んだか (ログ用): WARCは <ファイル>@<オフセット>
+    source: str
+    # WARCの場合はHTTPレスポンスの本文とヘッダー、HTMLの場合は path
+    body: bytes | None = None
+    http_headers: dict[str, str] | None = None
+    path: Path | None = None
+
+    @property
+    def snapshot(self) -> str:
+        return self.captured.astimezone(datetime.UTC).date().isoformat()
+
+    def read(self) -> str:
+        if self.path is not None:
+            return self.path.read_bytes().decode("utf-8", errors="replace")
+        body = self.body or b""
+        headers = self.http_headers or {}
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            body = dechunk(body)
+        body = decompress(body, headers.get("content-encoding", ""))
+        return body.decode(content_charset(headers), errors="replace")
+
+
+def trending_rows_html(html: str) -> str:
+    """The span of a trending page from the first <article> to the last </article>.
+
+    parse_trending_page only reads article.Box-row, so the rest of the page
+    (header, navigation, footer) is parse cost only. Pages without an
+    article element are returned whole.
+    """
+    start = html.find("<article")
+    end = html.rfind("</article>")
+    if start < 0 or end < start:
+        return html
+    return html[start : end + len("</article>")]
+
+
+def normalize_language(name: str) -> str:
+    """The languages.txt spelling of a language from a URL segment or a feed directory."""
+    return quote(unquote(name).lower(), safe=LANGUAGE_SAFE_CHARS)
+
+
+def parse_trending_url(url: str) -> tuple[str, str] | None:
+    """(language, period) of a trending page URL; None for any other page.
+
+    Pages without a language, the developers pages and pages filtered by
+    spoken language are not feeds of this project, so they give None too.
+    """
+    parts = urlsplit(url.strip().strip("<>"))
+    if parts.hostname not in GITHUB_HOSTS:
+        return None
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if not segments or segments[0] != "trending":
+        return None
+    query = parse_qs(parts.query)
+    if query.get("spoken_language_code", [""])[0]:
+        return None
+
+    if len(segments) == 2 and segments[1] != "developers":
+        language = segments[1]
+    elif len(segments) == 1 and query.get("l", [""])[0]:
+        # 古い形式: /trending?l=python
+        language = query["l"][0]
+    else:
+        return None
+    period = query.get("since", ["daily"])[0]
+    if period not in PERIODS:
+        return None
+    return normalize_language(language), period
+
+
+def parse_capture_time(text: str) -> datetime.datetime | None:
+    """Capture time from a file name: a Wayback timestamp, else a date (midnight UTC)."""
+    m = WAYBACK_TIMESTAMP_PATTERN.search(text)
+    if m:
+        try:
+            return datetime.datetime.strptime(m.group(1), "%Y%m%d%H%M%S").replace(
+                tzinfo=datetime.UTC
+            )
+        except ValueError:
+            pass
+    m = DATE_PATTERN.search(text)
+    if m:
+        try:
+            date = datetime.date.fromisoformat(m.group(1))
+        except ValueError:
+            return None
+        return datetime.datetime.combine(date, datetime.time(), datetime.UTC)
+    return None
+
+
+def dechunk(body: bytes) -> bytes:
+    """Undo Transfer-Encoding: chunked."""
+    chunks: list[bytes] = []
+    pos = 0
+    while True:
+        end = body.find(b"\r\n", pos)
+        if end < 0:
+            raise ValueError("truncated chunked body")
+        try:
+            size = int(body[pos:end].split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            raise ValueError(f"malformed chunk size at offset {pos}") from None
+        if size == 0:
+            return b"".join(chunks)
+        start = end + 2
+        chunk = body[start : start + size]
+        if len(chunk) < size:
+            raise ValueError("truncated chunked body")
+        chunks.append(chunk)
+        pos = start + size + 2
+
+
+def _import_brotli() -> Any:
+    try:
+        import brotli
+    except ImportError:
+        raise ValueError(
+            "brotli is not installed (needed for Content-Encoding: br)"
+        ) from None
+    return brotli
+
+
+def decompress(body: bytes, content_encoding: str) -> bytes:
+    """Undo Content-Encoding (gzip, deflate, br)."""
+    for encoding in reversed(
+        [e.strip().lower() for e in content_encoding.split(",") if e.strip()]
+    ):
+        try:
+            if encoding in ("gzip", "x-gzip"):
+                body = gzip.decompress(body)
+            elif encoding == "deflate":
+                try:
+                    body = zlib.decompress(body)
+                except zlib.error:
+                    # zlibヘッダーのない生のdeflateを送るサーバーもある
+                    body = zlib.decompress(body, -zlib.MAX_WBITS)
+            elif encoding == "br":
+                body = _import_brotli().decompress(body)
+            elif encoding != "identity":
+                raise ValueError(f"unsupported Content-Encoding: {encoding}")
+        except (OSError, EOFError, zlib.error) as e:
+            raise ValueError(f"cannot decode {encoding} body: {e}") from e
+    return body
+
+
+def content_charset(headers: dict[str, str]) -> str:
+    for param in headers.get("content-type", "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            return value.strip().strip('"')
+    return "utf-8"
+
+
+def parse_http_response(block: bytes) -> tuple[int, dict[str, str], bytes]:
+    """Split the block of a WARC response record into (status, headers, body)."""
+    head, sep, body = block.partition(b"\r\n\r\n")
+    if not sep:
+        head, sep, body = block.partition(b"\n\n")
+    lines = head.decode("iso-8859-1").splitlines()
+    if not lines or not lines[0].startswith("HTTP/"):
+        raise ValueError("not an HTTP response")
+    try:
+        status = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        raise ValueError(f"malformed status line: {lines[0]!r}") from None
+    headers: dict[str, str] = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers, body
+
+
+def open_warc(path: Path) -> BinaryIO:
+    # .warc.gz はレコードごとのgzipメンバーの連結. GzipFile はメンバーをまたいで読み進める
+    if path.suffix == ".gz":
+        return cast(BinaryIO, gzip.GzipFile(path, "rb"))
+    return path.open("rb")
+
+
+def iter_warc_records(
+    fp: BinaryIO, wanted: Callable[[dict[str, str]], bool]
+) -> Iterator[tuple[int, dict[str, str], bytes]]:
+    """Yield (offset, headers, block) of the records that `wanted` accepts.
+
+    Header names are lower-cased. Blocks of other records are skipped
+    without being kept, so memory stays at one record whatever the
+    archive size. The offset is in the uncompressed stream.
+    """
+    offset = 0
+    while True:
+        line = fp.readline()
+        if not line:
+            return
+        if not line.strip():
+            # レコードの区切り (CRLF CRLF)
+            offset += len(line)
+            continue
+        if not line.startswith(b"WARC/"):
+            raise ValueError(f"not a WARC record at offset {offset}: {line[:40]!r}")
+        start = offset
+        offset += len(line)
+
+        headers: dict[str, str] = {}
+        while True:
+            line = fp.readline()
+            if not line:
+                raise ValueError(f"truncated WARC record header at offset {start}")
+            offset += len(line)
+            line = line.rstrip(b"\r\n")
+            if not line:
+                break
+            name, _, value = line.decode("utf-8", errors="replace").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", ""))
+        except ValueError:
+            raise ValueError(
+                f"WARC record at offset {start} has no valid Content-Length"
+            ) from None
+
+        if wanted(headers):
+            block = fp.read(length)
+            if len(block) < length:
+                raise ValueError(f"truncated WARC record at offset {start}")
+            yield start, headers, block
+        else:
+            fp.seek(length, os.SEEK_CUR)
+        offset += length
+
+
+def is_trending_response(headers: dict[str, str]) -> bool:
+    return headers.get("warc-type") == "response" and (
+        parse_trending_url(headers.get("warc-target-uri", "")) is not None
+    )
+
+
+def iter_warc_pages(
+    path: Path, skipped: Callable[[str, str], None] | None = None
+) -> Iterator[ArchivedPage]:
+    """Yield the trending pages of one WARC file, in file order.
+
+    Records that are not trending pages are ignored silently; trending
+    pages that cannot be used (not 200, no WARC-Date) are reported to
+    `skipped(source, reason)`. Malformed archives raise ValueError or
+    OSError.
+    """
+    with open_warc(path) as fp:
+        for offset, headers, block in iter_warc_records(fp, is_trending_response):
+            source = f"{path}@{offset}"
+            target = parse_trending_url(headers["warc-target-uri"])
+            if target is None:
+                continue
+            try:
+                captured = datetime.datetime.fromisoformat(headers.get("warc-date", ""))
+                status, http_headers, body = parse_http_response(block)
+            except ValueError as e:
+                if skipped:
+                    skipped(source, str(e))
+                continue
+            if status != 200:
+                if skipped:
+                    skipped(source, f"HTTP status {status}")
+                continue
+            if captured.tzinfo is None:
+                captured = captured.replace(tzinfo=datetime.UTC)
+            language, period = target
+            yield ArchivedPage(
+                language=language,
+                period=period,
+                captured=captured,
+                source=source,
+                body=body,
+                http_headers=http_headers,
+            )
+
+
+def iter_html_pages(
+    root: Path, skipped: Callable[[str, str], None] | None = None
+) -> Iterator[ArchivedPage]:
+    """Yield root/<lang>/<period>/<name>.html in path order; bodies are read lazily."""
+    for language_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        for period_dir in sorted(p for p in language_dir.iterdir() if p.is_dir()):
+            for path in sorted(period_dir.iterdir()):
+                if path.suffix.lower() not in HTML_SUFFIXES or not path.is_file():
+                    continue
+                if period_dir.name not in PERIODS:
+                    if skipped:
+                        skipped(str(path), f"unknown period {period_dir.name!r}")
+                    continue
+                captured = parse_capture_time(path.name)
+                if captured is None:
+                    if skipped:
+                        skipped(str(path), "no capture date in the file name")
+                    continue
+                yield ArchivedPage(
+                    language=normalize_language(language_dir.name),
+                    period=period_dir.name,
+                    captured=captured,
+                    source=str(path),
+                    path=path,
+                )
@@ -0,0 +1,148 @@
+import datetime
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Sequence
+
+from lxml import etree
+
+from atom_feed import NS, append_repository_entry, feed_repos, new_feed, to_xml
+from trending_repo import TrendingRepo
+
+
+# 前回のスナップショット (前回書いたフィード) と今回の結果の差分
+#
+# 差分レコード (1言語・1期間 = 1レコード. 書き出しは trending_records.RecordWriter)
+#
+# {"language": "go", "period": "daily", "snapshot": "2025-01-02T00:00:00+00:00",
+#  "previous_snapshot": "2025-01-01T00:00:00+00:00",
+#  "entered": [["owner/new", 3]],          # [リポジトリ, 順位]
+#  "left": [["owner/old", 25]],            # [リポジトリ, 前回の順位]
+#  "moved": [["owner/repo", 1, 4]]}        # [リポジトリ, 順位, 前回の順位]
+#
+# previous_snapshot が null のときは前回のフィードがなく、全件が entered になる
+CHANGES_URL = "https://aazw.github.io/github-trending-feeds/changes"
+
+
+@dataclass(slots=True)
+class RankChange:
+    repo: TrendingRepo
+    previous_rank: int
+
+
+@dataclass(slots=True)
+class TrendingDiff:
+    language: str
+    period: str
+    snapshot: datetime.datetime
+    # 前回のフィードの<updated>. 前回のフィードがなければ None
+    previous_snapshot: str | None
+    entered: list[TrendingRepo] = field(default_factory=list)
+    left: list[TrendingRepo] = field(default_factory=list)
+    moved: list[RankChange] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """The repositories of a previously written feed and its <updated>."""
+
+    updated: str | None
+    repos: list[TrendingRepo]
+
+
+def read_snapshot(path: Path) -> Snapshot | None:
+    """Read the previous snapshot from a feed; None if it does not exist.
+
+    Raises OSError / etree.XMLSyntaxError for unreadable files.
+    """
+    if not path.exists():
+        return None
+    return feed_snapshot(etree.parse(path, etree.XMLParser()).getroot())
+
+
+def feed_snapshot(root: etree._Element) -> Snapshot:
+    return Snapshot(
+        updated=root.findtext("a:updated", None, NS), repos=feed_repos(root)
+    )
+
+
+def compute_diff(
+    language: str,
+    period: str,
+    snapshot: datetime.datetime,
+    current: Sequence[TrendingRepo],
+    previous: Snapshot | None,
+) -> TrendingDiff:
+    """Compare two snapshots of one language/period by repository URL.
+
+    Both sides are indexed by URL once, so the comparison is linear in the
+    number of repositories. A rank change is only reported when both ranks
+    are known (feeds written before the rank element existed read as 0).
+    """
+    diff = TrendingDiff(
+        language=language,
+        period=period,
+        snapshot=snapshot,
+        previous_snapshot=previous.updated if previous else None,
+    )
+    before = {repo.url: repo for repo in previous.repos} if previous else {}
+    after = {repo.url: repo for repo in current}
+
+    for url, repo in after.items():
+        prev = before.get(url)
+        if prev is None:
+            diff.entered.append(repo)
+        elif repo.rank and prev.rank and repo.rank != prev.rank:
+            diff.moved.append(RankChange(repo, prev.rank))
+    diff.left = [repo for url, repo in before.items() if url not in after]
+
+    diff.entered.sort(key=lambda repo: repo.rank)
+    diff.moved.sort(key=lambda change: change.repo.rank)
+    diff.left.sort(key=lambda repo: repo.rank)
+    return diff
+
+
+def to_diff_record(diff: TrendingDiff) -> dict[str, Any]:
+    return {
+        "language": diff.language,
+        "period": diff.period,
+        "snapshot": diff.snapshot.isoformat(timespec="seconds"),
+        "previous_snapshot": diff.previous_snapshot,
+        "entered": [[repo.repository, repo.rank] for repo in diff.entered],
+        "left": [[repo.repository, repo.rank] for repo in diff.left],
+        "moved": [
+            [change.repo.repository, change.repo.rank, change.previous_rank]
+            for change in diff.moved
+        ],
+    }
+
+
+def build_changes_feed(diff: TrendingDiff) -> str:
+    """A feed with one entry per entered, moved or left repository."""
+    language, period = diff.language, diff.period
+    feed = new_feed(
+        f"{CHANGES_URL}/{language}/{period}.atom",
+        f"GitHub Trending Changes - {language} ({period})",
+        diff.snapshot,
+    )
+    for repo in diff.entered:
+        append_repository_entry(
+            feed, repo, language, diff.snapshot, title_prefix=f"[entered #{repo.rank}] "
+        )
+    for change in diff.moved:
+        append_repository_entry(
+            feed,
+            change.repo,
+            language,
+            diff.snapshot,
+            title_prefix=f"[#{change.previous_rank} -> #{change.repo.rank}] ",
+        )
+    for repo in diff.left:
+        # 外れたリポジトリの情報は前回のフィードのもの
+        append_repository_entry(
+            feed,
+            repo,
+            language,
+            diff.snapshot,
+            title_prefix=f"[left, was #{repo.rank}] " if repo.rank else "[left] ",
+        )
+    return to_xml(feed)
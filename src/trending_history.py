@@ -0,0 +1,456 @@
+import sys
+import os
+import re
+import logging
+import datetime
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import click
+from lxml import etree
+
+
+def setup_logging(level: int = logging.INFO) -> logging.Logger:
+    # Making Python loggers output all messages to stdout in addition to log file
+    # https://stackoverflow.com/questions/14058453/making-python-loggers-output-all-messages-to-stdout-in-addition-to-log-file
+    formatter = logging.Formatter(
+        "%(asctime)s - %(pathname)s:%(lineno)d - %(levelname)s - %(message)s"
+    )
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+
+    logger = logging.getLogger(__name__)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+    return logger
+
+
+appLogger = setup_logging()
+NS = {
+    "a": "http://www.w3.org/2005/Atom",
+    "trending": "https://aazw.github.io/github-trending-feeds/ns/trending",
+}
+
+PERIODS = ("daily", "weekly", "monthly")
+
+# docs/feeds/<lang>/<period>/<period>-YYYY-MM-DD.atom
+ARCHIVE_NAME_PATTERN = re.compile(
+    r"^(?P<period>daily|weekly|monthly)-(?P<date>\d{4}-\d{2}-\d{2})\.atom$"
+)
+
+# 全言語合算の集計行に使う言語名
+ALL_LANGUAGES = "*"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS occurrences (
+    repo TEXT NOT NULL,
+    period TEXT NOT NULL,
+    date TEXT NOT NULL,
+    language TEXT NOT NULL,
+    rank INTEGER,
+    PRIMARY KEY (repo, period, date, language)
+) WITHOUT ROWID;
+
+-- 全言語合算の集計行 (language = '*') を (repo, period, date) ごとに1回だけ数えるため
+CREATE TABLE IF NOT EXISTS snapshots (
+    repo TEXT NOT NULL,
+    period TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (repo, period, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS repo_stats (
+    period TEXT NOT NULL,
+    language TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    appearances INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (period, language, repo)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS repo_stats_by_appearances
+    ON repo_stats (period, language, appearances DESC);
+
+CREATE INDEX IF NOT EXISTS repo_stats_by_repo ON repo_stats (repo);
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveFile:
+    path: Path
+    language: str
+    period: str
+    date: str
+
+
+def iter_archive_files(root: Path) -> Iterator[ArchiveFile]:
+    """Iterate over dated archive atoms (<lang>/<period>/<period>-<date>.atom) in a deterministic order."""
+    try:
+        with os.scandir(root) as it:
+            language_dirs = sorted(
+                (e.name, e.path) for e in it if e.is_dir(follow_symlinks=False)
+            )
+        for language, language_dir in language_dirs:
+            for period in PERIODS:
+                period_dir = os.path.join(language_dir, period)
+                if not os.path.isdir(period_dir):
+                    continue
+                with os.scandir(period_dir) as it:
+                    names = sorted(
+                        e.name for e in it if e.is_file(follow_symlinks=False)
+                    )
+                for name in names:
+                    m = ARCHIVE_NAME_PATTERN.match(name)
+                    if m is None or m["period"] != period:
+                        continue
+                    yield ArchiveFile(
+                        path=Path(period_dir, name),
+                        language=language,
+                        period=period,
+                        date=m["date"],
+                    )
+    except OSError as e:
+        appLogger.error(f"Error iterating archive files in {root}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+
+def parse_archive_atom(path: Path) -> list[tuple[str, int | None]]:
+    """Return (owner/repo, rank) pairs of the entries in an archived atom."""
+    parser = etree.XMLParser(
+        dtd_validation=False,
+        load_dtd=False,
+        no_network=True,
+        resolve_entities=False,
+    )
+    root = etree.parse(str(path), parser).getroot()
+
+    repositories: list[tuple[str, int | None]] = []
+    for entry in root.findall("a:entry", NS):
+        link = entry.find("a:link", NS)
+        if link is None or link.get("rel") in ("self", "alternate"):
+            continue
+        href = link.get("href")
+        if not href:
+            continue
+        # 順位は <trending:rank> を付けるようになってからのアーカイブにだけある
+        rank_text = entry.findtext("trending:rank", namespaces=NS)
+        rank = int(rank_text) if rank_text and rank_text.isdigit() else None
+        repositories.append((href.removeprefix("https://github.com/"), rank))
+    return repositories
+
+
+# snapshots テーブルがなかった頃のインデックスは、全言語合算の出現回数を言語の数だけ重複して数えている
+REBUILD_ALL_LANGUAGES = f"""
+INSERT OR IGNORE INTO snapshots (repo, period, date)
+    SELECT DISTINCT repo, period, date FROM occurrences;
+
+DELETE FROM repo_stats WHERE language = '{ALL_LANGUAGES}';
+
+INSERT INTO repo_stats (period, language, repo, appearances, first_seen, last_seen)
+    SELECT period, '{ALL_LANGUAGES}', repo, count(*), min(date), max(date)
+    FROM snapshots GROUP BY period, repo;
+"""
+
+
+def open_index(index_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(index_path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        migrating = (
+            conn.execute(
+                "SELECT count(*) FROM sqlite_master WHERE name IN ('occurrences', 'snapshots')"
+            ).fetchone()[0]
+            == 1
+        )
+        conn.executescript(SCHEMA)
+        if migrating:
+            conn.executescript(f"BEGIN; {REBUILD_ALL_LANGUAGES} COMMIT;")
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def index_archive_file(conn: sqlite3.Connection, archive: ArchiveFile) -> int:
+    """Add the occurrences of one archive file to the index and return how many were new."""
+    inserted = 0
+    for repo, rank in parse_archive_atom(archive.path):
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO occurrences (repo, period, date, language, rank) VALUES (?, ?, ?, ?, ?)",
+            (repo, archive.period, archive.date, archive.language, rank),
+        )
+        if cur.rowcount != 1:
+            continue
+        inserted += 1
+
+        # 言語別の集計行を更新. 全言語合算の行は、同じ日付の別の言語で数えていなければ更新する
+        languages = [archive.language]
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO snapshots (repo, period, date) VALUES (?, ?, ?)",
+            (repo, archive.period, archive.date),
+        )
+        if cur.rowcount == 1:
+            languages.append(ALL_LANGUAGES)
+        for language in languages:
+            conn.execute(
+                """
+                INSERT INTO repo_stats (period, language, repo, appearances, first_seen, last_seen)
+                VALUES (?, ?, ?, 1, ?, ?)
+                ON CONFLICT (period, language, repo) DO UPDATE SET
+                    appearances = appearances + 1,
+                    first_seen = min(first_seen, excluded.first_seen),
+                    last_seen = max(last_seen, excluded.last_seen)
+                """,
+                (archive.period, language, repo, archive.date, archive.date),
+            )
+    return inserted
+
+
+def period_step(period: str, date: datetime.date) -> datetime.date:
+    """Return the snapshot date that directly follows `date` for the given period."""
+    if period == "daily":
+        return date + datetime.timedelta(days=1)
+    if period == "weekly":
+        return date + datetime.timedelta(days=7)
+    # monthly: 翌月の同日 (存在しない日は月末に丸める)
+    year, month = divmod(date.month, 12)
+    year, month = date.year + year, month + 1
+    for day in (date.day, 30, 29, 28):
+        try:
+            return datetime.date(year, month, day)
+        except ValueError:
+            continue
+    raise ValueError(f"cannot step {date} by one month")
+
+
+def compute_streaks(period: str, dates: list[str]) -> list[tuple[str, str, int]]:
+    """Group sorted snapshot dates into (start, end, length) runs of consecutive snapshots."""
+    streaks: list[tuple[str, str, int]] = []
+    start: datetime.date | None = None
+    prev: datetime.date | None = None
+    length = 0
+    for text in dates:
+        date = datetime.date.fromisoformat(text)
+        if prev is not None and date == prev:
+            continue
+        if prev is not None and start is not None and date == period_step(period, prev):
+            length += 1
+        else:
+            if start is not None and prev is not None:
+                streaks.append((start.isoformat(), prev.isoformat(), length))
+            start = date
+            length = 1
+        prev = date
+    if start is not None and prev is not None:
+        streaks.append((start.isoformat(), prev.isoformat(), length))
+    return streaks
+
+
+def normalize_repo(repo: str) -> str:
+    return repo.removeprefix("https://github.com/").strip("/")
+
+
+@click.group()
+@click.option(
+    "--index",
+    "indexPath",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=Path("trending-history.sqlite3"),
+    show_default=True,
+    help="履歴インデックス (SQLite) のパス",
+)
+@click.pass_context
+def cli(ctx: click.Context, indexPath: Path) -> None:
+    """Query the trending history built from the archived atom feeds."""
+    ctx.obj = indexPath
+
+
+@cli.command()
+@click.option(
+    "--dir",
+    "dirPath",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    required=True,
+    help="アーカイブ済みAtomを含むfeedsディレクトリ",
+)
+@click.pass_obj
+def build(indexPath: Path, dirPath: Path) -> None:
+    """Build or incrementally update the index from archived atoms."""
+    appLogger.info("start app")
+    appLogger.info(f"command-line argument: --index = {indexPath}")
+    appLogger.info(f"command-line argument: --dir = {dirPath}")
+
+    try:
+        conn = open_index(indexPath)
+    except sqlite3.Error as e:
+        appLogger.error(f"Error opening index {indexPath}: {e}")
+        appLogger.error("app failed")
+        sys.exit(1)
+
+    processed = 0
+    skipped = 0
+    occurrences = 0
+    with closing(conn):
+        # アーカイブは一度書かれたら変わらないので、パスで処理済みか判定する
+        known: set[str] = {row[0] for row in conn.execute("SELECT path FROM files")}
+
+        try:
+            for archive in iter_archive_files(dirPath):
+                relative = archive.path.relative_to(dirPath).as_posix()
+                if relative in known:
+                    skipped += 1
+                    continue
+
+                appLogger.debug(f"indexing {archive.path}")
+                try:
+                    occurrences += index_archive_file(conn, archive)
+                except etree.XMLSyntaxError as e:
+                    appLogger.warning(f"XML parse error in {archive.path}: {e}")
+                    appLogger.error("app failed")
+                    conn.rollback()
+                    sys.exit(1)
+
+                stat = archive.path.stat()
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                    (relative, stat.st_size, stat.st_mtime_ns),
+                )
+                processed += 1
+                if processed % 1000 == 0:
+                    conn.commit()
+                    appLogger.info(f"indexed {processed} files")
+            conn.commit()
+        except sqlite3.Error as e:
+            appLogger.error(f"Error updating index {indexPath}: {e}")
+            appLogger.error("app failed")
+            sys.exit(1)
+
+    appLogger.info(
+        f"indexed {processed} new files ({occurrences} occurrences), skipped {skipped} known files"
+    )
+    appLogger.info("app finished")
+
+
+def connect_readonly(indexPath: Path) -> sqlite3.Connection:
+    if not indexPath.exists():
+        raise click.ClickException(
+            f"index not found: {indexPath} (run the build command first)"
+        )
+    return sqlite3.connect(f"file:{indexPath}?mode=ro", uri=True)
+
+
+@cli.command(name="first-seen")
+@click.argument("repo")
+@click.pass_obj
+def first_seen(indexPath: Path, repo: str) -> None:
+    """Show when REPO (owner/name) first trended, per period."""
+    repo = normalize_repo(repo)
+    with closing(connect_readonly(indexPath)) as conn:
+        for period in PERIODS:
+            row = conn.execute(
+                "SELECT first_seen FROM repo_stats WHERE period = ? AND language = ? AND repo = ?",
+                (period, ALL_LANGUAGES, repo),
+            ).fetchone()
+            if row is None:
+                continue
+            languages = [
+                r[0]
+                for r in conn.execute(
+                    "SELECT language FROM occurrences WHERE repo = ? AND period = ? AND date = ? ORDER BY language",
+                    (repo, period, row[0]),
+                )
+            ]
+            click.echo(f"{period}\t{row[0]}\t{','.join(languages)}")
+
+
+@cli.command()
+@click.argument("repo")
+@click.option(
+    "--period",
+    type=click.Choice(PERIODS, case_sensitive=True),
+    default="daily",
+    show_default=True,
+)
+@click.option("--language", type=str, default=None, help="言語を限定する")
+@click.pass_obj
+def streaks(indexPath: Path, repo: str, period: str, language: str | None) -> None:
+    """Show the trending streaks of REPO (consecutive snapshots)."""
+    repo = normalize_repo(repo)
+    query = "SELECT DISTINCT date FROM occurrences WHERE repo = ? AND period = ?"
+    params: list[str] = [repo, period]
+    if language:
+        query += " AND language = ?"
+        params.append(language)
+    query += " ORDER BY date"
+
+    with closing(connect_readonly(indexPath)) as conn:
+        dates = [row[0] for row in conn.execute(query, params)]
+
+    for start, end, length in compute_streaks(period, dates):
+        click.echo(f"{start}\t{end}\t{length}")
+
+
+@cli.command()
+@click.argument("repo")
+@click.pass_obj
+def appearances(indexPath: Path, repo: str) -> None:
+    """Show how often REPO appeared per period and language."""
+    repo = normalize_repo(repo)
+    with closing(connect_readonly(indexPath)) as conn:
+        rows = conn.execute(
+            """
+            SELECT period, language, appearances, first_seen, last_seen
+            FROM repo_stats
+            WHERE repo = ? AND language != ?
+            ORDER BY period, appearances DESC, language
+            """,
+            (repo, ALL_LANGUAGES),
+        )
+        for period, language, count, first, last in rows:
+            click.echo(f"{period}\t{language}\t{count}\t{first}\t{last}")
+
+
+@cli.command()
+@click.option(
+    "--period",
+    type=click.Choice(PERIODS, case_sensitive=True),
+    default="daily",
+    show_default=True,
+)
+@click.option("--language", type=str, default=None, help="言語を限定する")
+@click.option("-n", "--limit", type=int, default=20, show_default=True)
+@click.pass_obj
+def top(indexPath: Path, period: str, language: str | None, limit: int) -> None:
+    """Show the repositories with the most appearances."""
+    with closing(connect_readonly(indexPath)) as conn:
+        rows = conn.execute(
+            """
+            SELECT repo, appearances, first_seen, last_seen
+            FROM repo_stats
+            WHERE period = ? AND language = ?
+            ORDER BY appearances DESC, repo
+            LIMIT ?
+            """,
+            (period, language or ALL_LANGUAGES, limit),
+        )
+        for repo, count, first, last in rows:
+            click.echo(f"{repo}\t{count}\t{first}\t{last}")
+
+
+if __name__ == "__main__":
+    cli()
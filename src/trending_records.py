@@ -0,0 +1,171 @@
+import os
+import json
+import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
+
+from trending_repo import GITHUB_URL, TrendingRepo
+
+
+# scrape_trending.py が書き出すレコードファイル (1リポジトリ = 1レコード)
+#
+# {"language": "go", "period": "daily", "snapshot": "2025-01-01T00:00:00+00:00",
+#  "rank": 1, "repository": "owner/repo", "url": "https://github.com/owner/repo",
+#  "description": "...", "programming_language": "Go", "stars": 1234, "forks": 56,
+#  "stars_gained": 78, "contributors": ["alice", "bob"]}
+#
+# 形式は拡張子で決める
+# - .jsonl   : JSON Lines (デバッグ用に人が読める)
+# - .msgpack : MessagePack (読み書きが速い. msgpackパッケージが必要)
+RECORD_FORMATS = {".jsonl": "jsonl", ".msgpack": "msgpack"}
+
+
+def record_format(path: Path) -> str:
+    try:
+        return RECORD_FORMATS[path.suffix]
+    except KeyError:
+        raise ValueError(
+            f"unsupported record file {path}, expected one of {', '.join(RECORD_FORMATS)}"
+        ) from None
+
+
+def _import_msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError:
+        raise ValueError(
+            "msgpack is not installed (install it or use a .jsonl record file)"
+        ) from None
+    return msgpack
+
+
+def to_records(
+    repos: Iterable[TrendingRepo],
+    language: str,
+    period: str,
+    snapshot: datetime.datetime,
+) -> list[dict[str, Any]]:
+    """Build records from the repositories parsed by scrape_trending.py."""
+    snapshot_text = snapshot.isoformat(timespec="seconds")
+    return [
+        {
+            "language": language,
+            "period": period,
+            "snapshot": snapshot_text,
+            "rank": repo.rank,
+            "repository": repo.repository,
+            "url": repo.url,
+            "description": repo.description,
+            "programming_language": repo.programming_language,
+            "stars": repo.stars,
+            "forks": repo.forks,
+            "stars_gained": repo.stars_gained,
+            "contributors": list(repo.contributors),
+        }
+        for repo in repos
+    ]
+
+
+def from_record(record: dict[str, Any]) -> TrendingRepo:
+    return TrendingRepo(
+        path=record["url"].removeprefix(GITHUB_URL),
+        description=record["description"],
+        rank=record["rank"],
+        programming_language=record.get("programming_language"),
+        stars=record.get("stars"),
+        forks=record.get("forks"),
+        stars_gained=record.get("stars_gained"),
+        contributors=tuple(record.get("contributors", ())),
+    )
+
+
+class RecordWriter:
+    """Stream records into a .jsonl or .msgpack file."""
+
+    def __init__(self, path: Path, append: bool = False):
+        self.format = record_format(path)
+        self._packer = _import_msgpack().Packer() if self.format == "msgpack" else None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fp: BinaryIO = path.open("ab" if append else "wb")
+
+    def write(self, records: Iterable[dict[str, Any]]) -> None:
+        if self._packer is not None:
+            for record in records:
+                self._fp.write(self._packer.pack(record))
+        else:
+            for record in records:
+                self._fp.write(
+                    json.dumps(
+                        record, ensure_ascii=False, separators=(",", ":")
+                    ).encode("utf-8")
+                    + b"\n"
+                )
+
+    def close(self) -> None:
+        self._fp.close()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def iter_records(path: Path) -> Iterator[dict[str, Any]]:
+    """Read records one at a time without loading the whole file."""
+    if record_format(path) == "msgpack":
+        msgpack = _import_msgpack()
+        with path.open("rb") as fp:
+            yield from msgpack.Unpacker(fp, raw=False)
+    else:
+        with path.open("rb") as fp:
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _iter_records_but_tail(path: Path) -> Iterator[dict[str, Any] | None]:
+    """iter_records(), but a broken last record is yielded as None instead of raising."""
+    if record_format(path) == "msgpack":
+        # Unpacker は末尾で途中までしかないレコードを返さずに終わる (途中の破損は例外)
+        yield from iter_records(path)
+        return
+    broken: int | None = None
+    with path.open("rb") as fp:
+        for number, line in enumerate(fp, start=1):
+            if not line.strip():
+                continue
+            if broken is not None:
+                raise ValueError(f"corrupt record at line {broken} of {path}")
+            try:
+                record = json.loads(line)
+            except ValueError:
+                broken = number
+                continue
+            yield record
+    if broken is not None:
+        # 追記の途中で止まった最後の行
+        yield None
+
+
+def filter_records(path: Path, keep: Callable[[dict[str, Any]], bool]) -> int:
+    """Rewrite a record file with only the records `keep` accepts; return how many were dropped.
+
+    A broken last record (a crash while appending) is dropped too; a
+    broken record anywhere else raises ValueError and leaves the file as
+    it was. The file is replaced in one step.
+    """
+    tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+    dropped = 0
+    try:
+        with RecordWriter(tmp_path) as writer:
+            for record in _iter_records_but_tail(path):
+                if record is not None and keep(record):
+                    writer.write([record])
+                else:
+                    dropped += 1
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+    return dropped
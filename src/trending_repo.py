@@ -0,0 +1,36 @@
+import sys
+from dataclasses import dataclass
+
+
+GITHUB_URL = "https://github.com"
+
+
+@dataclass(slots=True)
+class TrendingRepo:
+    """One repository row (article.Box-row) of a trending page."""
+
+    # "/owner/repo" (sys.intern済み. 同じリポジトリが複数の言語・期間に出ても1つの文字列を共有する)
+    path: str
+    description: str = ""
+    # ページ上の順位 (1始まり)
+    rank: int = 0
+    # リポジトリの主要言語 (ページ上の表示名. 例: "Go")
+    programming_language: str | None = None
+    stars: int | None = None
+    forks: int | None = None
+    # 期間中に増えたスター数 ("123 stars today")
+    stars_gained: int | None = None
+    # "Built by" のアバター (ログイン名)
+    contributors: tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        self.path = sys.intern(self.path)
+
+    @property
+    def repository(self) -> str:
+        """owner/repo"""
+        return self.path.lstrip("/")
+
+    @property
+    def url(self) -> str:
+        return f"{GITHUB_URL}{self.path}"